@@ -0,0 +1,59 @@
+"""Per-message cost of the JSON codec on polyswarmclient hot paths, against the stdlib calls it replaced
+
+Run with `python benchmarks/codec_benchmark.py`, with and without orjson installed.
+"""
+import json
+import timeit
+
+from polyswarmclient import codec
+
+BLOCK = json.dumps({'event': 'block', 'data': {'number': 12345678}, 'block_number': 12345678, 'txhash': '0x0'})
+BOUNTY = json.dumps({
+    'event': 'bounty',
+    'data': {
+        'guid': '2b2f6a1d-7c6b-4a52-9e3b-5b2a6d2c1f10',
+        'artifact_type': 'file',
+        'author': '0x05328f171b8c1463eaFDACCA478D9EE6a1d923F8',
+        'amount': '62500000000000000',
+        'uri': 'QmYwAPJzv5CZsnA625s3Xf2nemtYgPpHdWEz79ojWnPbdG',
+        'expiration': '118',
+        'metadata': [{'mimetype': 'text/plain', 'sha256': 'a' * 64, 'size': 68}] * 8,
+    },
+    'block_number': 100,
+    'txhash': '0x' + 'b' * 64,
+})
+BALANCE = json.dumps({'status': 'OK', 'result': 1000000000000000000000000})
+JOB = {
+    'polyswarmd_uri': 'https://api.polyswarm.network/v1/default',
+    'guid': '2b2f6a1d-7c6b-4a52-9e3b-5b2a6d2c1f10',
+    'index': 3,
+    'uri': 'QmYwAPJzv5CZsnA625s3Xf2nemtYgPpHdWEz79ojWnPbdG',
+    'artifact_type': 0,
+    'duration': 20,
+    'metadata': {'mimetype': 'text/plain', 'sha256': 'a' * 64},
+    'chain': 'side',
+    'ts': 1611590400,
+}
+
+NUMBER = 20000
+
+
+def measure(name, before, after):
+    before_us = min(timeit.repeat(before, number=NUMBER, repeat=5)) / NUMBER * 1e6
+    after_us = min(timeit.repeat(after, number=NUMBER, repeat=5)) / NUMBER * 1e6
+    print(f'{name:<24} {before_us:8.2f}us {after_us:8.2f}us {before_us / after_us:6.2f}x')
+
+
+def main():
+    print(f'codec backend: {codec.BACKEND}')
+    print(f'{"message":<24} {"stdlib":>10} {"codec":>10} {"speedup":>7}')
+
+    for name, message in (('block event', BLOCK), ('bounty event', BOUNTY), ('large int response', BALANCE)):
+        encoded = message.encode('utf-8')
+        measure(name, lambda: json.loads(encoded.decode('utf-8')), lambda: codec.loads(encoded))
+
+    measure('job request dumps', lambda: json.dumps(JOB).encode('utf-8'), lambda: codec.dumpb(JOB))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Gap detection and reservation with thousands of pending nonces, against the list scans NonceManager used before
+
+Run with `python benchmarks/nonce_benchmark.py`.
+"""
+import random
+import timeit
+
+from polyswarmclient.ethereum.transaction import NonceManager
+from polyswarmclient.ethereum.transaction.nonceledger import NonceLedger
+
+PENDING = 5000
+BASE = 1000000
+
+
+def list_find_gaps(nonces):
+    return [r for r in range(nonces[0], nonces[-1]) if r not in nonces]
+
+
+def measure(name, func, number, setup='pass'):
+    seconds = min(timeit.repeat(func, setup=setup, number=number, repeat=3)) / number
+    print(f'{name:<40} {seconds * 1e6:12.2f}us')
+
+
+def main():
+    random.seed(0)
+    # Pending transactions with roughly 1% of nonces missing
+    pending = sorted(n for n in range(BASE, BASE + PENDING) if random.random() > 0.01)
+    print(f'{len(pending)} pending nonces, {PENDING - len(pending)} gaps')
+
+    measure('find_gaps, list membership', lambda: list_find_gaps(pending), 1)
+    measure('find_gaps, set membership', lambda: NonceManager.find_gaps(pending), 100)
+
+    ledger = NonceLedger()
+    measure('ledger sync', lambda: ledger.sync(BASE, pending), 100)
+    measure('ledger first gap', lambda: ledger.base_nonce, 100000)
+    measure('ledger is_free', lambda: ledger.is_free(BASE + PENDING // 2), 100000)
+
+    def churn():
+        # Reserve an approve + post pair, then reject it, as a failed post would
+        nonces = ledger.reserve(2)
+        ledger.release(nonces)
+
+    ledger.sync(BASE, pending)
+    measure('ledger reserve(2) + release', churn, 100000)
+
+    reserved = []
+
+    def reserve_all():
+        ledger.sync(BASE, [])
+        reserved[:] = ledger.reserve(PENDING)
+        random.shuffle(reserved)
+
+    measure('ledger release, 5000 scattered nonces', lambda: ledger.release(reserved), 1, setup=reserve_all)
+
+
+if __name__ == '__main__':
+    main()
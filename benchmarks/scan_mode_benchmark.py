@@ -0,0 +1,52 @@
+"""Throughput of a CPU bound scan_sync in ScanMode.SYNC threads against ScanMode.PROCESS workers
+
+The scan is pure Python, so SYNC threads contend for the GIL while PROCESS workers run in parallel.
+PROCESS only pulls ahead with more than one core, run it on a multi-core box.
+
+Run with `python benchmarks/scan_mode_benchmark.py`.
+"""
+import asyncio
+import os
+import time
+
+from polyswarmclient.abstractscanner import AbstractScanner, ScanMode, ScanResult
+
+ARTIFACTS = 32
+ARTIFACT_SIZE = 4 * 1024 * 1024
+WORKERS = os.cpu_count() or 1
+
+
+class ChecksumScanner(AbstractScanner):
+
+    def scan_sync(self, guid, artifact_type, content, metadata, chain):
+        # Byte at a time on a sample of the artifact, holding the GIL the whole time
+        checksum = 0
+        for byte in content[::32]:
+            checksum = (checksum * 31 + byte) & 0xffffffff
+
+        return ScanResult(bit=True, verdict=checksum % 2 == 0)
+
+
+async def measure(mode, artifacts):
+    async with ChecksumScanner(mode, workers=WORKERS) as scanner:
+        start = time.perf_counter()
+        await asyncio.gather(*[scanner.scan(str(i), None, content, None, None) for i, content in enumerate(artifacts)])
+        elapsed = time.perf_counter() - start
+
+    print(f'{mode.name:<10} {ARTIFACTS / elapsed:10.2f} artifacts/s {elapsed:10.2f}s')
+    return elapsed
+
+
+def main():
+    artifacts = [os.urandom(ARTIFACT_SIZE) for _ in range(ARTIFACTS)]
+    print(f'{ARTIFACTS} artifacts of {ARTIFACT_SIZE // 1024}KiB, {WORKERS} workers')
+    loop = asyncio.get_event_loop()
+    sync = loop.run_until_complete(measure(ScanMode.SYNC, artifacts))
+    process = loop.run_until_complete(measure(ScanMode.PROCESS, artifacts))
+    print(f'PROCESS speedup over SYNC {sync / process:.2f}x')
+    if WORKERS == 1:
+        print('Only one core, this measures PROCESS overhead, not its speedup')
+
+
+if __name__ == '__main__':
+    main()
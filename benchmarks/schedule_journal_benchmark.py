@@ -0,0 +1,63 @@
+"""Journal writes, and restart-to-ready time with 10k pending scheduled events
+
+Restart-to-ready covers opening the journal and rebuilding the in-memory Schedule of each chain.
+
+Run with `python benchmarks/schedule_journal_benchmark.py`.
+"""
+import os
+import tempfile
+import time
+import uuid
+
+from polyswarmclient import events
+from polyswarmclient.schedulejournal import ScheduleJournal
+
+PENDING = 10000
+
+
+def scheduled_events(count):
+    # A reveal and a settle for every bounty asserted on
+    for i in range(count // 2):
+        guid = str(uuid.uuid4())
+        yield 1000 + i, events.RevealAssertion(guid, 0, '12345678901234567890', [True, False, True], '{"scanner": {}}')
+        yield 1100 + i, events.SettleBounty(guid)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'schedule.db')
+        journal = ScheduleJournal(path)
+        pending = list(scheduled_events(PENDING))
+
+        start = time.perf_counter()
+        for block, event in pending:
+            journal.put('side', block, event)
+        elapsed = time.perf_counter() - start
+        print(f'{"write through, per event":<40} {elapsed / PENDING * 1e6:12.2f}us')
+
+        journal.db.close()
+        journal.db = None
+        print(f'{"journal size":<40} {os.path.getsize(path):12d}B')
+
+        start = time.perf_counter()
+        restarted = ScheduleJournal(path)
+        schedule = events.Schedule()
+        for block, event in restarted.load('side'):
+            schedule.put(block, event)
+        elapsed = time.perf_counter() - start
+        print(f'{"restart to ready, " + str(len(schedule)) + " events":<40} {elapsed * 1e3:12.2f}ms')
+
+        start = time.perf_counter()
+        due = schedule.pop_due(1100 + PENDING)
+        restarted.remove('side', [event for _, event in due])
+        elapsed = time.perf_counter() - start
+        print(f'{"fire and remove " + str(len(due)) + " events":<40} {elapsed * 1e3:12.2f}ms')
+
+        start = time.perf_counter()
+        restarted.close()
+        elapsed = time.perf_counter() - start
+        print(f'{"compact and close":<40} {elapsed * 1e3:12.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Signature throughput, and how late a 1ms timer on the event loop fires, while signing a burst of transaction groups
+
+Each group is an approve and a post, like an assertion. Run with `python benchmarks/signing_benchmark.py`.
+"""
+import asyncio
+import time
+
+from polyswarmclient.signing import SigningService
+
+PRIV_KEY = bytes.fromhex('4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318')
+GROUPS = 200
+CONCURRENCY = 16
+
+
+def group(i):
+    return [{
+        'to': '0xF0109fC8DF283027b6285cc889F5aA624EaC1F55',
+        'value': 0,
+        'gas': 2000000,
+        'gasPrice': 0,
+        'nonce': 2 * i + j,
+        'chainId': 1337,
+        'data': '0x095ea7b3' + '00' * 64,
+    } for j in range(2)]
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def burst(signer):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def sign(i):
+        async with semaphore:
+            await signer.sign_ethereum_transactions(group(i))
+
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.ensure_future(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[sign(i) for i in range(GROUPS)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+
+    lags.sort()
+    return 2 * GROUPS / elapsed, lags[len(lags) // 2], lags[-1]
+
+
+async def main():
+    print(f'{"pool":<16} {"sig/s":>8} {"lag p50":>10} {"lag max":>10}')
+    for pool, workers in (('none', 1), ('thread', 1), ('thread', 4), ('process', 1), ('process', 4)):
+        signer = SigningService(PRIV_KEY, pool=pool, workers=workers)
+        # Warm up the pool, so process start up is not counted
+        await signer.sign_ethereum_transactions(group(0))
+        rate, p50, worst = await burst(signer)
+        await signer.close()
+        print(f'{pool + " x" + str(workers):<16} {rate:8.0f} {p50 * 1000:8.2f}ms {worst * 1000:8.2f}ms')
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
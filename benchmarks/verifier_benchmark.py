@@ -0,0 +1,41 @@
+"""Transaction verification over the verifier test fixtures, against decoding each transaction from scratch
+
+Run with `python benchmarks/verifier_benchmark.py` from the repository root.
+"""
+import timeit
+
+from eth_abi import decode_abi
+from hexbytes import HexBytes
+
+from polyswarmclient.ethereum.verifiers import verify_batch
+from polyswarmclient.utils import sha3
+from tests.test_verifiers import FIXTURES
+
+
+def decode_from_scratch(transaction, abi):
+    # What DecodedTransaction.from_transaction did for every transaction before ABIs were compiled
+    byte_data = bytes(HexBytes(transaction['data']))
+    method, args = abi
+    expected_sig = sha3('{}({})'.format(method, ','.join(args)))[:4]
+    assert byte_data[:4] == expected_sig
+    return decode_abi(args, bytes(HexBytes(byte_data[4:])))
+
+
+def measure(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f'{name:<40} {seconds * 1e6:12.2f}us')
+
+
+def main():
+    verifiers = [verifier for verifier, _ in FIXTURES]
+    transactions = [tx for _, tx in FIXTURES]
+    print(f'{len(transactions)} transactions per batch')
+
+    measure('decode from scratch', lambda: [decode_from_scratch(tx, v.ABI) for v, tx in FIXTURES], 1000)
+    measure('compiled decode', lambda: [v.COMPILED_ABI.decode(bytes(HexBytes(tx['data']))[4:]) for v, tx in FIXTURES],
+            1000)
+    measure('verify_batch', lambda: verify_batch(verifiers, transactions), 1000)
+
+
+if __name__ == '__main__':
+    main()
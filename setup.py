@@ -35,7 +35,6 @@ setup(name='polyswarm-client',
           'aiodns',
           'aioredis',
           'aioresponses',
-          'aiorwlock',
           'cachetools',
           'asynctest',
           'backoff',
@@ -52,6 +51,9 @@ setup(name='polyswarm-client',
           'websockets',
           'yara-python',
       ),
+      extras_require={
+          'orjson': ['orjson>=3.0'],
+      },
       package_dir={'': 'src'},
       packages=find_packages('src'),
       python_requires='>=3.6.5,<4',
@@ -51,7 +51,7 @@ class Ambassador(AbstractAmbassador):
         Args:
             chain (str): Chain sample is being requested from
         """
-        min_amount = await self.client.bounties.parameters[chain].get('bounty_amount_minimum')
+        min_amount = self.client.bounties.parameters[chain].bounty_amount_minimum
 
         while True:
             try:
@@ -1,24 +1,34 @@
 import aiohttp
 import asyncio
 import backoff
+import cachetools
 import functools
-import json
+import inspect
 import logging
 import math
 import os
+import sys
 import time
 import websockets
 
 from web3.auto import w3
 
 from polyswarmclient import events
+from polyswarmclient import codec
 from polyswarmclient import utils
+from polyswarmclient.artifactcache import ArtifactCache
 from polyswarmclient.bidstrategy import BidStrategyBase
-from polyswarmclient.ethereum.transaction import NonceManager
-from polyswarmclient.exceptions import RateLimitedError
+from polyswarmclient.deadline import BlockTimer, within_deadline
+from polyswarmclient.dispatcher import BOUNTY_CONCURRENCY, EventDispatcher, Overflow
+from polyswarmclient.ethereum.transaction import NonceManager, ReceiptPoller, TransactionBatcher
+from polyswarmclient.exceptions import ArtifactTooLargeError, RateLimitedError
 from polyswarmclient.liveness.local import LocalLivenessRecorder
 from polyswarmclient.backoff_wrapper import BackoffWrapper
-from polyswarmclient.request_rate_limit import RequestRateLimit
+from polyswarmclient.request_rate_limit import Priority, RequestRateLimit, RouteClass, parse_retry_after
+from polyswarmclient.routepolicy import RequestCoalescer
+from polyswarmclient.schedulejournal import ScheduleJournal
+from polyswarmclient.signing import SigningService
+from polyswarmclient.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +36,23 @@ MAX_ARTIFACTS = 256
 RATE_LIMIT_SLEEP = 2.0
 MAX_BACKOFF = 32
 
+# Connection pool shared by every request made to polyswarmd, 0 means no limit
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 100))
+HTTP_POOL_SIZE_PER_HOST = int(os.environ.get('HTTP_POOL_SIZE_PER_HOST', 0))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', 30))
+HTTP_DNS_CACHE_TTL = int(os.environ.get('HTTP_DNS_CACHE_TTL', 300))
+
+# Largest artifact we are willing to download in bytes, 0 means no limit
+MAX_ARTIFACT_SIZE = int(os.environ.get('MAX_ARTIFACT_SIZE', 0))
+ARTIFACT_CHUNK_SIZE = 64 * 1024
+
+# Seconds each on_new_block handler may take, run concurrently when set, 0 runs them in sequence without a limit
+BLOCK_HANDLER_TIMEOUT = float(os.environ.get('BLOCK_HANDLER_TIMEOUT', 0))
+
+# Artifact listings to remember, and for how many seconds
+LIST_ARTIFACTS_CACHE_SIZE = int(os.environ.get('LIST_ARTIFACTS_CACHE_SIZE', 4096))
+LIST_ARTIFACTS_TTL = float(os.environ.get('LIST_ARTIFACTS_TTL', 3600))
+
 
 class Client(object):
     """Client to connected to a Ethereum wallet as well as a polyswarmd instance.
@@ -52,13 +79,27 @@ class Client(object):
             self.priv_key = w3.eth.account.decrypt(f.read(), password)
 
         self.account = w3.eth.account.from_key(self.priv_key).address
+        self.signer = SigningService(self.priv_key)
         logger.info('Using account: %s', self.account)
 
         self.rate_limit = None
 
+        # Shared HTTP session, created in run_task once the event loop is set
+        self.session = None
+        self.max_artifact_size = MAX_ARTIFACT_SIZE
+        self.artifact_cache = ArtifactCache()
+        # Seconds per block on each chain, to turn bounty windows into deadlines
+        self.block_timer = BlockTimer()
+        self.artifact_listings = cachetools.TTLCache(maxsize=LIST_ARTIFACTS_CACHE_SIZE, ttl=LIST_ARTIFACTS_TTL)
+        self.artifact_listings_in_flight = SingleFlight()
+        self.request_coalescer = RequestCoalescer()
+
         # Do not init nonce manager here. Need to wait until we can guarantee that our event loop is set.
         self.nonce_managers = {}
+        self.transaction_batchers = {}
+        self.receipt_pollers = {}
         self.__schedules = {}
+        self.schedule_journal = ScheduleJournal()
 
         self.tries = 0
 
@@ -85,14 +126,38 @@ class Client(object):
         self.on_settled_bounty = events.OnSettledBountyCallback()
         self.on_initialized_channel = events.OnInitializedChannelCallback()
         self.on_deprecated = events.OnDeprecatedCallback()
+        if BLOCK_HANDLER_TIMEOUT > 0:
+            # Keep one slow block handler from delaying the rest
+            self.on_new_block.configure(concurrent=True, timeout=BLOCK_HANDLER_TIMEOUT)
 
         # Events scheduled on block deadlines
         self.on_reveal_assertion_due = events.OnRevealAssertionDueCallback()
         self.on_vote_on_bounty_due = events.OnVoteOnBountyDueCallback()
         self.on_settle_bounty_due = events.OnSettleBountyDueCallback()
         self.on_withdraw_stake_due = events.OnWithdrawStakeDueCallback()
+
+        # Bounded routes from websocket events to their callbacks, configure before calling run
+        self.dispatcher = EventDispatcher()
+        # Bounties queued behind a full route are past answering, and waiting on them would hold back every other event
+        self.dispatcher.register('bounty', self.on_new_bounty, concurrency=BOUNTY_CONCURRENCY, overflow=Overflow.DROP)
+        self.dispatcher.register('assertion', self.on_new_assertion)
+        self.dispatcher.register('reveal', self.on_reveal_assertion)
+        self.dispatcher.register('vote', self.on_new_vote)
+        self.dispatcher.register('quorum', self.on_quorum_reached)
+        self.dispatcher.register('settled_bounty', self.on_settled_bounty)
+        self.dispatcher.register('deprecated', self.on_deprecated)
+        self.dispatcher.register('initialized_channel', self.on_initialized_channel)
         utils.configure_event_loop()
 
+    def callback_stats(self):
+        """Latency histograms, error and timeout counts of every handler registered on the client callbacks
+
+        Returns:
+            (dict): Callback attribute name to the stats of each of its handlers
+        """
+        return {name: callback.stats() for name, callback in vars(self).items()
+                if isinstance(callback, events.Callback) and callback.cbs}
+
     def run(self, chains=None):
         """Run the main event loop
 
@@ -126,12 +191,18 @@ class Client(object):
             chains = {'home', 'side'}
 
         self.__schedules = {chain: events.Schedule() for chain in chains}
+        self.schedule_journal = ScheduleJournal.for_account(self.account)
+        self.replay_schedule_journal(chains)
         # We can now create our locks, because we are assured that the event loop is set
         self.nonce_managers = {chain: NonceManager(self, chain) for chain in chains}
         for nonce_manager in self.nonce_managers.values():
             await nonce_manager.setup()
 
+        self.transaction_batchers = {chain: TransactionBatcher(self, chain) for chain in chains}
+        self.receipt_pollers = {chain: ReceiptPoller(self, chain) for chain in chains}
+
         self.rate_limit = await RequestRateLimit.build()
+        self.session = self.create_session()
 
         try:
             await self.liveness_recorder.start()
@@ -146,8 +217,43 @@ class Client(object):
             if listen_for_events:
                 await asyncio.wait([self.listen_for_events(chain) for chain in chains])
         finally:
+            self.dispatcher.stop()
+            await self.signer.close()
+            await self.schedule_journal.close()
             await self.on_stop.run()
             self.clear_sub_clients()
+            await self.close_session()
+
+    @staticmethod
+    def create_session():
+        """Create the pooled HTTP session used for all polyswarmd traffic
+
+        Connections are kept alive and reused between requests, and DNS lookups are cached.
+
+        Returns:
+            aiohttp.ClientSession: New session bound to the current event loop
+        """
+        resolver = None
+        # aiodns requires a selector event loop, which is not available on Windows
+        if sys.platform != 'win32':
+            try:
+                resolver = aiohttp.AsyncResolver()
+            except RuntimeError:
+                logger.warning('aiodns is not available, falling back to threaded DNS resolution')
+
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE,
+                                         limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+                                         keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                                         use_dns_cache=True,
+                                         ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                                         resolver=resolver)
+        return aiohttp.ClientSession(connector=connector, json_serialize=codec.dumps)
+
+    async def close_session(self):
+        """Close the shared HTTP session, and all pooled connections"""
+        if self.session is not None:
+            session, self.session = self.session, None
+            await session.close()
 
     def clear_sub_clients(self):
         self.balances = None
@@ -165,15 +271,14 @@ class Client(object):
             if self.api_key:
                 headers.update({'Authorization': self.api_key})
 
-            async with aiohttp.ClientSession() as session:
-                async with session.options(f'{self.polyswarmd_uri}/wallets/', headers=headers) as response:
-                    if response.status == 404:
-                        logger.debug('Using ethereum sub-clients')
-                        self.create_ethereum_sub_clients(chains)
-                        return
-                    response.raise_for_status()
-                logger.debug('Using fast sub-clients')
-                self.create_fast_sub_clients(chains)
+            async with self.session.options(f'{self.polyswarmd_uri}/wallets/', headers=headers) as response:
+                if response.status == 404:
+                    logger.debug('Using ethereum sub-clients')
+                    self.create_ethereum_sub_clients(chains)
+                    return
+                response.raise_for_status()
+            logger.debug('Using fast sub-clients')
+            self.create_fast_sub_clients(chains)
         except aiohttp.ClientConnectionError:
             logger.exception('Unable to connect to polyswarmd')
             raise
@@ -202,6 +307,7 @@ class Client(object):
             while True:
                 number = int(math.floor(time.time()))
                 for chain in chains:
+                    self.block_timer.observe(chain, number)
                     asyncio.get_event_loop().create_task(self.__handle_scheduled_events(number, chain=chain))
                     asyncio.get_event_loop().create_task(self.on_new_block.run(number=number, chain=chain))
 
@@ -212,7 +318,8 @@ class Client(object):
 
     @utils.return_on_exception((aiohttp.ServerDisconnectedError, asyncio.TimeoutError, aiohttp.ClientOSError,
                                 aiohttp.ContentTypeError, RateLimitedError), default=(False, {}))
-    async def make_request(self, method, path, chain, json=None, send_nonce=False, api_key=None, params=None):
+    async def make_request(self, method, path, chain, json=None, send_nonce=False, api_key=None, params=None,
+                           priority=Priority.NORMAL):
         """Make a request to polyswarmd, expecting a json response
 
         Args:
@@ -223,9 +330,21 @@ class Client(object):
             send_nonce (bool): Whether to include a base_nonce query string parameter in this request
             api_key (str): Override default API key
             params (dict): Optional params for the request
+            priority (Priority): Order to send in while waiting on client side rate limits
         Returns:
             (bool, obj): Tuple of boolean representing success, and response JSON parsed from polyswarmd
         """
+        policy = self.request_coalescer.match(method, path) if json is None and not send_nonce else None
+        if policy is None:
+            return await self.__make_request(method, path, chain, json, send_nonce, api_key, params, priority)
+
+        # Identical concurrent GETs share one request, see polyswarmclient.routepolicy
+        api_key = api_key or self.api_key
+        key = (path, chain, api_key, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        return await self.request_coalescer.run(policy, key, self.__make_request, method, path, chain, json,
+                                                send_nonce, api_key, params, priority)
+
+    async def __make_request(self, method, path, chain, json, send_nonce, api_key, params, priority):
         if chain != 'home' and chain != 'side':
             raise ValueError(f'Chain parameter must be `home` or `side`, got {chain}')
 
@@ -247,26 +366,26 @@ class Client(object):
             headers = {'Authorization': api_key}
 
         response = {}
+        route = RouteClass.of(method, path)
         try:
-            await self.rate_limit.check()
-            async with aiohttp.ClientSession() as session:
-                async with session.request(method, uri, params=params, headers=headers, json=json) as raw:
-                    self._check_status_for_rate_limit(raw.status)
+            await self.rate_limit.check(route, priority)
+            async with self.session.request(method, uri, params=params, headers=headers, json=json) as raw:
+                self._check_status_for_rate_limit(raw.status, raw.headers)
 
-                    try:
-                        response = await raw.json()
-                    except aiohttp.ContentTypeError:
-                        response = await raw.read() if raw else 'None'
-                        raise
+                try:
+                    response = await codec.read_json(raw)
+                except aiohttp.ContentTypeError:
+                    response = await raw.read() if raw else 'None'
+                    raise
 
-                    queries = '&'.join([a + '=' + str(b) for (a, b) in params.items()])
-                    logger.debug('%s %s?%s', method, path, queries, extra={'extra': response})
+                queries = '&'.join([a + '=' + str(b) for (a, b) in params.items()])
+                logger.debug('%s %s?%s', method, path, queries, extra={'extra': response})
 
-                    if not utils.check_response(response):
-                        logger.warning('Request %s %s?%s failed', method, path, queries)
-                        return False, response.get('errors')
+                if not utils.check_response(response):
+                    logger.warning('Request %s %s?%s failed', method, path, queries)
+                    return False, response.get('errors')
 
-                    return True, response.get('result')
+                return True, response.get('result')
         except aiohttp.ContentTypeError:
             logger.exception('Received non-json response from polyswarmd: %s, url: %s', response, uri)
             raise
@@ -276,10 +395,10 @@ class Client(object):
         except asyncio.TimeoutError:
             logger.error('Connection to polyswarmd timed out')
             raise
-        except RateLimitedError:
-            # Handle "Too many requests" rate limit by not hammering server, and pausing all requests for a bit
-            logger.warning('Hit polyswarmd rate limits, stopping all requests for a moment')
-            asyncio.get_event_loop().create_task(self.rate_limit.trigger())
+        except RateLimitedError as e:
+            # Handle "Too many requests" rate limit by not hammering server, and slowing down this kind of request
+            logger.warning('Hit polyswarmd rate limits, slowing down %s requests', route)
+            asyncio.get_event_loop().create_task(self.rate_limit.trigger(route, e.retry_after))
             raise
 
     async def list_artifacts(self, ipfs_uri, api_key=None):
@@ -297,6 +416,15 @@ class Client(object):
             logger.warning('Invalid IPFS URI: %s', ipfs_uri)
             return []
 
+        # Listings for an IPFS URI never change, so only the first lookup goes to polyswarmd
+        artifacts = self.artifact_listings.get(ipfs_uri)
+        if artifacts is None:
+            artifacts = await self.artifact_listings_in_flight.run(ipfs_uri, self.__fetch_artifact_listing, ipfs_uri,
+                                                                   api_key)
+
+        return list(artifacts)
+
+    async def __fetch_artifact_listing(self, ipfs_uri, api_key):
         path = f'/artifacts/{ipfs_uri}/'
 
         # Chain parameter doesn't matter for artifacts, just set to side
@@ -306,7 +434,9 @@ class Client(object):
             return []
 
         result = {} if result is None else result
-        return [(a.get('name', ''), a.get('hash', '')) for a in result]
+        artifacts = tuple((a.get('name', ''), a.get('hash', '')) for a in result)
+        self.artifact_listings[ipfs_uri] = artifacts
+        return artifacts
 
     async def get_artifact_count(self, ipfs_uri, api_key=None):
         """Gets the number of artifacts at the ipfs uri
@@ -320,21 +450,101 @@ class Client(object):
         artifacts = await self.list_artifacts(ipfs_uri, api_key=api_key)
         return len(artifacts) if artifacts is not None and artifacts else 0
 
-    @utils.return_on_exception((aiohttp.ServerDisconnectedError, asyncio.TimeoutError, aiohttp.ContentTypeError,
-                                RateLimitedError, aiohttp.ClientOSError), default=None)
-    async def get_artifact(self, ipfs_uri, index, api_key=None):
-        """Retrieve an artifact from IPFS via polyswarmd
+    async def get_artifact(self, ipfs_uri, index, api_key=None, max_size=None):
+        """Retrieve an artifact from IPFS via polyswarmd, or from the artifact cache
 
         Args:
             ipfs_uri (str): IPFS hash of the artifact to retrieve
             index (int): Index of the sub artifact to retrieve
             api_key (str): Override default API key
+            max_size (int): Override the maximum artifact size in bytes
         Returns:
-            (bytes): Content of the artifact
+            (bytes): Content of the artifact, or None if it could not be retrieved in time or is too large
         """
         if not utils.is_valid_uri(ipfs_uri):
             raise ValueError('Invalid IPFS URI')
 
+        if max_size is None:
+            max_size = self.max_artifact_size
+
+        fetch = functools.partial(self.fetch_artifact, ipfs_uri, index, api_key=api_key, max_size=max_size)
+        # Under a bounty deadline the artifact is given up on once it passes, a response after it would be rejected
+        content = await within_deadline('fetch', self.artifact_cache.get(ipfs_uri, index, fetch))
+
+        # Cached copies may have been fetched under a different limit, so check the size again
+        if content is not None and max_size and len(content) > max_size:
+            logger.warning('Artifact %s/%s is %s bytes, larger than the maximum %s bytes', ipfs_uri, index,
+                           len(content), max_size)
+            return None
+
+        return content
+
+    @utils.return_on_exception((aiohttp.ServerDisconnectedError, asyncio.TimeoutError, aiohttp.ClientResponseError,
+                                RateLimitedError, aiohttp.ClientOSError, ArtifactTooLargeError), default=None)
+    async def fetch_artifact(self, ipfs_uri, index, api_key=None, max_size=None):
+        """Retrieve an artifact from IPFS via polyswarmd, bypassing the artifact cache
+
+        Args:
+            ipfs_uri (str): IPFS hash of the artifact to retrieve
+            index (int): Index of the sub artifact to retrieve
+            api_key (str): Override default API key
+            max_size (int): Override the maximum artifact size in bytes
+        Returns:
+            (bytes): Content of the artifact, or None if it could not be retrieved or is too large
+        """
+        chunks = [chunk async for chunk in self.iter_artifact(ipfs_uri, index, api_key=api_key, max_size=max_size)]
+        return b''.join(chunks)
+
+    @utils.return_on_exception((aiohttp.ServerDisconnectedError, asyncio.TimeoutError, aiohttp.ClientResponseError,
+                                RateLimitedError, aiohttp.ClientOSError, ArtifactTooLargeError), default=None)
+    async def download_artifact(self, ipfs_uri, index, destination, api_key=None, max_size=None):
+        """Retrieve an artifact from IPFS via polyswarmd directly into a buffer or file
+
+        Args:
+            ipfs_uri (str): IPFS hash of the artifact to retrieve
+            index (int): Index of the sub artifact to retrieve
+            destination (bytearray|file): Buffer to extend, or file object to write each chunk to.
+                Awaitable writes, such as those of AsyncArtifactTempfile, are awaited
+            api_key (str): Override default API key
+            max_size (int): Override the maximum artifact size in bytes
+        Returns:
+            (int): Number of bytes written, or None if the artifact could not be retrieved or is too large
+        """
+        written = 0
+        async for chunk in self.iter_artifact(ipfs_uri, index, api_key=api_key, max_size=max_size):
+            if isinstance(destination, bytearray):
+                destination.extend(chunk)
+            else:
+                result = destination.write(chunk)
+                if inspect.isawaitable(result):
+                    await result
+
+            written += len(chunk)
+
+        return written
+
+    async def iter_artifact(self, ipfs_uri, index, api_key=None, max_size=None, chunk_size=ARTIFACT_CHUNK_SIZE):
+        """Stream an artifact from IPFS via polyswarmd without holding the whole artifact in memory
+
+        Args:
+            ipfs_uri (str): IPFS hash of the artifact to retrieve
+            index (int): Index of the sub artifact to retrieve
+            api_key (str): Override default API key
+            max_size (int): Override the maximum artifact size in bytes
+            chunk_size (int): Maximum size of each chunk
+        Yields:
+            (bytes): The next chunk of the artifact
+        Raises:
+            ArtifactTooLargeError: If the artifact is larger than the maximum size.
+                Raised before reading any content when polyswarmd reports a Content-Length
+            aiohttp.ClientResponseError: If polyswarmd responds with an error status
+        """
+        if not utils.is_valid_uri(ipfs_uri):
+            raise ValueError('Invalid IPFS URI')
+
+        if max_size is None:
+            max_size = self.max_artifact_size
+
         uri = f'{self.polyswarmd_uri}/artifacts/{ipfs_uri}/{index}/'
         logger.debug('getting artifact from uri: %s', uri)
 
@@ -347,24 +557,36 @@ class Client(object):
             headers = {'Authorization': api_key}
 
         try:
-            await self.rate_limit.check()
-            async with aiohttp.ClientSession() as session:
-                async with session.get(uri, params=params, headers=headers) as raw_response:
-                    # Handle "Too many requests" rate limit by not hammering server, and instead sleeping a bit
-                    self._check_status_for_rate_limit(raw_response.status)
-
-                    if raw_response.status / 100 == 2:
-                        return await raw_response.read()
+            await self.rate_limit.check(RouteClass.ARTIFACTS)
+            async with self.session.get(uri, params=params, headers=headers) as raw_response:
+                # Handle "Too many requests" rate limit by not hammering server, and instead sleeping a bit
+                self._check_status_for_rate_limit(raw_response.status, raw_response.headers)
+                raw_response.raise_for_status()
+
+                content_length = raw_response.content_length
+                if max_size and content_length is not None and content_length > max_size:
+                    logger.warning('Artifact %s/%s is %s bytes, larger than the maximum %s bytes', ipfs_uri, index,
+                                   content_length, max_size)
+                    raise ArtifactTooLargeError
+
+                received = 0
+                async for chunk in raw_response.content.iter_chunked(chunk_size):
+                    received += len(chunk)
+                    if max_size and received > max_size:
+                        logger.warning('Artifact %s/%s is larger than the maximum %s bytes', ipfs_uri, index, max_size)
+                        raise ArtifactTooLargeError
+
+                    yield chunk
         except (aiohttp.ClientOSError, aiohttp.ServerDisconnectedError):
             logger.exception('Connection to polyswarmd refused')
             raise
         except asyncio.TimeoutError:
             logger.error('Connection to polyswarmd timed out')
             raise
-        except RateLimitedError:
-            # Handle "Too many requests" rate limit by not hammering server, and pausing all requests for a bit
-            logger.warning('Hit polyswarmd rate limits, stopping all requests for a moment')
-            asyncio.get_event_loop().create_task(self.rate_limit.trigger())
+        except RateLimitedError as e:
+            # Handle "Too many requests" rate limit by not hammering server, and slowing down artifact requests
+            logger.warning('Hit polyswarmd rate limits, slowing down artifact requests')
+            asyncio.get_event_loop().create_task(self.rate_limit.trigger(RouteClass.ARTIFACTS, e.retry_after))
             raise
 
     @staticmethod
@@ -423,29 +645,28 @@ class Client(object):
                     payload = aiohttp.payload.get_payload(f, content_type='application/octet-stream')
                     payload.set_content_disposition('form-data', name='file', filename=filename)
                     mpwriter.append_payload(payload)
-                    await self.rate_limit.check()
+                    await self.rate_limit.check(RouteClass.ARTIFACTS)
                     # Make the request
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(uri, params=params, headers=headers,
-                                                data=mpwriter) as raw_response:
-
-                            self._check_status_for_rate_limit(raw_response.status)
-                            try:
-                                response = await raw_response.json()
-                            except (ValueError, aiohttp.ContentTypeError):
-                                response = await raw_response.read() if raw_response else 'None'
-                                logger.error('Received non-json response from polyswarmd: %s, uri: %s', response, uri)
-                                response = {}
+                    async with self.session.post(uri, params=params, headers=headers,
+                                                 data=mpwriter) as raw_response:
+
+                        self._check_status_for_rate_limit(raw_response.status, raw_response.headers)
+                        try:
+                            response = await codec.read_json(raw_response)
+                        except (ValueError, aiohttp.ContentTypeError):
+                            response = await raw_response.read() if raw_response else 'None'
+                            logger.error('Received non-json response from polyswarmd: %s, uri: %s', response, uri)
+                            response = {}
             except (aiohttp.ClientOSError, aiohttp.ServerDisconnectedError):
                 logger.exception('Connection to polyswarmd refused, files: %s', files)
                 raise
             except asyncio.TimeoutError:
                 logger.error('Connection to polyswarmd timed out, files: %s', files)
                 raise
-            except RateLimitedError:
-                # Handle "Too many requests" rate limit by not hammering server, and pausing all requests for a bit
-                logger.warning('Hit polyswarmd rate limits, stopping all requests for a moment')
-                asyncio.get_event_loop().create_task(self.rate_limit.trigger())
+            except RateLimitedError as e:
+                # Handle "Too many requests" rate limit by not hammering server, and slowing down artifact requests
+                logger.warning('Hit polyswarmd rate limits, slowing down artifact requests')
+                asyncio.get_event_loop().create_task(self.rate_limit.trigger(RouteClass.ARTIFACTS, e.retry_after))
                 raise
             finally:
                 for f in to_close:
@@ -460,9 +681,10 @@ class Client(object):
             return response.get('result')
 
     @staticmethod
-    def _check_status_for_rate_limit(status):
+    def _check_status_for_rate_limit(status, headers=None):
         if status == 429:
-            raise RateLimitedError
+            retry_after = parse_retry_after(headers.get('Retry-After')) if headers is not None else None
+            raise RateLimitedError(retry_after=retry_after)
 
     def schedule(self, expiration, event, chain):
         """Schedule an event to execute on a particular block
@@ -475,6 +697,39 @@ class Client(object):
         if chain != 'home' and chain != 'side':
             raise ValueError(f'Chain parameter must be `home` or `side`, got {chain}')
         self.__schedules[chain].put(expiration, event)
+        self.schedule_journal.put(chain, expiration, event)
+
+    def replay_schedule_journal(self, chains):
+        """Schedule every event journaled by an earlier run
+
+        Args:
+            chains (set(str)): Chains to replay
+        """
+        for chain in chains:
+            journaled = self.schedule_journal.load(chain)
+            for expiration, event in journaled:
+                # Scheduling again would leave a replaced entry in the heap for every event already scheduled
+                if event not in self.__schedules[chain]:
+                    self.__schedules[chain].put(expiration, event)
+
+            if journaled:
+                logger.info('Replayed %s scheduled events on %s', len(journaled), chain)
+
+    def unschedule(self, event, chain):
+        """Cancel a scheduled event
+
+        Args:
+            event (Event): Event with the same key as the scheduled event, e.g. SettleBounty(guid)
+            chain (str): Which chain to operate on
+        Returns:
+            (bool): True if a scheduled event was cancelled
+        """
+        schedule = self.__schedules.get(chain)
+        if schedule is None or not schedule.cancel(event):
+            return False
+
+        self.schedule_journal.remove(chain, [event])
+        return True
 
     async def __handle_scheduled_events(self, number, chain):
         """Perform scheduled events when a new block is reported
@@ -485,8 +740,9 @@ class Client(object):
         """
         if chain != 'home' and chain != 'side':
             raise ValueError('Chain parameter must be `home` or `side`, got {chain}')
-        while self.__schedules[chain].peek() and self.__schedules[chain].peek()[0] < number:
-            exp, task = self.__schedules[chain].get()
+        due = self.__schedules[chain].pop_due(number)
+        self.schedule_journal.remove(chain, [task for _, task in due])
+        for exp, task in due:
             if isinstance(task, events.RevealAssertion):
                 asyncio.get_event_loop().create_task(
                     self.on_reveal_assertion_due.run(bounty_guid=task.guid, index=task.index, nonce=task.nonce,
@@ -552,12 +808,12 @@ class Client(object):
 
     async def route_websocket_message(self, message, last_block, chain):
         try:
-            message = json.loads(message)
+            message = codec.loads(message)
             event = message.get('event')
             data = message.get('data')
             block_number = message.get('block_number')
             txhash = message.get('txhash')
-        except json.JSONDecodeError:
+        except codec.JSONDecodeError:
             logger.error('Invalid event message from polyswarmd: %s', message)
             return
 
@@ -575,6 +831,7 @@ class Client(object):
             if number % 100 == 0:
                 logger.debug('Block %s on chain %s', number, chain)
 
+            self.block_timer.observe(chain, number)
             asyncio.get_event_loop().create_task(self.on_new_block.run(number=number, chain=chain))
             # These are staying here because we need the homechain block events as well
             asyncio.get_event_loop().create_task(self.__handle_scheduled_events(number, chain=chain))
@@ -582,39 +839,17 @@ class Client(object):
             return number
         elif event == 'fee_update':
             d = {'bounty_fee': data.get('bounty_fee'), 'assertion_fee': data.get('assertion_fee')}
-            await self.bounties.parameters[chain].update({k: v for k, v in d.items() if v is not None})
+            self.bounties.parameters[chain].replace({k: v for k, v in d.items() if v is not None})
         elif event == 'window_update':
             d = {'assertion_reveal_window': data.get('assertion_reveal_window'),
                  'arbiter_vote_window': data.get('arbiter_vote_window')}
-            await self.bounties.parameters[chain].update({k: v for k, v in d.items() if v is not None})
-        elif event == 'bounty':
-            asyncio.get_event_loop().create_task(
-                self.on_new_bounty.run(**data, block_number=block_number, txhash=txhash, chain=chain))
-        elif event == 'assertion':
-            asyncio.get_event_loop().create_task(
-                self.on_new_assertion.run(**data, block_number=block_number, txhash=txhash,
-                                          chain=chain))
-        elif event == 'reveal':
-            asyncio.get_event_loop().create_task(
-                self.on_reveal_assertion.run(**data, block_number=block_number, txhash=txhash,
-                                             chain=chain))
-        elif event == 'vote':
-            asyncio.get_event_loop().create_task(
-                self.on_new_vote.run(**data, block_number=block_number, txhash=txhash, chain=chain))
-        elif event == 'quorum':
-            asyncio.get_event_loop().create_task(
-                self.on_quorum_reached.run(**data, block_number=block_number, txhash=txhash,
-                                           chain=chain))
-        elif event == 'settled_bounty':
-            asyncio.get_event_loop().create_task(
-                self.on_settled_bounty.run(**data, block_number=block_number, txhash=txhash,
-                                           chain=chain))
-        elif event == 'deprecated':
-            asyncio.get_event_loop().create_task(
-                self.on_deprecated.run(**data, block_number=block_number, txhash=txhash,
-                                       chain=chain))
+            self.bounties.parameters[chain].replace({k: v for k, v in d.items() if v is not None})
         elif event == 'initialized_channel':
-            asyncio.get_event_loop().create_task(
-                self.on_initialized_channel.run(**data, block_number=block_number, txhash=txhash))
+            # Offer channels are not tied to a chain
+            await self.dispatcher.dispatch(event, dict(data, block_number=block_number, txhash=txhash))
+        elif event in self.dispatcher:
+            # Waits while the route for this event is full, which holds back reading further messages,
+            # except for bounties, which are dropped instead
+            await self.dispatcher.dispatch(event, dict(data, block_number=block_number, txhash=txhash, chain=chain))
         else:
             logger.error('Invalid event type from polyswarmd: %s', message)
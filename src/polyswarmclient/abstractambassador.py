@@ -196,7 +196,7 @@ class AbstractAmbassador(ABC):
             chain: Name of the chain to post to
         """
         async with self.client.liveness_recorder.waiting_task(bounty.ipfs_uri, self.last_block):
-            bounty_fee = await self.client.bounties.parameters[chain].get('bounty_fee')
+            bounty_fee = self.client.bounties.parameters[chain].bounty_fee
             try:
                 await self.client.balances.raise_for_low_balance(bounty.amount + bounty_fee, chain)
             except LowBalanceError as e:
@@ -209,20 +209,28 @@ class AbstractAmbassador(ABC):
                 else:
                     return
 
-            assertion_reveal_window = await self.client.bounties.parameters[chain].get('assertion_reveal_window')
-            arbiter_vote_window = await self.client.bounties.parameters[chain].get('arbiter_vote_window')
-            metadata = None
-            if bounty.metadata is not None:
-                metadata = await self.client.bounties.post_metadata(bounty.metadata, chain)
+            assertion_reveal_window, arbiter_vote_window = self.client.bounties.parameters[chain].values(
+                'assertion_reveal_window', 'arbiter_vote_window')
+            try:
+                metadata = None
+                if bounty.metadata is not None:
+                    metadata = await self.client.bounties.post_metadata(bounty.metadata, chain)
+
+                await self.on_before_bounty_posted(bounty.artifact_type, bounty.amount, bounty.ipfs_uri,
+                                                   bounty.duration, chain)
+                bounties = await self.client.bounties.post_bounty(bounty.artifact_type, bounty.amount,
+                                                                  bounty.ipfs_uri, bounty.duration, chain,
+                                                                  api_key=bounty.api_key, metadata=metadata)
+            except BaseException:
+                self.client.balances.refund(bounty.amount + bounty_fee, chain)
+                raise
 
-            await self.on_before_bounty_posted(bounty.artifact_type, bounty.amount, bounty.ipfs_uri, bounty.duration, chain)
-            bounties = await self.client.bounties.post_bounty(bounty.artifact_type, bounty.amount, bounty.ipfs_uri,
-                                                              bounty.duration, chain, api_key=bounty.api_key,
-                                                              metadata=metadata)
         if not bounties:
+            self.client.balances.refund(bounty.amount + bounty_fee, chain)
             await self.on_bounty_post_failed(bounty.artifact_type, bounty.amount, bounty.ipfs_uri, bounty.duration,
                                              chain, metadata=bounty.metadata)
         else:
+            self.client.balances.confirm(bounty.amount + bounty_fee, chain)
             async with self.bounties_posted_locks[chain]:
                 bounties_posted = self.bounties_posted.get(chain, 0)
                 logger.info('Submitted bounty %s', bounties_posted, extra={'extra': bounty})
@@ -329,6 +337,8 @@ class AbstractAmbassador(ABC):
             self.last_bounty_count[chain] = bounties_posted
 
     async def __handle_quorum_reached(self, bounty_guid, block_number, txhash, chain):
+        # Settling now, so the settle scheduled for the end of the vote window is no longer needed
+        self.client.unschedule(SettleBounty(bounty_guid), chain)
         return await self.__settle_bounty(bounty_guid, chain)
 
     async def __handle_settle_bounty(self, bounty_guid, chain):
@@ -5,8 +5,10 @@ from polyswarmartifact import ArtifactType, DecodeError
 
 from polyswarmclient import Client
 from polyswarmclient.abstractscanner import ScanResult
+from polyswarmclient.deadline import Deadline, within_deadline
 from polyswarmclient.events import VoteOnBounty, SettleBounty, WithdrawStake
-from polyswarmclient.exceptions import LowBalanceError, FatalError
+from polyswarmclient.exceptions import LowBalanceError, FatalError, ScannerSetupFailedError
+from polyswarmclient.scanbatcher import ScanBatcher
 from polyswarmclient.utils import asyncio_stop
 
 logger = logging.getLogger(__name__)  # Initialize logger
@@ -17,6 +19,10 @@ class AbstractArbiter(object):
         self.client = client
         self.chains = chains
         self.scanner = scanner
+        # Batches artifacts for scanners with their own scan_batch, unless scan is overridden here
+        self.scan_batcher = None
+        if type(self).scan is AbstractArbiter.scan:
+            self.scan_batcher = ScanBatcher.for_scanner(scanner)
 
         if artifact_types is None:
             self.valid_artifact_types = [ArtifactType.FILE]
@@ -93,8 +99,10 @@ class AbstractArbiter(object):
             content = await self.client.get_artifact(uri, index)
             if content is not None:
                 # Ignoring metadata for now
+                scan = self.scan_batcher.scan if self.scan_batcher is not None else self.scan
                 try:
-                    return await self.scan(guid, artifact_type, artifact_type.decode_content(content), None, chain)
+                    pending = scan(guid, artifact_type, artifact_type.decode_content(content), None, chain)
+                    return await within_deadline('scan', pending, ScanResult())
                 except DecodeError:
                     return ScanResult()
 
@@ -119,7 +127,7 @@ class AbstractArbiter(object):
         """
 
         await self.client.balances.get_nct_balance(chain)
-        min_stake = await self.client.staking.parameters[chain].get('minimum_stake')
+        min_stake = self.client.staking.parameters[chain].minimum_stake
         staking_balance = await self.client.staking.get_total_balance(chain)
         if staking_balance < min_stake:
             try:
@@ -127,16 +135,33 @@ class AbstractArbiter(object):
             except LowBalanceError as e:
                 raise FatalError(f'Failed to stake {min_stake - staking_balance} nct due to low balance', 1) from e
 
-        if self.scanner is not None and not await self.scanner.setup():
-            raise FatalError('Scanner setup failed', 1)
+        if self.scanner is not None:
+            if not await self.scanner.setup():
+                raise FatalError('Scanner setup failed', 1)
+
+            try:
+                await self.scanner.warm_scan_pool()
+            except ScannerSetupFailedError as e:
+                raise FatalError('Scanner process setup failed', 1) from e
 
     async def __handle_stop(self):
         if self.scanner is not None:
             await self.scanner.teardown()
+            # In case teardown is overridden without calling super
+            self.scanner.stop_scan_pool()
 
     async def deposit_stake(self, nct, chain):
         await self.client.balances.raise_for_low_balance(nct, chain)
-        deposits = await self.client.staking.post_deposit(nct, chain)
+        try:
+            deposits = await self.client.staking.post_deposit(nct, chain)
+        except BaseException:
+            self.client.balances.refund(nct, chain)
+            raise
+
+        if deposits:
+            self.client.balances.confirm(nct, chain)
+        else:
+            self.client.balances.refund(nct, chain)
         logger.info('Depositing stake: %s', deposits)
 
     async def __handle_deprecated(self, rollover, block_number, txhash, chain):
@@ -154,13 +179,11 @@ class AbstractArbiter(object):
         # Withdraw stake, if needed
         if not rollover:
             logger.critical('BountyRegistry contract is now deprecated, withdrawing stake.')
-            parameters = self.client.bounties.parameters[chain]
-            assertion_reveal_window = await parameters.get('assertion_reveal_window')
-            arbiter_vote_window = await parameters.get('arbiter_vote_window')
-            max_duration = await parameters.get('max_duration')
+            assertion_reveal_window, arbiter_vote_window, max_duration = self.client.bounties.parameters[chain].values(
+                'assertion_reveal_window', 'arbiter_vote_window', 'max_duration')
             withdraw_start = block_number + max_duration + assertion_reveal_window + arbiter_vote_window
             staking_balance = await self.client.staking.get_total_balance(chain)
-            ws = WithdrawStake(staking_balance)
+            ws = WithdrawStake(staking_balance, withdraw_start)
             self.client.schedule(withdraw_start, ws, chain)
         else:
             logger.critical('BountyRegistry contract is now deprecated, but stake will rollover to the new contract')
@@ -196,15 +219,20 @@ class AbstractArbiter(object):
             logger.info('Testing mode, %s bounties remaining', self.testing - self.bounties_seen)
 
         expiration = int(expiration)
-        assertion_reveal_window = await self.client.bounties.parameters[chain].get('assertion_reveal_window')
-        arbiter_vote_window = await self.client.bounties.parameters[chain].get('arbiter_vote_window')
+        assertion_reveal_window, arbiter_vote_window = self.client.bounties.parameters[chain].values(
+            'assertion_reveal_window', 'arbiter_vote_window')
 
         vote_start = expiration + assertion_reveal_window
         settle_start = expiration + assertion_reveal_window + arbiter_vote_window
         duration = settle_start - block_number
 
         await self.client.liveness_recorder.add_waiting_task(guid, block_number)
-        results = await self.fetch_and_scan_all(guid, artifact_type, uri, duration, metadata, chain)
+        # Votes are due before settlement starts, an artifact not scanned by then leaves the bounty unvoted
+        deadline = Deadline.for_blocks(duration, self.client.block_timer.block_time(chain))
+        with deadline.activate():
+            results = await self.fetch_and_scan_all(guid, artifact_type, uri, duration, metadata, chain)
+
+        logger.debug('Scanned bounty %s', guid, extra={'extra': deadline.stats()})
         votes = [result.verdict for result in results]
 
         if any((not result.bit for result in results)):
@@ -8,11 +8,14 @@ from polyswarmartifact.schema import verdict
 
 from polyswarmclient import Client
 from polyswarmclient.abstractscanner import ScanResult
+from polyswarmclient.deadline import Deadline, within_deadline
 from polyswarmclient.events import RevealAssertion, SettleBounty
-from polyswarmclient.exceptions import InvalidBidError, FatalError, LowBalanceError, InvalidMetadataError
+from polyswarmclient.exceptions import InvalidBidError, FatalError, LowBalanceError, InvalidMetadataError, \
+    ScannerSetupFailedError
 from polyswarmclient.filters.bountyfilter import BountyFilter
 from polyswarmclient.filters.confidencefilter import ConfidenceModifier
 from polyswarmclient.filters.filter import MetadataFilter
+from polyswarmclient.scanbatcher import ScanBatcher
 from polyswarmclient.utils import asyncio_stop
 
 logger = logging.getLogger(__name__)
@@ -31,6 +34,13 @@ class AbstractMicroengine(object):
 
         self.bounty_filter = bounty_filter
         self.confidence_modifier = confidence_modifier
+        # Batches artifacts for scanners with their own scan_batch, unless scan is overridden here
+        self.scan_batcher = None
+        if type(self).scan is AbstractMicroengine.scan:
+            self.scan_batcher = ScanBatcher.for_scanner(scanner)
+
+        # Answers artifacts from the scanner verdict cache before fetching them, unless scan is overridden here
+        self.verdict_lookup = scanner is not None and type(self).scan is AbstractMicroengine.scan
 
         self.client.on_run.register(self.__handle_run)
         self.client.on_stop.register(self.__handle_stop)
@@ -105,8 +115,8 @@ class AbstractMicroengine(object):
         Returns:
             list[int]: Amount of NCT to bid in base NCT units (10 ^ -18)
         """
-        min_allowed_bid = await self.client.bounties.parameters[chain].get('assertion_bid_minimum')
-        max_allowed_bid = await self.client.bounties.parameters[chain].get('assertion_bid_maximum')
+        min_allowed_bid, max_allowed_bid = self.client.bounties.parameters[chain].values('assertion_bid_minimum',
+                                                                                         'assertion_bid_maximum')
         if self.bid_strategy is not None:
             bid = await self.bid_strategy.bid(guid,
                                               mask,
@@ -139,23 +149,24 @@ class AbstractMicroengine(object):
             (list(bool), list(bool), list(str)): Tuple of mask bits, verdicts, and metadatas
         """
         async def fetch_and_scan(artifact_metadata, index):
-            content = await self.client.get_artifact(uri, index)
-            if not self.bounty_filter.is_allowed(artifact_metadata):
-                return ScanResult()
+            result = self.scanner.lookup_verdict(artifact_metadata) if self.verdict_lookup else None
+            if result is None:
+                content = await self.client.get_artifact(uri, index)
+                if not self.bounty_filter.is_allowed(artifact_metadata) or content is None:
+                    return ScanResult()
 
-            if content is not None:
+                scan = self.scan_batcher.scan if self.scan_batcher is not None else self.scan
                 try:
-                    result = await self.scan(guid,
-                                             artifact_type,
-                                             artifact_type.decode_content(content),
-                                             artifact_metadata,
-                                             chain)
+                    pending = scan(guid, artifact_type, artifact_type.decode_content(content), artifact_metadata, chain)
+                    result = await within_deadline('scan', pending, ScanResult())
                 except DecodeError:
-                    result = ScanResult()
+                    return ScanResult()
+            elif not self.bounty_filter.is_allowed(artifact_metadata):
+                return ScanResult()
 
-                if result.bit:
-                    result.confidence = self.confidence_modifier.modify(artifact_metadata, result.confidence)
-                    return result
+            if result.bit:
+                result.confidence = self.confidence_modifier.modify(artifact_metadata, result.confidence)
+                return result
 
             return ScanResult()
 
@@ -178,12 +189,20 @@ class AbstractMicroengine(object):
         Args:
             chain (str): Chain we are operating on.
         """
-        if self.scanner is not None and not await self.scanner.setup():
-            raise FatalError('Scanner setup failed', 1)
+        if self.scanner is not None:
+            if not await self.scanner.setup():
+                raise FatalError('Scanner setup failed', 1)
+
+            try:
+                await self.scanner.warm_scan_pool()
+            except ScannerSetupFailedError as e:
+                raise FatalError('Scanner process setup failed', 1) from e
 
     async def __handle_stop(self):
         if self.scanner is not None:
             await self.scanner.teardown()
+            # In case teardown is overridden without calling super
+            self.scanner.stop_scan_pool()
 
     async def __handle_deprecated(self, rollover, block_number, txhash, chain):
         asyncio.get_event_loop().create_task(self.client.bounties.settle_all_bounties(chain))
@@ -223,7 +242,12 @@ class AbstractMicroengine(object):
         duration = expiration - block_number
 
         async with self.client.liveness_recorder.waiting_task(guid, block_number):
-            results = await self.fetch_and_scan_all(guid, artifact_type, uri, duration, metadata, chain)
+            # Artifacts not fetched and scanned in time are left out, so the rest can still be asserted on
+            deadline = Deadline.for_blocks(duration, self.client.block_timer.block_time(chain))
+            with deadline.activate():
+                results = await self.fetch_and_scan_all(guid, artifact_type, uri, duration, metadata, chain)
+
+            logger.debug('Scanned bounty %s', guid, extra={'extra': deadline.stats()})
             mask = [r.bit for r in results]
             verdicts = [r.verdict for r in results]
             confidences = [r.confidence for r in results]
@@ -239,9 +263,8 @@ class AbstractMicroengine(object):
             if not any(mask):
                 return []
 
-            assertion_fee = await self.client.bounties.parameters[chain].get('assertion_fee')
-            assertion_reveal_window = await self.client.bounties.parameters[chain].get('assertion_reveal_window')
-            arbiter_vote_window = await self.client.bounties.parameters[chain].get('arbiter_vote_window')
+            assertion_fee, assertion_reveal_window, arbiter_vote_window = self.client.bounties.parameters[chain].values(
+                'assertion_fee', 'assertion_reveal_window', 'arbiter_vote_window')
 
             bid = await self.bid(guid, mask, verdicts, confidences, metadatas, chain)
             try:
@@ -258,7 +281,16 @@ class AbstractMicroengine(object):
                                                                               metadata=combined_metadata)
             except InvalidMetadataError:
                 logger.exception('Received invalid metadata')
+                self.client.balances.refund(assertion_fee + sum(bid), chain)
                 return []
+            except BaseException:
+                self.client.balances.refund(assertion_fee + sum(bid), chain)
+                raise
+
+            if assertions:
+                self.client.balances.confirm(assertion_fee + sum(bid), chain)
+            else:
+                self.client.balances.refund(assertion_fee + sum(bid), chain)
 
         for a in assertions:
             ra = RevealAssertion(guid, a['index'], nonce, verdicts, combined_metadata)
@@ -292,6 +324,8 @@ class AbstractMicroengine(object):
         return await self.client.bounties.post_reveal(bounty_guid, index, nonce, verdicts, metadata, chain)
 
     async def __handle_quorum_reached(self, bounty_guid, block_number, txhash, chain):
+        # Settling now, so the settle scheduled for the end of the vote window is no longer needed
+        self.client.unschedule(SettleBounty(bounty_guid), chain)
         return await self.__settle_bounty(bounty_guid, chain)
 
     async def __handle_settle_bounty(self, bounty_guid, chain):
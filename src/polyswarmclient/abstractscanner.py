@@ -1,16 +1,127 @@
 import asyncio
 import enum
+import hashlib
 import logging
+import os
 import platform
+import time
 import warnings
-from concurrent.futures import Executor
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional
 
 from polyswarmartifact.schema.verdict import Verdict
-from polyswarmclient.exceptions import ScannerSetupFailedError
+from polyswarmclient.deadline import current_deadline
+from polyswarmclient.exceptions import DeadlineExceededError, ScannerSetupFailedError
+from polyswarmclient.metrics import LatencyHistogram
+from polyswarmclient.verdictcache import VerdictCache, VERDICT_CACHE_KEY
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Before Python 3.8 artifacts are pickled to scan processes instead
+    shared_memory = None
 
 logger = logging.getLogger(__name__)  # Initialize logger
 
+# Pool sync scans run in, 'thread' or 'process', used unless the scanner overrides get_executor
+SCAN_EXECUTOR = os.environ.get('SCAN_EXECUTOR', 'thread')
+# Workers in the scan pool
+SCAN_WORKERS = int(os.environ.get('SCAN_WORKERS', 4))
+# Smallest artifact ScanMode.PROCESS hands to workers through shared memory, smaller ones are cheaper to pickle
+SCAN_SHARED_MEMORY_MIN_SIZE = int(os.environ.get('SCAN_SHARED_MEMORY_MIN_SIZE', 64 * 1024))
+
+# Scanner of a ScanMode.PROCESS worker, set once by the pool initializer
+_process_scanner = None
+
+
+def _timed_call(submitted, deadline, fn, *args):
+    # Runs in the pool, time.time() rather than a monotonic clock so process workers can compare it
+    wait = time.time() - submitted
+    if deadline is None:
+        return wait, fn(*args)
+
+    # Skip scans whose bounty ran out of time while they were queued
+    if deadline.expired:
+        raise DeadlineExceededError
+
+    with deadline.activate():
+        return wait, fn(*args)
+
+
+def _init_process_scanner(scanner):
+    global _process_scanner
+    _process_scanner = scanner
+    if not scanner.setup_process():
+        raise ScannerSetupFailedError
+
+
+def _process_scanner_ready():
+    return os.getpid()
+
+
+def _content_hash(content):
+    # URL artifacts are decoded to str
+    if isinstance(content, str):
+        content = content.encode()
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def _scan_in_process(handle, guid, artifact_type, metadata, chain):
+    """Scan an artifact in a ScanMode.PROCESS worker
+
+    Args:
+        handle ((str, int, bytes)): Shared memory name and size, or None and the content itself
+    """
+    name, size, content = handle
+    if name is None:
+        return _process_scanner.scan_sync(guid, artifact_type, content, metadata, chain)
+
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf[:size]
+    try:
+        return _process_scanner.scan_sync(guid, artifact_type, view, metadata, chain)
+    finally:
+        view.release()
+        try:
+            shm.close()
+        except BufferError:
+            logger.warning('scan_sync kept a view of artifact %s, leaving it mapped', name)
+
+
+class SharedArtifact:
+    """Artifact content copied into shared memory once, so a scan process can read it without it being pickled
+
+    Content too small to be worth it, text such as URLs, or with no shared memory support, is handed over as is.
+
+    Args:
+        content (bytes): Artifact content
+        min_size (int): Smallest content to put in shared memory
+    """
+
+    def __init__(self, content, min_size=SCAN_SHARED_MEMORY_MIN_SIZE):
+        self.shm = None
+        self.handle = (None, 0, content)
+        # scan_sync gets text artifacts as str, not as a view of their bytes
+        binary = isinstance(content, (bytes, bytearray, memoryview))
+        if shared_memory is not None and binary and len(content) >= max(1, min_size):
+            self.shm = shared_memory.SharedMemory(create=True, size=len(content))
+            self.shm.buf[:len(content)] = content
+            self.handle = (self.shm.name, len(content), None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
 
 class ScanResult(object):
     """Results from scanning one artifact"""
@@ -33,6 +144,98 @@ class ScanResult(object):
         return '<ScanResult bit={}, verdict={}, confidence={}, metadata={}>'.format(self.bit, self.verdict,
                                                                                     self.confidence, self.metadata)
 
+    def to_dict(self):
+        return {'bit': self.bit, 'verdict': self.verdict, 'confidence': self.confidence, 'metadata': self.metadata}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['bit'], d['verdict'], d['confidence'], d['metadata'])
+
+
+class ScanPool:
+    """Long lived pool that sync scans run in, separate from the event loop default executor
+
+    Tracks how many scans are waiting for a worker, and how long they waited.
+
+    Args:
+        executor (Executor): Pool to run scans in
+        workers (int): Workers in the pool
+    """
+
+    def __init__(self, executor, workers):
+        self.executor = executor
+        self.workers = workers
+        self.in_flight = 0
+        self.max_queued = 0
+        self.waits = LatencyHistogram()
+
+    @classmethod
+    def create(cls, kind=SCAN_EXECUTOR, workers=SCAN_WORKERS):
+        """
+        Args:
+            kind (str): 'thread' or 'process'
+            workers (int): Workers in the pool
+        Returns:
+            (ScanPool): New pool
+        """
+        if kind == 'thread':
+            return cls(ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan'), workers)
+        elif kind == 'process':
+            return cls(ProcessPoolExecutor(max_workers=workers), workers)
+        else:
+            raise ValueError('Invalid scan executor {0}'.format(kind))
+
+    @property
+    def queued(self):
+        """Scans submitted that no worker has picked up yet"""
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, fn, *args):
+        """Run a function in the pool
+
+        Args:
+            fn (function): Function to run, picklable for a process pool
+            args: Arguments to fn
+        Returns:
+            Result of fn
+        """
+        loop = asyncio.get_event_loop()
+        self.in_flight += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            wait, result = await loop.run_in_executor(self.executor, _timed_call, time.time(), current_deadline(), fn,
+                                                      *args)
+        except Exception:
+            self.waits.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self.waits.observe(max(0.0, wait))
+        return result
+
+    def shutdown(self):
+        """Shut down the executor once running scans finish, waiting in the default executor if the loop is running
+
+        Returns:
+            (asyncio.Future): Done once the executor is shut down, None if it already is
+        """
+        loop = asyncio.get_event_loop()
+        if loop.is_running():
+            # Waiting here would block the event loop until every running scan finished
+            return loop.run_in_executor(None, self.executor.shutdown)
+
+        self.executor.shutdown(wait=True)
+        return None
+
+    def stats(self):
+        """
+        Returns:
+            (dict): Workers, scans in flight and queued, and a histogram of time spent queued
+        """
+        return {'workers': self.workers, 'in_flight': self.in_flight, 'queued': self.queued,
+                'max_queued': self.max_queued, 'wait': self.waits.asdict()}
+
 
 class ScanMode(enum.Enum):
     """
@@ -40,28 +243,53 @@ class ScanMode(enum.Enum):
     """
     SYNC = 0
     ASYNC = 1
+    PROCESS = 2
 
 
 class AbstractScanner:
     """
     Base `Scanner` class. To be overwritten with other scanning logic.
 
-    This class offers two scan options, which can be specified by passing a ScanMode enum value as `mode`.
+    This class offers three scan options, which can be specified by passing a ScanMode enum value as `mode`.
     It uses asynchronous scan by default.
 
     The function `scan_async` is a coroutine function where everything called from this function must be async compatible,
     That means it uses only non-blocking IO, and runs nothing cpu-bound, like hash functions.
 
     The function `scan_sync` is a synchronous function where anything goes.
-    It is called in a ThreadPoolExecutor so it is compatible with the worker that uses asyncio.
+    It is called in a scanner owned pool, so it is compatible with the worker that uses asyncio.
+    The pool is started by `setup()`, or the first sync scan, and shut down by `teardown()`.
+    It is a pool of `workers` threads or processes as chosen by `executor_type`, unless `get_executor` returns one.
+
+    `ScanMode.PROCESS` runs `scan_sync` in `workers` processes forked once the scanner is set up, for CPU bound scans.
+    Each process gets a copy of the scanner, then runs `setup_process()` to load anything that cannot be copied.
+    Artifacts are handed over in shared memory, and `scan_sync` gets a read only memoryview instead of bytes.
+    A crashed process is replaced by restarting the pool, and the scan retried once.
+
+    Scanners that return a version from `cache_version()` have the results they assert on cached by artifact sha256,
+    so the same artifact in a later bounty is answered without scanning it again, until the version changes.
+    Instances configured to scan differently need their own `cache_key` if they share a persistent cache.
+
+    Scans for a bounty run under its deadline, and are abandoned for an empty result when it passes.
+    `polyswarmclient.deadline.current_deadline()` returns it in `scan_async` and `scan_sync` alike,
+    so long scans can check `remaining()` and return what they have early.
 
     Overwriting `scan` directly is deprecated.
     """
-    def __init__(self, mode: ScanMode = ScanMode.ASYNC):
+    def __init__(self, mode: ScanMode = ScanMode.ASYNC, executor_type: str = SCAN_EXECUTOR,
+                 workers: int = SCAN_WORKERS, cache_key: str = VERDICT_CACHE_KEY):
         """
         :param mode: ScanMode determines sync or async execution
+        :param executor_type: 'thread' or 'process', the pool sync scans run in
+        :param workers: Workers in the pool sync scans run in
+        :param cache_key: Configuration of this instance, keeps its cached results apart from other configurations
         """
         self.mode = mode
+        self.executor_type = executor_type
+        self.workers = workers
+        self.scan_pool = None
+        name = '{0}.{1}'.format(type(self).__module__, type(self).__qualname__)
+        self.verdict_cache = VerdictCache('{0}:{1}'.format(name, cache_key) if cache_key else name)
         self.system = platform.system()
         self.machine = platform.machine()
 
@@ -74,6 +302,21 @@ class AbstractScanner:
 
         This is run immediately after the Scanner class is instantiated and before any calls to the scan() method.
         This can be called multiple times, due to exception handling restarting the worker/microengine/arbiter
+        Call `super().setup()` to start the sync scan pool up front, otherwise it starts on the first sync scan.
+
+        Returns:
+            status (bool): Did setup complete successfully?
+        """
+        if self.mode == ScanMode.SYNC:
+            self.start_scan_pool()
+
+        return True
+
+    def setup_process(self):
+        """Override this method to prepare each ScanMode.PROCESS worker, in the worker process.
+
+        The worker holds a copy of the scanner as it was after `setup()`.
+        Use this for state that cannot be copied to a process, like open handles or some compiled rules.
 
         Returns:
             status (bool): Did setup complete successfully?
@@ -86,18 +329,138 @@ class AbstractScanner:
 
         This can be called multiple times, due to exception handling restarting the worker/microengine/arbiter
         There is an expectation that calling `setup()` again will put the AbstractScanner implementation back into working order
+        Call `super().teardown()` to shut down the sync scan pool.
         """
-        pass
+        shutdown = self.stop_scan_pool()
+        if shutdown is not None:
+            await shutdown
+
+    def cache_version(self):
+        """Override this to cache scan results, returning a version of the engine and signatures in use
+
+        Results are reused for as long as this returns the same version, so it must change whenever the same artifact
+        could scan differently. It is called before each scan, and should be cheap.
+
+        Returns:
+            (str): Version token, None to cache nothing
+        """
+        return None
+
+    def lookup_verdict(self, metadata):
+        """Look up a cached result by the sha256 in artifact metadata, before the artifact is fetched
+
+        Metadata is set by the bounty poster, so this only answers if the cache is configured to trust it.
+
+        Args:
+            metadata (dict): Metadata dict from the ambassador
+        Returns:
+            ScanResult: Cached result, or None to fetch and scan the artifact
+        """
+        if not self.verdict_cache.trust_metadata or not isinstance(metadata, dict):
+            return None
+
+        sha256 = metadata.get('sha256')
+        version = self.cache_version()
+        if not isinstance(sha256, str) or version is None:
+            return None
+
+        cached = self.verdict_cache.get(sha256.lower(), version)
+        return ScanResult.from_dict(cached) if cached is not None else None
+
+    async def verdict_key(self, content, metadata=None):
+        """sha256 that results of scanning content are cached under
+
+        This is the sha256 in artifact metadata if the cache is configured to trust it, otherwise content is hashed
+        in the default executor, off the event loop.
+
+        Args:
+            content (bytes): Content of the artifact to scan
+            metadata (dict): Metadata dict from the ambassador
+        Returns:
+            (str): Hex sha256, or None if the scanner caches nothing
+        """
+        if self.cache_version() is None or not self.verdict_cache.enabled:
+            return None
+
+        if self.verdict_cache.trust_metadata and isinstance(metadata, dict) and isinstance(metadata.get('sha256'), str):
+            return metadata['sha256'].lower()
+
+        return await asyncio.get_event_loop().run_in_executor(None, _content_hash, content)
+
+    def cached_verdict(self, sha256):
+        """
+        Args:
+            sha256 (str): Key from `verdict_key`
+        Returns:
+            ScanResult: Cached result of scanning the artifact, or None to scan it
+        """
+        version = self.cache_version()
+        if sha256 is None or version is None:
+            return None
+
+        cached = self.verdict_cache.get(sha256, version)
+        return ScanResult.from_dict(cached) if cached is not None else None
+
+    def remember_verdict(self, sha256, result, version=None):
+        """Cache the result of scanning an artifact, if the scanner caches and asserted on it
+
+        Args:
+            sha256 (str): Key from `verdict_key`
+            result (ScanResult): Result of the scan
+            version (str): Version the scan started with, the result is dropped if it has changed since
+        """
+        current = self.cache_version()
+        if sha256 is None or current is None or version not in (None, current):
+            return
+
+        if result is not None and result.bit:
+            self.verdict_cache.put(sha256, current, result.to_dict())
 
     async def scan(self, guid, artifact_type, content, metadata, chain):
+        version = self.cache_version()
+        sha256 = await self.verdict_key(content, metadata)
+        cached = self.cached_verdict(sha256)
+        if cached is not None:
+            return cached
 
+        result = await self.__scan_uncached(guid, artifact_type, content, metadata, chain)
+        # Signatures updated mid scan leave the result to the old version, which is no longer cached
+        self.remember_verdict(sha256, result, version)
+        return result
+
+    async def __scan_uncached(self, guid, artifact_type, content, metadata, chain):
         if self.mode == ScanMode.ASYNC:
             return await self.scan_async(guid, artifact_type, content, metadata, chain)
         elif self.mode == ScanMode.SYNC:
             return await self.__execute_scan_sync(guid, artifact_type, content, metadata, chain)
+        elif self.mode == ScanMode.PROCESS:
+            return await self.__execute_scan_process(guid, artifact_type, content, metadata, chain)
         else:
             raise ValueError('Invalid scan mode')
 
+    async def scan_batch(self, guid, artifact_type, contents, metadatas, chain):
+        """Override this to scan several artifacts of one bounty at once, amortising work across them
+
+        Microengines, arbiters and workers collect artifacts into batches for scanners that override this,
+        others have each artifact passed to `scan()` on its own. By default this does the same.
+
+        Args:
+            guid (str): GUID of the bounty under analysis
+            artifact_type (ArtifactType): Artifact type for the bounty being scanned
+            contents (list[bytes]): Content of each artifact to scan
+            metadatas (list[dict]): Metadata dict of each artifact from the ambassador
+            chain (str): What chain are we operating on
+        Returns:
+            list[ScanResult]: Result of each scan, in the same order as contents
+        """
+        return await asyncio.gather(*[self.scan(guid, artifact_type, content, metadata, chain)
+                                      for content, metadata in zip(contents, metadatas)])
+
+    @property
+    def implements_scan_batch(self):
+        """Does this scanner override `scan_batch`"""
+        return type(self).scan_batch is not AbstractScanner.scan_batch
+
     async def scan_async(self, guid, artifact_type, content, metadata, chain):
         """Override this to implement custom asynchronous scanning logic
 
@@ -113,17 +476,99 @@ class AbstractScanner:
         raise NotImplementedError("Must implement scan_async when using ScanMode.ASYNC")
 
     async def __execute_scan_sync(self, guid, artifact_type, content, metadata, chain):
-        loop = asyncio.get_event_loop()
-        executor = self.get_executor()
-        if executor:
-            with executor as pool:
-                return await loop.run_in_executor(pool, self.scan_sync, guid, artifact_type, content, metadata, chain)
-        else:
-            return await loop.run_in_executor(None, self.scan_sync, guid, artifact_type, content, metadata, chain)
+        return await self.start_scan_pool().run(self.scan_sync, guid, artifact_type, content, metadata, chain)
+
+    async def __execute_scan_process(self, guid, artifact_type, content, metadata, chain):
+        with SharedArtifact(content) as artifact:
+            for attempt in range(2):
+                scan_pool = self.start_scan_pool()
+                try:
+                    return await scan_pool.run(_scan_in_process, artifact.handle, guid, artifact_type, metadata, chain)
+                except BrokenProcessPool:
+                    # Every scan in flight sees the crash, only the first restarts the pool
+                    if scan_pool is self.scan_pool:
+                        logger.error('Scan process exited unexpectedly, restarting the scan pool')
+                        self.stop_scan_pool()
+
+                    if attempt:
+                        raise
+
+    async def warm_scan_pool(self):
+        """Start the scan pool, and for ScanMode.PROCESS wait until every worker process has run setup_process()
+
+        Call after `setup()`, so the processes copy the scanner once it is set up.
+
+        Raises:
+            ScannerSetupFailedError: If a worker process failed `setup_process()`
+        """
+        if self.mode == ScanMode.ASYNC:
+            return
+
+        scan_pool = self.start_scan_pool()
+        if self.mode == ScanMode.PROCESS:
+            try:
+                await asyncio.gather(*[scan_pool.run(_process_scanner_ready) for _ in range(scan_pool.workers)])
+            except BrokenProcessPool as e:
+                self.stop_scan_pool()
+                raise ScannerSetupFailedError from e
 
     def get_executor(self) -> Optional[Executor]:
+        """Override this to run sync scans in a custom executor, not used for ScanMode.PROCESS
+
+        Called once each time the scan pool starts, the scanner shuts the executor down in `teardown()`.
+        Queued scans are counted against `workers`, so the executor should run that many at once.
+
+        Returns:
+            Executor: Executor to run `scan_sync` in, or None for a pool as configured by `executor_type` and `workers`
+        """
+        return None
+
+    def start_scan_pool(self) -> ScanPool:
+        """Start the pool sync scans run in, if it is not running
+
+        Returns:
+            ScanPool: The running pool
+        """
+        if self.scan_pool is not None:
+            return self.scan_pool
+
+        if self.mode == ScanMode.PROCESS:
+            if shared_memory is not None:
+                # Workers attaching to an artifact register it with the resource tracker, start it now so they share
+                # ours, rather than each starting one that unlinks artifacts it saw when the worker exits
+                resource_tracker.ensure_running()
+
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_process_scanner,
+                                           initargs=(self,))
+            self.scan_pool = ScanPool(executor, self.workers)
+        else:
+            executor = self.get_executor()
+            if executor is None:
+                self.scan_pool = ScanPool.create(self.executor_type, self.workers)
+            else:
+                self.scan_pool = ScanPool(executor, self.workers)
+
+        return self.scan_pool
+
+    def stop_scan_pool(self):
+        """Shut down the pool sync scans run in, without blocking the event loop on running scans
+
+        Returns:
+            (asyncio.Future): Done once running scans finished, None if there is nothing to wait for
+        """
+        if self.scan_pool is not None:
+            scan_pool, self.scan_pool = self.scan_pool, None
+            return scan_pool.shutdown()
+
         return None
 
+    def scan_pool_stats(self):
+        """
+        Returns:
+            (dict): Stats of the sync scan pool, None if it is not running
+        """
+        return self.scan_pool.stats() if self.scan_pool is not None else None
+
     def scan_sync(self, guid, artifact_type, content, metadata, chain):
         """Override this to implement custom synchronous scanning logic
 
@@ -138,10 +583,21 @@ class AbstractScanner:
         """
         raise NotImplementedError("Must implement scan_sync when using ScanMode.SYNC")
 
+    def __getstate__(self):
+        # Process pools pickle the scanner along with scan_sync, leave the pool and the cache behind
+        state = self.__dict__.copy()
+        state['scan_pool'] = None
+        state['verdict_cache'] = None
+        return state
+
     async def __aenter__(self):
         if not await self.setup():
             raise ScannerSetupFailedError
+
+        await self.warm_scan_pool()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.teardown()
+        # In case teardown is overridden without calling super
+        self.stop_scan_pool()
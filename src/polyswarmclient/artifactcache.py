@@ -0,0 +1,238 @@
+import asyncio
+import cachetools
+import hashlib
+import logging
+import os
+import tempfile
+
+from polyswarmclient.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Memory budget in bytes, 0 disables the memory tier, which holds up to this much of the process heap once full
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', 0))
+# Shared directory for the disk tier, unset disables the disk tier
+ARTIFACT_CACHE_DIR = os.environ.get('ARTIFACT_CACHE_DIR')
+# Disk budget in bytes, 0 means no limit
+ARTIFACT_CACHE_DISK_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_DISK_MAX_BYTES', 0))
+# Number of (uri, index) -> hash mappings to remember
+MAX_KEYS = 16 * 1024
+# Number of disk stores between checks of the disk budget
+PRUNE_INTERVAL = 64
+
+
+class ArtifactCache:
+    """Content addressed artifact cache, keyed by (uri, index) and by sha256 of the content
+
+    The memory tier is an LRU bounded by the total size of the cached artifacts, which stay resident until evicted.
+    Both tiers are off unless configured, and with neither enabled artifacts are fetched on every request.
+    The optional disk tier stores each artifact once under its sha256, and is safe to share between processes on a host,
+    since every file is written to a temporary name, then atomically renamed into place.
+    Concurrent requests for an artifact that is not cached are collapsed into one fetch.
+
+    Args:
+        max_bytes (int): Memory budget in bytes, 0 disables the memory tier
+        directory (str): Directory for the disk tier, None disables the disk tier
+        max_disk_bytes (int): Disk budget in bytes, 0 means no limit
+    """
+    def __init__(self, max_bytes=ARTIFACT_CACHE_MAX_BYTES, directory=ARTIFACT_CACHE_DIR,
+                 max_disk_bytes=ARTIFACT_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.memory = cachetools.LRUCache(maxsize=max_bytes, getsizeof=len) if max_bytes > 0 else None
+        self.hashes = cachetools.LRUCache(maxsize=MAX_KEYS)
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.in_flight = SingleFlight()
+        self.stores = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.directory is not None:
+            os.makedirs(os.path.join(self.directory, 'objects'), exist_ok=True)
+            os.makedirs(os.path.join(self.directory, 'keys'), exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.memory is not None or self.directory is not None
+
+    async def get(self, uri, index, fetch):
+        """Get an artifact from the cache, fetching and storing it on a miss
+
+        Args:
+            uri (str): Artifact set URI
+            index (int): Index of the artifact in the set
+            fetch (coroutine function): Called without arguments to retrieve the artifact on a miss, returns None on failure
+        Returns:
+            (bytes): Content of the artifact, or None if it could not be fetched
+        """
+        # Concurrent requests for one artifact share a download even when nothing is kept
+        if not self.enabled:
+            return await self.in_flight.run((uri, index), fetch)
+
+        content = await self.lookup(uri, index)
+        if content is not None:
+            self.hits += 1
+            return content
+
+        return await self.in_flight.run((uri, index), self.__fetch_and_store, uri, index, fetch)
+
+    async def lookup(self, uri, index):
+        """Get an artifact by (uri, index) without fetching it
+
+        Returns:
+            (bytes): Content of the artifact, or None if it is not cached
+        """
+        sha256 = self.hashes.get((uri, index))
+        if sha256 is None and self.directory is not None:
+            sha256 = await self.__run_in_executor(self.__read_key, uri, index)
+            # Only touched on the event loop, LRUCache is not thread safe
+            if sha256 is not None:
+                self.hashes[(uri, index)] = sha256
+
+        if sha256 is None:
+            return None
+
+        return await self.get_by_hash(sha256)
+
+    async def get_by_hash(self, sha256):
+        """Get an artifact by the sha256 of its content
+
+        Args:
+            sha256 (str): Hex digest of the artifact
+        Returns:
+            (bytes): Content of the artifact, or None if it is not cached
+        """
+        if self.memory is not None:
+            content = self.memory.get(sha256)
+            if content is not None:
+                return content
+
+        if self.directory is None:
+            return None
+
+        content = await self.__run_in_executor(self.__read_object, sha256)
+        if content is not None:
+            self.__store_memory(sha256, content)
+
+        return content
+
+    async def put(self, uri, index, content):
+        """Add an artifact to the cache
+
+        Args:
+            uri (str): Artifact set URI
+            index (int): Index of the artifact in the set
+            content (bytes): Content of the artifact
+        Returns:
+            (str): sha256 hex digest of the content
+        """
+        sha256 = await self.__run_in_executor(self.__hash, content)
+        self.hashes[(uri, index)] = sha256
+        self.__store_memory(sha256, content)
+
+        if self.directory is not None and await self.__run_in_executor(self.__write_disk, uri, index, sha256, content):
+            self.stores += 1
+            if self.max_disk_bytes > 0 and self.stores % PRUNE_INTERVAL == 0:
+                await self.__run_in_executor(self.prune)
+
+        return sha256
+
+    async def __fetch_and_store(self, uri, index, fetch):
+        self.misses += 1
+        content = await fetch()
+        if content is not None:
+            await self.put(uri, index, content)
+
+        return content
+
+    def __store_memory(self, sha256, content):
+        # LRUCache refuses single values larger than the whole budget
+        if self.memory is not None and len(content) <= self.max_bytes:
+            self.memory[sha256] = content
+
+    async def __run_in_executor(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    @staticmethod
+    def __hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def __key_path(self, uri, index):
+        name = hashlib.sha256(f'{uri}/{index}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, 'keys', name)
+
+    def __object_path(self, sha256):
+        return os.path.join(self.directory, 'objects', sha256)
+
+    def __read_key(self, uri, index):
+        try:
+            with open(self.__key_path(uri, index), 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def __read_object(self, sha256):
+        path = self.__object_path(sha256)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            # Refresh the modified time, so pruning evicts the least recently used artifacts first
+            os.utime(path)
+        except OSError:
+            return None
+
+        return content
+
+    def __write_disk(self, uri, index, sha256, content):
+        try:
+            if not os.path.exists(self.__object_path(sha256)):
+                self.__write_atomic(self.__object_path(sha256), content)
+            self.__write_atomic(self.__key_path(uri, index), sha256.encode('utf-8'))
+        except OSError:
+            logger.exception('Failed to write artifact %s to the disk cache', sha256)
+            return False
+
+        return True
+
+    @staticmethod
+    def __write_atomic(path, content):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with open(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except OSError:
+            os.unlink(tmp)
+            raise
+
+    def prune(self):
+        """Remove the least recently used artifacts from the disk tier until it fits in the disk budget
+
+        Key files pointing at removed artifacts are left behind, and are treated as misses.
+        """
+        if self.directory is None or self.max_disk_bytes <= 0:
+            return
+
+        objects = os.path.join(self.directory, 'objects')
+        entries = []
+        total = 0
+        with os.scandir(objects) as it:
+            for entry in it:
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                # Another process may have pruned it already
+                pass
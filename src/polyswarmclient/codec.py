@@ -0,0 +1,109 @@
+import json
+import logging
+
+from aiohttp import ContentTypeError
+
+logger = logging.getLogger(__name__)
+
+# JSON codec for the hot paths, using orjson when it is installed, and the standard library otherwise.
+# orjson only handles 64 bit integers, while polyswarmd sends token amounts in base units that can be larger,
+# so any document that may hold such an integer is handed to the standard library instead.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so callers only need to catch one type
+JSONDecodeError = json.JSONDecodeError
+
+# 19 digits in a row may not fit in 64 bits, and orjson would decode it to a lossy float.
+# Mapping every digit to 0 first lets a plain substring search find those runs, much faster than a regex
+DIGITS = bytes(ord('0') if ord('0') <= c <= ord('9') else ord(' ') for c in range(256))
+MAYBE_LARGE_INT = b'0' * 19
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """Decode a JSON document
+
+    Args:
+        data (bytes|bytearray|memoryview|str): Encoded document, bytes are decoded without an intermediate str
+    Returns:
+        Decoded document
+    Raises:
+        JSONDecodeError: If the document is not valid JSON
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+
+    if orjson is not None:
+        encoded = data.encode('utf-8') if isinstance(data, str) else data
+        if MAYBE_LARGE_INT not in encoded.translate(DIGITS):
+            return orjson.loads(encoded)
+
+    return json.loads(data)
+
+
+def dumpb(obj):
+    """Encode an object as a UTF-8 JSON document
+
+    Args:
+        obj: Object to encode
+    Returns:
+        (bytes): Encoded document
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # Integers over 64 bits, non str keys, and other types orjson does not support
+            pass
+
+    return json.dumps(obj).encode('utf-8')
+
+
+def dumps(obj):
+    """Encode an object as a JSON document
+
+    Args:
+        obj: Object to encode
+    Returns:
+        (str): Encoded document
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            pass
+
+    return json.dumps(obj)
+
+
+async def read_json(response, content_type='application/json'):
+    """Read and decode the JSON body of an aiohttp response, like `ClientResponse.json` but straight from bytes
+
+    Args:
+        response (aiohttp.ClientResponse): Response to read
+        content_type (str): Expected content type, None to skip the check
+    Returns:
+        Decoded body, or None if the body is empty
+    Raises:
+        aiohttp.ContentTypeError: If the response has an unexpected content type
+        JSONDecodeError: If the body is not valid JSON
+    """
+    body = await response.read()
+
+    if content_type:
+        ctype = response.headers.get('Content-Type', '').lower()
+        if content_type not in ctype:
+            raise ContentTypeError(response.request_info, response.history,
+                                   message=f'Attempt to decode JSON with unexpected mimetype: {ctype}',
+                                   headers=response.headers)
+
+    body = body.strip()
+    if not body:
+        return None
+
+    return loads(body)
@@ -0,0 +1,211 @@
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import time
+
+from polyswarmclient.exceptions import DeadlineExceededError
+
+try:
+    import contextvars
+except ImportError:
+    # Python 3.6 has no context variables, so nothing below a bounty handler sees its deadline
+    contextvars = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds per block assumed on a chain until its block time has been measured
+BLOCK_TIME = float(os.environ.get('BLOCK_TIME', 1))
+# Weight of each newly observed block interval in the block time estimate
+BLOCK_TIME_SMOOTHING = float(os.environ.get('BLOCK_TIME_SMOOTHING', 0.1))
+# Seconds kept back from a bounty deadline to bid and post the assertion or vote
+DEADLINE_RESERVE = float(os.environ.get('DEADLINE_RESERVE', 6))
+
+_current = contextvars.ContextVar('deadline', default=None) if contextvars is not None else None
+
+
+def current_deadline():
+    """
+    Returns:
+        (Deadline): Deadline of the bounty being worked on, or None if there is none
+    """
+    return _current.get() if _current is not None else None
+
+
+async def within_deadline(stage, coro, fallback=None):
+    """Await a stage under the current deadline, if there is one
+
+    Args:
+        stage (str): Name the time spent is accounted under
+        coro (coroutine): Stage to run
+        fallback: Result if the deadline passes first
+    Returns:
+        Result of coro, or fallback
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return await coro
+
+    return await deadline.run(stage, coro, fallback)
+
+
+class BlockTimer:
+    """Seconds per block on each chain, estimated from when its blocks arrive
+
+    Args:
+        default (float): Seconds per block until two blocks of a chain have been seen
+        smoothing (float): Weight of each new interval in the running estimate
+    """
+
+    def __init__(self, default=BLOCK_TIME, smoothing=BLOCK_TIME_SMOOTHING):
+        self.default = default
+        self.smoothing = smoothing
+        self.last = {}
+        self.estimates = {}
+
+    def observe(self, chain, number, now=None):
+        """Record a block arriving
+
+        Args:
+            chain (str): Chain the block is on
+            number (int): Block number
+            now (float): `time.monotonic()` it arrived at, defaults to now
+        """
+        now = time.monotonic() if now is None else now
+        last = self.last.get(chain)
+        if last is not None and number <= last[0]:
+            return
+
+        self.last[chain] = (number, now)
+        if last is None:
+            return
+
+        interval = (now - last[1]) / (number - last[0])
+        estimate = self.estimates.get(chain)
+        self.estimates[chain] = interval if estimate is None else estimate + self.smoothing * (interval - estimate)
+
+    def block_time(self, chain):
+        """
+        Returns:
+            (float): Estimated seconds per block on the chain
+        """
+        return self.estimates.get(chain, self.default)
+
+
+class StageBudget:
+    """Time spent in one stage of a bounty, summed over every artifact"""
+
+    def __init__(self):
+        self.runs = 0
+        self.spent = 0.0
+        self.timeouts = 0
+
+    def as_dict(self):
+        return {'runs': self.runs, 'spent': self.spent, 'timeouts': self.timeouts}
+
+
+class Deadline:
+    """Point in time a bounty has to be answered by, shared by every stage working on it
+
+    Fetches and scans run through `run` are cancelled once the deadline passes and replaced by a fallback result,
+    so the artifacts that finished in time can still be asserted on.
+    While a deadline is active, `current_deadline()` returns it in every task started under it,
+    and in `scan_sync` while it runs in the scan pool.
+
+    Args:
+        at (float): Deadline on the `time.monotonic()` clock
+    """
+
+    def __init__(self, at):
+        self.at = at
+        self.stages = {}
+
+    @classmethod
+    def after(cls, seconds):
+        """Deadline a number of seconds from now"""
+        return cls(time.monotonic() + seconds)
+
+    @classmethod
+    def never(cls):
+        return cls(math.inf)
+
+    @classmethod
+    def for_blocks(cls, blocks, block_time=BLOCK_TIME, reserve=DEADLINE_RESERVE):
+        """Deadline for work due a number of blocks from now, less the time kept back to post the result
+
+        Args:
+            blocks (int): Blocks until the result is due
+            block_time (float): Seconds per block
+            reserve (float): Seconds to keep back
+        Returns:
+            (Deadline): Deadline, or one that never passes if there is no time left to budget
+        """
+        seconds = blocks * block_time - reserve
+        if seconds <= 0:
+            # Better to try and maybe post late than to give up on work that could still make it
+            logger.warning('%s blocks of %.2f seconds leave nothing after the %s second reserve, running without a deadline',
+                           blocks, block_time, reserve)
+            return cls.never()
+
+        return cls.after(seconds)
+
+    def remaining(self):
+        """
+        Returns:
+            (float): Seconds left, 0 once the deadline has passed
+        """
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.at
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Make this the current deadline, for this task and the tasks it starts"""
+        if _current is None:
+            yield self
+            return
+
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    async def run(self, stage, coro, fallback=None):
+        """Run a stage, cancelling it if the deadline passes first
+
+        Args:
+            stage (str): Name the time spent is accounted under
+            coro (coroutine): Stage to run
+            fallback: Result if the deadline passes first
+        Returns:
+            Result of coro, or fallback
+        """
+        budget = self.stages.setdefault(stage, StageBudget())
+        budget.runs += 1
+        start = time.monotonic()
+        try:
+            return await asyncio.wait_for(coro, timeout=None if math.isinf(self.at) else self.remaining())
+        except (asyncio.TimeoutError, DeadlineExceededError):
+            budget.timeouts += 1
+            logger.warning('Deadline passed during %s, using fallback %s', stage, fallback)
+            return fallback
+        finally:
+            budget.spent += time.monotonic() - start
+
+    def stats(self):
+        """
+        Returns:
+            (dict): Seconds left, and runs, time spent and timeouts of each stage
+        """
+        return {
+            'remaining': self.remaining(),
+            'stages': {stage: budget.as_dict() for stage, budget in self.stages.items()},
+        }
+
+    def __getstate__(self):
+        # Scan processes only need to know when to stop, stage accounting stays in the parent
+        return {'at': self.at, 'stages': {}}
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Handlers allowed to wait or run per event type, before the websocket reader is made to wait
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', 1024))
+# Concurrent on_new_bounty handlers, 0 means no limit
+BOUNTY_CONCURRENCY = int(os.environ.get('BOUNTY_CONCURRENCY', 64))
+
+
+class Overflow:
+    """What to do with an event when its route is full"""
+    # Wait for room, slowing down the websocket reader
+    BLOCK = 'block'
+    # Discard the event, and count it as dropped
+    DROP = 'drop'
+
+
+class EventRoute(object):
+    """Bounded route from one polyswarmd event type to the Callback that handles it
+
+    Args:
+        name (str): Event type
+        callback (Callback): Callback to run for each event
+        concurrency (int): Maximum handlers running at once, 0 means no limit
+        queue_size (int): Maximum events waiting or running before the route is full
+        overflow (str): Overflow.BLOCK or Overflow.DROP
+    """
+    def __init__(self, name, callback, concurrency=0, queue_size=EVENT_QUEUE_SIZE, overflow=Overflow.BLOCK):
+        self.name = name
+        self.callback = callback
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.dispatched = 0
+        self.dropped = 0
+        self.failed = 0
+        self.running = 0
+        self.tasks = set()
+        self.queue = None
+        self.slots = None
+
+    @property
+    def depth(self):
+        """Events waiting for a handler"""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def full(self):
+        if self.concurrency > 0:
+            return self.queue is not None and self.queue.full()
+
+        return self.slots is not None and self.slots.locked()
+
+    async def put(self, kwargs):
+        """Queue an event for this route, waiting if it is full"""
+        if self.concurrency > 0:
+            if self.queue is None:
+                self.__start_workers()
+
+            await self.queue.put(kwargs)
+        else:
+            if self.slots is None:
+                self.slots = asyncio.Semaphore(self.queue_size)
+
+            await self.slots.acquire()
+            task = asyncio.get_event_loop().create_task(self.__handle(kwargs))
+            self.tasks.add(task)
+            task.add_done_callback(self.__finish)
+
+        self.dispatched += 1
+
+    def stop(self):
+        """Cancel every handler and worker of this route"""
+        for task in list(self.tasks):
+            task.cancel()
+
+        self.tasks.clear()
+        self.queue = None
+        self.slots = None
+
+    def stats(self):
+        return {
+            'concurrency': self.concurrency,
+            'depth': self.depth,
+            'running': self.running,
+            'dispatched': self.dispatched,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    def __start_workers(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_event_loop()
+        for _ in range(self.concurrency):
+            self.tasks.add(loop.create_task(self.__work(self.queue)))
+
+    async def __work(self, queue):
+        while True:
+            kwargs = await queue.get()
+            try:
+                await self.__handle(kwargs)
+            finally:
+                queue.task_done()
+
+    async def __handle(self, kwargs):
+        self.running += 1
+        try:
+            await self.callback.run(**kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            logger.exception('Error handling %s event', self.name)
+        finally:
+            self.running -= 1
+
+    def __finish(self, task):
+        self.tasks.discard(task)
+        if self.slots is not None:
+            self.slots.release()
+
+
+class EventDispatcher(object):
+    """Table driven dispatch of polyswarmd events to their callbacks
+
+    Each event type has its own bounded route, so a flood of one type cannot starve the others.
+    A full route either makes the websocket reader wait instead of spawning unbounded tasks, which holds back every
+    event type behind it, or drops the event. Routes whose handlers can run long should drop.
+    """
+    def __init__(self):
+        self.routes = {}
+        self.unknown = 0
+
+    def register(self, name, callback, concurrency=0, queue_size=EVENT_QUEUE_SIZE, overflow=Overflow.BLOCK):
+        """Route an event type to a callback
+
+        Args:
+            name (str): Event type
+            callback (Callback): Callback to run for each event
+            concurrency (int): Maximum handlers running at once, 0 means no limit
+            queue_size (int): Maximum events waiting or running before the route is full
+            overflow (str): Overflow.BLOCK to wait for room, or Overflow.DROP to discard events when full
+        """
+        if name in self.routes:
+            self.routes[name].stop()
+
+        self.routes[name] = EventRoute(name, callback, concurrency, queue_size, overflow)
+
+    def __contains__(self, name):
+        return name in self.routes
+
+    async def dispatch(self, name, kwargs):
+        """Hand an event to its route, waiting while the route is full unless it drops on overflow
+
+        Args:
+            name (str): Event type
+            kwargs (dict): Keyword arguments for the callback
+        Returns:
+            (bool): True if the event was queued, False if it was dropped or has no route
+        """
+        route = self.routes.get(name)
+        if route is None:
+            self.unknown += 1
+            return False
+
+        if route.overflow == Overflow.DROP and route.full():
+            route.dropped += 1
+            logger.warning('Dropping %s event, %s events are already pending', name, route.queue_size)
+            return False
+
+        await route.put(kwargs)
+        return True
+
+    def stop(self):
+        """Cancel all pending and running handlers"""
+        for route in self.routes.values():
+            route.stop()
+
+    def stats(self):
+        """Queue depth, running handlers and counters for each event type
+
+        Returns:
+            (dict): Event type to dict of stats
+        """
+        return {name: route.stats() for name, route in self.routes.items()}
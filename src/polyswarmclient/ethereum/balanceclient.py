@@ -1,27 +1,72 @@
 import logging
-import os
-
-import backoff
+import time
 
+from polyswarmclient.ethereum.balancetracker import BalanceTracker
 from polyswarmclient.exceptions import LowBalanceError
 
 logger = logging.getLogger(__name__)  # Initialize logger
-MAX_TRIES = int(os.environ.get('MAX_TRIES', 3))
 
 
 class BalanceClient(object):
     def __init__(self, client):
         self.__client = client
+        self.tracker = BalanceTracker(self.__fetch_nct_balance)
 
-    @backoff.on_exception(backoff.expo, LowBalanceError, max_tries=MAX_TRIES)
     async def raise_for_low_balance(self, request_nct, chain):
-        balance = await self.get_nct_balance(chain)
-        # If we don't have the balance, don't submit. Wait and try a few times, then skip
-        if balance < request_nct:
+        """Check the local balance covers a transaction, and debit it right away
+
+        Call `confirm` with the same amount once the transaction is mined, or `refund` if it is not sent or fails.
+
+        Args:
+            request_nct (int): NCT the transaction will spend
+            chain (str): Which chain to operate on
+        Raises:
+            LowBalanceError: If the balance is too low
+        """
+        balance = await self.tracker.available(chain)
+        if balance is None or balance < request_nct:
+            # The local balance may be missing transfers we did not see, check polyswarmd once before giving up
+            await self.tracker.reconcile(chain, max_age=1)
+            balance = self.tracker.balance(chain)
+
+        # If we don't have the balance, don't submit
+        if balance is None or balance < request_nct:
             logger.critical('Insufficient balance to send transaction on %s. Have %s NCT. Need %s NCT.', chain, balance,
                             request_nct)
             raise LowBalanceError
 
+        self.tracker.debit(request_nct, chain)
+
+    def confirm(self, request_nct, chain):
+        """Settle NCT debited by `raise_for_low_balance` for a transaction that was mined
+
+        Args:
+            request_nct (int): NCT passed to raise_for_low_balance
+            chain (str): Which chain to operate on
+        """
+        self.tracker.confirm(request_nct, chain)
+
+    def refund(self, request_nct, chain):
+        """Return NCT debited by `raise_for_low_balance` for a transaction that was not sent or failed
+
+        Args:
+            request_nct (int): NCT passed to raise_for_low_balance
+            chain (str): Which chain to operate on
+        """
+        self.tracker.refund(request_nct, chain)
+
+    def credit_transfers(self, transfers, chain):
+        """Credit the local balance with transfers to our account, such as bounty payouts
+
+        Args:
+            transfers (list[dict]): Transfer events from polyswarmd
+            chain (str): Which chain to operate on
+        """
+        account = self.__client.account.lower()
+        for transfer in transfers:
+            if transfer.get('to', '').lower() == account:
+                self.tracker.credit(int(transfer.get('value', 0)), chain)
+
     async def get_nct_balance(self, chain, api_key=None):
         """Get nectar balance from polyswarmd
 
@@ -31,11 +76,20 @@ class BalanceClient(object):
         Returns:
             Response JSON parsed from polyswarmd containing nectar balance
         """
+        started = time.monotonic()
+        balance = await self.__fetch_nct_balance(chain, api_key)
+        if balance is None:
+            return 0
+
+        self.tracker.update(chain, balance, started)
+        return balance
+
+    async def __fetch_nct_balance(self, chain, api_key=None):
         path = '/balances/{0}/nct'.format(self.__client.account)
         success, balance = await self.__client.make_request('GET', path, chain, api_key=api_key)
         if not success:
             logger.warning('Unable to get nectar balance for %s', self.__client.account)
-            return 0
+            return None
 
         return int(balance)
 
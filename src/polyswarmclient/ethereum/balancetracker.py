@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import time
+
+from collections import deque
+
+from polyswarmclient.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the local balance is reconciled with polyswarmd again, in the background
+BALANCE_RECONCILE_INTERVAL = float(os.environ.get('BALANCE_RECONCILE_INTERVAL', 60))
+
+
+class Debit:
+    """Funds committed to a transaction, and when it was mined"""
+
+    def __init__(self, amount):
+        self.amount = amount
+        self.confirmed_at = None
+
+
+class ChainBalance:
+    """Local balance of one chain"""
+
+    def __init__(self):
+        self.fetched = None
+        self.reconciled_at = 0.0
+        self.credits = deque()
+        self.debits = deque()
+
+
+class BalanceTracker:
+    """Local NCT balance for each chain, so balance checks do not wait on polyswarmd
+
+    The balance starts from polyswarmd, then funds we commit to bids, fees and bounties are debited as soon as they
+    are reserved, and transfers we receive are credited. A debit stays until its transaction is confirmed or fails.
+    A balance fetched from polyswarmd already includes the transactions mined before the fetch started,
+    so only debits pending or confirmed after that, and credits received after that, are applied to it.
+
+    Args:
+        fetch (coroutine function): Takes a chain, and returns the balance from polyswarmd or None on failure
+        interval (float): Seconds before reconciling with polyswarmd again
+    """
+
+    def __init__(self, fetch, interval=BALANCE_RECONCILE_INTERVAL):
+        self.fetch = fetch
+        self.interval = interval
+        self.chains = {}
+        self.in_flight = SingleFlight()
+        self.reconciles = 0
+
+    def balance(self, chain):
+        """
+        Returns:
+            (int): Local balance, or None if it was never fetched
+        """
+        state = self.chains.get(chain)
+        if state is None or state.fetched is None:
+            return None
+
+        since = state.reconciled_at
+        credited = sum(amount for credited_at, amount in state.credits if credited_at > since)
+        held = sum(d.amount for d in state.debits if d.confirmed_at is None or d.confirmed_at > since)
+        return state.fetched + credited - held
+
+    async def available(self, chain):
+        """Local balance, fetching it first if it is unknown, and reconciling in the background once it is stale
+
+        Returns:
+            (int): Local balance, or None if polyswarmd could not be reached
+        """
+        state = self.chains.get(chain)
+        if state is None or state.fetched is None:
+            await self.reconcile(chain)
+        elif time.monotonic() - state.reconciled_at > self.interval:
+            asyncio.ensure_future(self.reconcile(chain))
+
+        return self.balance(chain)
+
+    async def reconcile(self, chain, max_age=0):
+        """Replace the local balance with the balance from polyswarmd
+
+        Args:
+            chain (str): Chain to reconcile
+            max_age (float): Skip it if the balance was reconciled less than this many seconds ago
+        Returns:
+            (bool): False if polyswarmd could not be reached
+        """
+        state = self.chains.get(chain)
+        if state is not None and state.fetched is not None and time.monotonic() - state.reconciled_at < max_age:
+            return True
+
+        return await self.in_flight.run(chain, self.__reconcile, chain)
+
+    def update(self, chain, balance, fetched_at=None):
+        """Record a balance fetched from polyswarmd
+
+        Args:
+            chain (str): Chain the balance is on
+            balance (int): Balance from polyswarmd
+            fetched_at (float): `time.monotonic()` when the fetch started, defaults to now
+        """
+        state = self.chains.setdefault(chain, ChainBalance())
+        fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        previous = self.balance(chain)
+        state.fetched = balance
+        state.reconciled_at = fetched_at
+        # Transactions mined before the fetch started are part of the fetched balance
+        state.debits = deque(d for d in state.debits if d.confirmed_at is None or d.confirmed_at > fetched_at)
+        while state.credits and state.credits[0][0] <= fetched_at:
+            state.credits.popleft()
+
+        if previous is not None and previous != self.balance(chain):
+            logger.debug('Reconciled %s balance from %s to %s', chain, previous, self.balance(chain))
+
+    def debit(self, amount, chain):
+        """Commit funds to a transaction we are about to send"""
+        self.chains.setdefault(chain, ChainBalance()).debits.append(Debit(amount))
+
+    def confirm(self, amount, chain):
+        """Mark the oldest pending debit of an amount as mined"""
+        for debit in self.chains.setdefault(chain, ChainBalance()).debits:
+            if debit.confirmed_at is None and debit.amount == amount:
+                debit.confirmed_at = time.monotonic()
+                return
+
+    def refund(self, amount, chain):
+        """Return funds from a debit whose transaction was never sent or failed"""
+        debits = self.chains.setdefault(chain, ChainBalance()).debits
+        for i in range(len(debits) - 1, -1, -1):
+            if debits[i].confirmed_at is None and debits[i].amount == amount:
+                del debits[i]
+                return
+
+    def credit(self, amount, chain):
+        """Record funds transferred to us"""
+        self.chains.setdefault(chain, ChainBalance()).credits.append((time.monotonic(), amount))
+
+    async def __reconcile(self, chain):
+        self.reconciles += 1
+        started = time.monotonic()
+        balance = await self.fetch(chain)
+        if balance is None:
+            return False
+
+        self.update(chain, balance, started)
+        return True
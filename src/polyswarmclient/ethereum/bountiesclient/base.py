@@ -10,6 +10,9 @@ from polyswarmclient.ethereum import bloom
 from polyswarmclient.ethereum.bountiesclient.transaction import SettleBountyTransaction, PostVoteTransaction, \
     RevealAssertionTransaction, PostAssertionTransaction, PostBountyTransaction
 from polyswarmclient.parameters import Parameters
+from polyswarmclient.participation import ParticipationIndex, Role
+from polyswarmclient.request_rate_limit import Priority
+from polyswarmclient.settlement import SettleCheckpoint, SettlePipeline
 from polyswarmclient.utils import bool_list_to_int, calculate_commitment
 
 logger = logging.getLogger(__name__)
@@ -19,6 +22,22 @@ class BountiesClient(object):
     def __init__(self, client):
         self.__client = client
         self.parameters = {}
+        self.participation = {}
+
+    def participation_index(self, chain):
+        """Get the index of bounties this account took part in on a chain
+
+        Args:
+            chain (str): Which chain to operate on
+        Returns:
+            (ParticipationIndex): Index for the chain
+        """
+        index = self.participation.get(chain)
+        if index is None:
+            index = ParticipationIndex.for_account(self.__client.account, chain)
+            self.participation[chain] = index
+
+        return index
 
     async def fetch_parameters(self, chain, api_key=None):
         """Get bounty parameters from polyswarmd.
@@ -138,7 +157,7 @@ class BountiesClient(object):
         Returns:
             Response JSON parsed from polyswarmd containing emitted events
         """
-        bounty_fee = await self.parameters[chain].get('bounty_fee')
+        bounty_fee = self.parameters[chain].bounty_fee
         bloom = await self.calculate_bloom(artifact_uri)
         num_artifacts = await self.__client.get_artifact_count(artifact_uri)
         transaction = PostBountyTransaction(self.__client, ArtifactType.to_string(artifact_type), amount, bounty_fee,
@@ -148,7 +167,13 @@ class BountiesClient(object):
         if not success or 'bounties' not in result:
             logger.error('Expected bounty, received', extra={'extra': result})
 
-        return result.get('bounties', [])
+        bounties = result.get('bounties', [])
+        index = self.participation_index(chain)
+        for bounty in bounties:
+            if 'guid' in bounty:
+                index.record(bounty['guid'], Role.AUTHOR)
+
+        return bounties
 
     async def get_assertion(self, bounty_guid, index, chain, api_key=None):
         """Get an assertion from polyswarmd.
@@ -200,7 +225,7 @@ class BountiesClient(object):
         Returns:
             Response JSON parsed from polyswarmd containing emitted events
         """
-        fee = await self.parameters[chain].get('assertion_fee')
+        fee = self.parameters[chain].assertion_fee
         nonce, commitment = calculate_commitment(self.__client.account, bool_list_to_int(verdicts))
 
         transaction = PostAssertionTransaction(self.__client, bounty_guid, bid, fee, mask, commitment)
@@ -208,7 +233,11 @@ class BountiesClient(object):
         if not success or 'assertions' not in result:
             logger.error('Expected assertions, received', extra={'extra': result})
 
-        return nonce, result.get('assertions', [])
+        assertions = result.get('assertions', [])
+        if assertions:
+            self.participation_index(chain).record(bounty_guid, Role.ASSERTER)
+
+        return nonce, assertions
 
     async def post_reveal(self, bounty_guid, index, nonce, verdicts, metadata, chain, api_key=None):
         """Post an assertion reveal to polyswarmd.
@@ -309,7 +338,11 @@ class BountiesClient(object):
         if not success or 'votes' not in result:
             logger.error('Expected vote, received', extra={'extra': result})
 
-        return result.get('votes', [])
+        votes = result.get('votes', [])
+        if votes:
+            self.participation_index(chain).record(bounty_guid, Role.VOTER)
+
+        return votes
 
     async def did_participate(self, bounty_guid, chain, api_key=None):
         """Check to see if this client participated in a bounty
@@ -323,31 +356,46 @@ class BountiesClient(object):
             True if this account participated
 
         """
+        index = self.participation_index(chain)
+        participated = index.get(bounty_guid)
+        if participated is not None:
+            return participated
+
         account = self.__client.account
-        bounty = await self.get_bounty(bounty_guid, chain, api_key)
+        bounty, assertions, votes = await asyncio.gather(self.get_bounty(bounty_guid, chain, api_key),
+                                                         self.get_assertions(bounty_guid, chain, api_key),
+                                                         self.get_votes(bounty_guid, chain, api_key))
         if not bounty:
             return False
 
         if bounty.get('author', None) == account:
+            index.record(bounty_guid, Role.AUTHOR)
             return True
 
-        for assertion in await self.get_assertions(bounty_guid, chain, api_key):
+        for assertion in assertions or []:
             if assertion.get('author', None) == account:
+                index.record(bounty_guid, Role.ASSERTER)
                 return True
 
-        for vote in await self.get_votes(bounty_guid, chain, api_key):
+        for vote in votes or []:
             if vote.get('voter', None) == account:
+                index.record(bounty_guid, Role.VOTER)
                 return True
 
+        # Only remember we did not take part when every lookup succeeded
+        if assertions is not None and votes is not None:
+            index.record(bounty_guid, Role.NONE)
+
         return False
 
-    async def settle_bounty(self, bounty_guid, chain, api_key=None):
+    async def settle_bounty(self, bounty_guid, chain, api_key=None, priority=None):
         """Settle a bounty via polyswarmd
 
         Args:
             bounty_guid (str): The bounty which we are settling
             chain (str): Which chain to operate on
             api_key (str): Override default API key
+            priority (Priority): Override the priority of the transaction under client side rate limits
         Returns:
             Response JSON parsed from polyswarmd containing emitted events
         """
@@ -355,27 +403,38 @@ class BountiesClient(object):
             logger.debug('Will not settle %s because %s did not participate', bounty_guid, self.__client.account)
             return []
 
-        transaction = SettleBountyTransaction(self.__client, bounty_guid)
+        transaction = SettleBountyTransaction(self.__client, bounty_guid, priority)
         success, result = await transaction.send(chain, api_key=api_key)
         if not success or 'transfers' not in result:
             logger.warning('No transfer event, received', extra={'extra': result})
 
-        return result.get('transfers', [])
+        transfers = result.get('transfers', [])
+        self.__client.balances.credit_transfers(transfers, chain)
+        return transfers
 
     async def settle_all_bounties(self, chain, api_key=None):
         """Settles all bounties on a contract via polyswarmd
 
+        Pages of GUIDs are fetched ahead while a bounded pool of workers settles them at low priority, so normal work
+        is not starved. Progress is checkpointed, and an interrupted run resumes where it left off.
+        Bounties that failed to settle are checkpointed too, and tried again first by the next run.
+
         Args:
             chain (str): Which chain to operate on
             api_key (str): Override default API key
+        Returns:
+            (SettleProgress): Bounties settled and NCT recovered
         """
-        transfers = 0
-        # Fetch bounties from polyd, 75 at a time.
-        async for page in self.get_all_bounty_guids(count=75, chain=chain):
-            # Settle out each page
-            logger.debug('Settling %s', page)
-            found = await asyncio.gather(*[self.settle_bounty(guid, chain, api_key) for guid in page])
-            for transfer_list in found:
-                transfers += sum([int(transfer) for transfer in transfer_list])
-
-        logger.info('Recovered %s NCT by settling all bounties', transfers)
+        account = self.__client.account.lower()
+
+        async def fetch_page(page, count):
+            return await self.get_bounty_guids(page, count, chain, api_key)
+
+        async def settle(guid):
+            transfers = await self.settle_bounty(guid, chain, api_key, priority=Priority.LOW)
+            return sum(int(t.get('value', 0)) for t in transfers if t.get('to', '').lower() == account)
+
+        pipeline = SettlePipeline(fetch_page, settle, SettleCheckpoint.for_account(account, chain))
+        progress = await pipeline.run()
+        logger.info('Recovered %s NCT by settling all bounties', progress.recovered)
+        return progress
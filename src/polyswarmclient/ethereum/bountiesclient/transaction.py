@@ -2,6 +2,7 @@ from polyswarmclient.ethereum.verifiers import NctApproveVerifier, \
     PostBountyVerifier, PostAssertionVerifier, RevealAssertionVerifier, \
     PostVoteVerifier, SettleBountyVerifier
 from polyswarmclient.ethereum.transaction import EthereumTransaction
+from polyswarmclient.request_rate_limit import Priority
 
 
 class PostBountyTransaction(EthereumTransaction):
@@ -82,6 +83,8 @@ class PostAssertionTransaction(EthereumTransaction):
 
 
 class RevealAssertionTransaction(EthereumTransaction):
+    priority = Priority.HIGH
+
     def __init__(self, client, bounty_guid, index, nonce, verdicts, metadata):
         self.verdicts = verdicts
         self.metadata = metadata
@@ -113,6 +116,8 @@ class RevealAssertionTransaction(EthereumTransaction):
 
 
 class PostVoteTransaction(EthereumTransaction):
+    priority = Priority.HIGH
+
     def __init__(self, client, bounty_guid, votes, valid_bloom):
         self.votes = votes
         self.valid_bloom = valid_bloom
@@ -140,8 +145,13 @@ class PostVoteTransaction(EthereumTransaction):
 
 
 class SettleBountyTransaction(EthereumTransaction):
-    def __init__(self, client, bounty_guid):
+    priority = Priority.HIGH
+
+    def __init__(self, client, bounty_guid, priority=None):
         self.guid = bounty_guid
+        if priority is not None:
+            self.priority = priority
+
         settle = SettleBountyVerifier(bounty_guid)
         super().__init__(client, [settle])
 
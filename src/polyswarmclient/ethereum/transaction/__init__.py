@@ -1,2 +1,4 @@
 from .base import EthereumTransaction
+from .batcher import TransactionBatcher
 from .noncemanager import NonceManager
+from .receiptpoller import ReceiptPoller
@@ -5,9 +5,10 @@ from abc import ABCMeta, abstractmethod
 
 import backoff
 from polyswarmclient import utils
-from web3.auto import w3
+from polyswarmclient.ethereum.verifiers import verify_batch
 
 from polyswarmclient.exceptions import FatalError, NonceDesyncError, TransactionError, ReceiptError
+from polyswarmclient.request_rate_limit import Priority
 
 logger = logging.getLogger(__name__)
 
@@ -20,12 +21,17 @@ LOG_MSG_ENGINE_TOO_SLOW = """
     We strongly encourage you to review your artifact scan process to identify areas where engine speed can be improved.
     """
 
+# Post errors meaning a nonce may already be taken by a transaction in the pool, so it must not be reused
+NONCE_IN_USE_ERRORS = ('nonce', 'known transaction', 'replacement transaction')
+
 
 class EthereumTransaction(metaclass=ABCMeta):
     """Used to verify and post groups of transactions that make up a specific action.
 
     For instance, when approving some funds to move, and calling a contract function that will consumer them.
     """
+    # Priority of the requests for this transaction under client side rate limits
+    priority = Priority.NORMAL
 
     def __init__(self, client, verifiers):
         """Initialize a transaction
@@ -57,7 +63,8 @@ class EthereumTransaction(metaclass=ABCMeta):
                                                           chain,
                                                           json=self.get_body(),
                                                           send_nonce=True,
-                                                          api_key=api_key)
+                                                          api_key=api_key,
+                                                          priority=self.priority)
 
         results = {} if results is None else results
 
@@ -79,13 +86,13 @@ class EthereumTransaction(metaclass=ABCMeta):
             del results['transactions']
 
         # Step 2: Update nonces, sign then post transactions
-        txhashes, nonces, post_errors = await self.__sign_and_post_transactions(transactions, chain, api_key)
+        txhashes, nonces, posted, post_errors = await self.__sign_and_post_transactions(transactions, chain, api_key)
 
         if not txhashes:
             return False, {'errors': post_errors}
 
         # Step 3: At least one transaction was submitted successfully, get and verify the events it generated
-        success, results, get_errors = await self.__get_transactions(txhashes, nonces, chain, api_key)
+        success, results, get_errors = await self.__get_transactions(txhashes, nonces, posted, chain, api_key)
         if not success:
             return False, {'errors': post_errors + get_errors}
         else:
@@ -104,7 +111,6 @@ class EthereumTransaction(metaclass=ABCMeta):
         """
         loop = asyncio.get_event_loop()
         nonce_manager = self.client.nonce_managers[chain]
-        errors = []
 
         while True:
             nonces = await nonce_manager.reserve(amount=len(transactions))
@@ -116,38 +122,51 @@ class EthereumTransaction(metaclass=ABCMeta):
         for i, transaction in enumerate(transactions):
             transaction['nonce'] = nonces[i]
 
-        results = []
-        signed_txs = self.__sign_transactions(transactions)
-        for signed_tx, transaction in zip(signed_txs, transactions):
-            success, result = await self.__post_transaction(signed_tx, chain, api_key)
-            results.extend(result)
-
-            if not success:
-                # Known transaction errors seem to be a geth issue, don't spam log about it
-                if any(['invalid transaction error' in e.lower() for e in errors]):
-                    loop.create_task(nonce_manager.mark_update_nonce())
-                    raise NonceDesyncError
-
-                all_known_tx_errors = results is not None and \
-                    all(['known transaction' in r.get('message', '') for r in result if
-                        r.get('is_error')])
-
-                if self.client.tx_error_fatal:
-                    logger.critical('Received fatal transaction error during post.', extra={'extra': results})
-                    logger.critical(LOG_MSG_ENGINE_TOO_SLOW)
-                    raise FatalError('Transaction error in testing mode', 1)
-                elif not all_known_tx_errors:
-                    logger.error('Received transaction error during post',
-                                 extra={'extra': {'results': result, 'transaction': transaction}})
+        try:
+            signed_txs = await self.__sign_transactions(transactions)
+            success, results = await self.__post_transactions(signed_txs, chain, api_key)
+        except Exception:
+            # Nothing we know of reached the transaction pool, the next sync frees anything that did not
+            nonce_manager.release(nonces)
+            loop.create_task(nonce_manager.mark_update_nonce())
+            raise
+
+        results = [] if results is None else results
+
+        if not success:
+            post_errors = [r.get('message', '') for r in results if isinstance(r, dict) and r.get('is_error')]
+            # Known transaction errors seem to be a geth issue, don't spam log about it
+            if any(['invalid transaction error' in e.lower() for e in post_errors]):
+                nonce_manager.release(nonces)
+                loop.create_task(nonce_manager.mark_update_nonce())
+                raise NonceDesyncError
+
+            all_known_tx_errors = all(['known transaction' in e.lower() for e in post_errors])
+
+            if self.client.tx_error_fatal:
+                logger.critical('Received fatal transaction error during post.', extra={'extra': results})
+                logger.critical(LOG_MSG_ENGINE_TOO_SLOW)
+                raise FatalError('Transaction error in testing mode', 1)
+            elif not post_errors or not all_known_tx_errors:
+                logger.error('Received transaction error during post',
+                             extra={'extra': {'results': results, 'transactions': transactions}})
 
         txhashes = []
         errors = []
+        posted = []
+        rejected = []
         if len(signed_txs) != len(results):
+            if not results:
+                nonce_manager.release(nonces)
+            # Without a result per transaction we cannot tell which were accepted, let the sync sort it out
+            loop.create_task(nonce_manager.mark_update_nonce())
             raise TransactionError('Mistmatch in results counts and transactions')
 
-        for tx, result in zip(signed_txs, results):
+        unknown = False
+        for tx, result, nonce in zip(signed_txs, results, nonces):
             if tx.get('hash', None) is None:
                 logger.warning(f'Signed transaction missing txhash: {tx}')
+                unknown = True
                 continue
 
             txhash = bytes(tx['hash']).hex()
@@ -157,42 +176,54 @@ class EthereumTransaction(metaclass=ABCMeta):
             # Known transaction errors seem to be a geth issue, don't retransmit in this case
             if is_error and 'known transaction' not in message.lower():
                 errors.append(message)
+                # Reuse the nonce unless another transaction may already hold it
+                if not any(e in message.lower() for e in NONCE_IN_USE_ERRORS):
+                    rejected.append(nonce)
             else:
                 txhashes.append(txhash)
+                posted.append(nonce)
+
+        nonce_manager.mark_posted(posted)
+        nonce_manager.release(rejected)
+        if unknown:
+            loop.create_task(nonce_manager.mark_update_nonce())
 
         if txhashes and errors:
             logger.warning('Transaction errors detected but some succeeded, fetching events', extra={'extra': errors})
 
-        return txhashes, nonces, errors
+        return txhashes, nonces, posted, errors
 
-    async def __post_transaction(self, signed_transaction, chain, api_key):
-        """
-        Post a signed transaction
-        :param signed_transaction: transaction to be sent
-        :param chain: chain to send the transaction to
-        :param api_key: api_key to use when making request
-        :return: success, results tuple
+    async def __post_transactions(self, signed_transactions, chain, api_key):
+        """Post all signed transactions of this action in a single request
+
+        Args:
+            signed_transactions (List[SignedTransaction]): Transactions to send, in nonce order
+            chain (str): Chain to send the transactions to
+            api_key (str): API key to use when making request
+        Returns:
+            (bool, list): Success, and one result per transaction
         """
-        raw_signed_tx = bytes(signed_transaction['rawTransaction']).hex()
-        return await self.client.make_request('POST', '/transactions', chain,
-                                              json={'transactions': [raw_signed_tx]}, api_key=api_key)
+        raw_signed_txs = [bytes(tx['rawTransaction']).hex() for tx in signed_transactions]
+        return await self.client.transaction_batchers[chain].post(raw_signed_txs, api_key, self.priority)
 
-    def __sign_transactions(self, transactions):
-        """Sign a set of transactions
+    async def __sign_transactions(self, transactions):
+        """Sign a set of transactions in one trip to the client signing pool
 
         Args:
             transactions (List[Transaction]): The transactions to sign
         Returns:
             List[Transaction]: The signed transactions
         """
-        return [w3.eth.account.signTransaction(tx, self.client.priv_key) for tx in transactions]
+        return await self.client.signer.sign_ethereum_transactions(transactions)
 
     @backoff.on_exception(backoff.constant, (NonceDesyncError, TransactionError), max_tries=2)
-    async def __get_transactions(self, txhashes, nonces, chain, api_key):
+    async def __get_transactions(self, txhashes, nonces, posted, chain, api_key):
         """Get generated events or errors from receipts for a set of txhashes
 
         Args:
             txhashes (List[str]): The txhashes of the receipts to process
+            nonces (List[int]): Every nonce reserved for the transactions
+            posted (List[int]): Nonces of the transactions polyswarmd accepted, the ones with txhashes
             chain (str): Which chain to operate on
             api_key (str): Override default API key
         Returns:
@@ -201,8 +232,8 @@ class EthereumTransaction(metaclass=ABCMeta):
         """
         loop = asyncio.get_event_loop()
         nonce_manager = self.client.nonce_managers[chain]
-        success, results = await self.client.make_request('GET', '/transactions', chain,
-                                                          json={'transactions': txhashes}, api_key=api_key)
+        success, results = await self.client.receipt_pollers[chain].get(txhashes, api_key, self.priority,
+                                                                        self.has_required_event)
         results = {} if results is None else results
         success = self.has_required_event(results)
         if not success:
@@ -230,6 +261,9 @@ class EthereumTransaction(metaclass=ABCMeta):
         if any(['transaction failed' in e.lower() for e in errors]):
             logger.error('Transaction failed due to bad parameters, not retrying', extra={'extra': errors})
 
+        # Every receipt was found, so the accepted transactions were mined and their nonces are used up.
+        # Rejected nonces were released, and may already be reserved again by another transaction
+        nonce_manager.mark_confirmed(posted)
         return success, results, errors
 
     @abstractmethod
@@ -267,7 +301,4 @@ class EthereumTransaction(metaclass=ABCMeta):
         Returns:
             (bool): True if transactions match expectations. False otherwise
         """
-        if len(transactions) != len(self.verifiers):
-            return False
-
-        return all([v.verify(tx) for v, tx in zip(self.verifiers, transactions)])
+        return verify_batch(self.verifiers, transactions)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+
+from polyswarmclient.request_rate_limit import Priority
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for signed transactions from concurrent actions to post together, 0 posts each action on its own
+TRANSACTION_BATCH_WINDOW = float(os.environ.get('TRANSACTION_BATCH_WINDOW', 0))
+# Most signed transactions in a single POST /transactions
+TRANSACTION_BATCH_SIZE = int(os.environ.get('TRANSACTION_BATCH_SIZE', 64))
+
+
+class TransactionBatch:
+    """Signed transactions waiting to be posted together with one API key"""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.transactions = []
+        self.members = []
+        self.priority = Priority.LOW
+        self.timer = None
+
+    def add(self, raw_transactions, priority):
+        """Add the transactions of one action to the batch
+
+        Args:
+            raw_transactions (list[str]): Hex encoded signed transactions
+            priority (Priority): Priority of the action
+        Returns:
+            (asyncio.Future): Resolves to the (success, results) of just these transactions
+        """
+        future = asyncio.get_event_loop().create_future()
+        self.members.append((len(self.transactions), len(raw_transactions), future))
+        self.transactions.extend(raw_transactions)
+        self.priority = min(self.priority, priority)
+        return future
+
+    def resolve(self, success, results):
+        """Hand each action the results of its own transactions
+
+        polyswarmd answers with one result per transaction, in the order they were posted, and fails the whole
+        request if any one of them failed. Each action is only failed if one of its own transactions failed.
+        """
+        per_transaction = isinstance(results, list) and len(results) == len(self.transactions)
+        for start, count, future in self.members:
+            if future.done():
+                continue
+
+            if per_transaction:
+                own = results[start:start + count]
+                own_success = success or not any(isinstance(r, dict) and r.get('is_error') for r in own)
+                future.set_result((own_success, own))
+            else:
+                future.set_result((success, results))
+
+    def fail(self, exception):
+        for _, _, future in self.members:
+            if not future.done():
+                future.set_exception(exception)
+
+
+class TransactionBatcher:
+    """Posts signed transactions for one chain, optionally coalescing concurrent actions into one request
+
+    Args:
+        client (Client): Client used to post transactions
+        chain (str): Chain the transactions are for
+        window (float): Seconds to wait for more transactions before posting, 0 to post immediately
+        max_size (int): Most transactions in a single request
+    """
+
+    def __init__(self, client, chain, window=TRANSACTION_BATCH_WINDOW, max_size=TRANSACTION_BATCH_SIZE):
+        self.client = client
+        self.chain = chain
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.pending = {}
+        self.tasks = set()
+        self.requests = 0
+        self.transactions = 0
+
+    async def post(self, raw_transactions, api_key, priority=Priority.NORMAL):
+        """Post signed transactions to polyswarmd
+
+        Args:
+            raw_transactions (list[str]): Hex encoded signed transactions, in nonce order
+            api_key (str): API key to post with
+            priority (Priority): Priority of the request under client side rate limits
+        Returns:
+            (bool, list): Success, and one result per transaction from polyswarmd
+        """
+        if self.window <= 0:
+            return await self.__post(raw_transactions, api_key, priority)
+
+        batch = self.pending.get(api_key)
+        if batch is None:
+            batch = TransactionBatch(api_key)
+            batch.timer = asyncio.get_event_loop().call_later(self.window, self.__flush, batch)
+            self.pending[api_key] = batch
+
+        future = batch.add(raw_transactions, priority)
+        if len(batch.transactions) >= self.max_size:
+            self.__flush(batch)
+
+        return await future
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'transactions': self.transactions,
+            'pending': sum(len(batch.transactions) for batch in self.pending.values()),
+        }
+
+    def __flush(self, batch):
+        if self.pending.get(batch.api_key) is batch:
+            del self.pending[batch.api_key]
+
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+
+        task = asyncio.get_event_loop().create_task(self.__send(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def __send(self, batch):
+        try:
+            success, results = await self.__post(batch.transactions, batch.api_key, batch.priority)
+        except asyncio.CancelledError:
+            batch.fail(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            logger.exception('Error posting batch of %s transactions', len(batch.transactions))
+            batch.fail(e)
+            return
+
+        if len(batch.members) > 1:
+            logger.debug('Posted %s transactions from %s actions in one request',
+                         len(batch.transactions), len(batch.members))
+
+        batch.resolve(success, results)
+
+    async def __post(self, raw_transactions, api_key, priority):
+        self.requests += 1
+        self.transactions += len(raw_transactions)
+        return await self.client.make_request('POST', '/transactions', self.chain,
+                                              json={'transactions': list(raw_transactions)}, api_key=api_key,
+                                              priority=priority)
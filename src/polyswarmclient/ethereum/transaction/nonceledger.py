@@ -0,0 +1,160 @@
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NonceState:
+    """State of a nonce the ledger is still tracking"""
+    # Handed out, but not yet accepted by polyswarmd
+    RESERVED = 'reserved'
+    # Accepted into the transaction pool, waiting to be mined
+    POSTED = 'posted'
+
+
+class NonceLedger:
+    """Local record of the nonces of one account
+
+    Free nonces below the high water mark are kept in a min heap, with a set of the ones that are still free, so the
+    lowest gap is found and filled first. Reserving or releasing a nonce is O(log n) in the number of free nonces,
+    heap entries for nonces that stopped being free are skipped once they reach the top.
+    Nonces that are neither free nor tracked are used up.
+
+    Args:
+        base_nonce (int): First nonce that has never been used
+    """
+
+    def __init__(self, base_nonce=0):
+        self.next_nonce = base_nonce
+        self.heap = []
+        self.free = set()
+        self.tracked = {}
+        self.recycled = 0
+
+    @property
+    def base_nonce(self):
+        """Next nonce that would be reserved"""
+        self.__discard_taken()
+        return self.heap[0] if self.heap else self.next_nonce
+
+    def sync(self, nonce, pending, keep_posted=True):
+        """Rebuild the ledger from the chain
+
+        Nonces reserved locally but never accepted by polyswarmd are freed, their transactions either failed or will
+        fail with a nonce error, and keeping them would leave a hole no later sync fills.
+
+        Args:
+            nonce (int): Transaction count of the account, ignoring pending transactions
+            pending (list[int]): Nonces of the account's transactions in the transaction pool
+            keep_posted (bool): Keep nonces posted locally that polyswarmd does not list as pending yet.
+                False when our nonce got ahead of the chain
+        """
+        tracked = {}
+        if keep_posted:
+            tracked = {n: s for n, s in self.tracked.items() if n >= nonce and s == NonceState.POSTED}
+
+        for n in pending:
+            if n >= nonce:
+                tracked[n] = NonceState.POSTED
+
+        self.tracked = tracked
+        self.next_nonce = max(tracked) + 1 if tracked else nonce
+        # Everything between the chain nonce and the high water mark that is not in flight is free, sorted is a heap
+        self.heap = [n for n in range(nonce, self.next_nonce) if n not in tracked]
+        self.free = set(self.heap)
+
+    def reserve(self, amount=1):
+        """Reserve increasing nonces, filling the lowest gaps first
+
+        Args:
+            amount (int): Number of nonces
+        Returns:
+            (list[int]): Reserved nonces, in order
+        """
+        nonces = []
+        while len(nonces) < amount:
+            self.__discard_taken()
+            if not self.heap:
+                break
+
+            n = heapq.heappop(self.heap)
+            self.free.discard(n)
+            nonces.append(n)
+
+        remaining = amount - len(nonces)
+        nonces.extend(range(self.next_nonce, self.next_nonce + remaining))
+        self.next_nonce += remaining
+
+        for n in nonces:
+            self.tracked[n] = NonceState.RESERVED
+
+        return nonces
+
+    def mark_posted(self, nonces):
+        """Nonces whose transactions were accepted by polyswarmd"""
+        for n in nonces:
+            if n in self.tracked:
+                self.tracked[n] = NonceState.POSTED
+
+    def mark_confirmed(self, nonces):
+        """Nonces whose transactions were mined, and are used up
+
+        Only posted nonces are dropped, a nonce reserved again since is still in use by its new transaction.
+        """
+        for n in nonces:
+            if self.tracked.get(n) == NonceState.POSTED:
+                del self.tracked[n]
+
+    def release(self, nonces):
+        """Return nonces whose transactions never made it into the transaction pool, to be reused
+
+        Args:
+            nonces (list[int]): Nonces to free
+        """
+        for n in nonces:
+            if n >= self.next_nonce or n in self.free:
+                continue
+
+            self.tracked.pop(n, None)
+            self.free.add(n)
+            heapq.heappush(self.heap, n)
+            self.recycled += 1
+
+        # A free run at the top is not a gap, just lower the high water mark
+        while self.next_nonce - 1 in self.free:
+            self.next_nonce -= 1
+            self.free.remove(self.next_nonce)
+
+    def is_free(self, nonce):
+        return nonce in self.free
+
+    def state(self, nonce):
+        """
+        Returns:
+            (str): NonceState of a tracked nonce, 'free', or None if the nonce is used up or was never reserved
+        """
+        if self.is_free(nonce):
+            return 'free'
+
+        return self.tracked.get(nonce)
+
+    def find_gaps(self):
+        """
+        Returns:
+            (list[int]): Free nonces below the high water mark, lowest first
+        """
+        return sorted(self.free)
+
+    def stats(self):
+        return {
+            'next_nonce': self.next_nonce,
+            'base_nonce': self.base_nonce,
+            'free': len(self.free),
+            'reserved': sum(1 for s in self.tracked.values() if s == NonceState.RESERVED),
+            'posted': sum(1 for s in self.tracked.values() if s == NonceState.POSTED),
+            'recycled': self.recycled,
+        }
+
+    def __discard_taken(self):
+        while self.heap and self.heap[0] not in self.free:
+            heapq.heappop(self.heap)
@@ -1,14 +1,20 @@
 import asyncio
 import logging
 
+from polyswarmclient.ethereum.transaction.nonceledger import NonceLedger
+
 logger = logging.getLogger(__name__)
 
 
 class NonceManager:
-    """Manages the nonce for some Ethereum chain"""
+    """Manages the nonce for some Ethereum chain
+
+    Nonces are handed out from a local NonceLedger, polyswarmd is only asked for the nonce and pending transactions
+    after a desync.
+    """
 
     def __init__(self, client, chain):
-        self.base_nonce = 0
+        self.ledger = NonceLedger()
         self.client = client
         self.chain = chain
         self.needs_update = True
@@ -17,6 +23,10 @@ class NonceManager:
         self.update_lock = None
         self.pending = []
 
+    @property
+    def base_nonce(self):
+        return self.ledger.base_nonce
+
     async def setup(self):
         self.nonce_lock = asyncio.Lock()
         self.update_lock = asyncio.Lock()
@@ -29,73 +39,62 @@ class NonceManager:
         Returns
             (list[int]): a list of nonces to use
         """
-        # Clear any waiting that should be used at this point
+        # Reserving from the ledger does not await, so only a sync needs the lock
+        if not self.needs_update:
+            return self.ledger.reserve(amount)
+
         async with self.nonce_lock:
-            if self.needs_update:
+            async with self.update_lock:
+                needs_update = self.needs_update
+                overset = self.overset
+
+            if needs_update:
+                await self.sync_nonce(overset)
                 async with self.update_lock:
-                    needs_update = self.needs_update
-
-                if needs_update:
-                    nonces = await self.sync_nonce(amount, self.overset)
-                    async with self.update_lock:
-                        self.needs_update = False
-                        self.overset = False
-            else:
-                nonces = [r for r in range(self.base_nonce, self.base_nonce + amount)]
-                self.base_nonce = nonces[-1] + 1
-            return nonces
-
-    async def sync_nonce(self, amount, overset):
-        """ Sync the nonce with the Ethereum chain
-        Reads the pending transactions from the tx pool, and gets the nonce ignoring all transactions
-        Using those values it determines the nonce to use, or if the transactions are in a timeout state, returns None
+                    self.needs_update = False
+                    self.overset = False
 
-        Args:
-            amount: Number of transactions to make
-            overset: Is the nonce overset
+            return self.ledger.reserve(amount)
 
-        Returns
-            (None|list[int]): List of int values for nonces, or None if the transaction would timeout
+    async def sync_nonce(self, overset):
+        """ Sync the ledger with the Ethereum chain
+        Reads the pending transactions from the tx pool, and gets the nonce ignoring all transactions
+        Any nonces between the two that are not in flight become gaps, filled by the next reservations
 
+        Args:
+            overset: Is the nonce overset, if so nonces posted locally are forgotten
         """
         low_nonce = await self.get_nonce(True)
-        nonce = max(self.base_nonce, low_nonce) if not overset else low_nonce
         pending = sorted(await self.get_pending_nonces(self.chain))
         self.pending = pending
-        # -1 because nonces are zero indexed, so nonce + amount -1 is max nonce
-        if not pending or nonce + amount - 1 < pending[0]:
-            nonces = [r for r in range(nonce, nonce + amount)]
-            # If we filled the front gap to the pending transactions, jump forward to the next gap, or the end
-            if pending and nonces[-1] + 1 == pending[0]:
-                gaps = NonceManager.find_gaps(pending)
-                self.base_nonce = gaps[0] if gaps else pending[-1] + 1
-            else:
-                self.base_nonce = nonces[-1] + 1
-            return nonces
-        # If the base_nonce butts against pending, jump forward to the end
-        elif nonce == pending[0] and not NonceManager.find_gaps(pending):
-            nonce = pending[-1] + 1
-            nonces = [r for r in range(nonce, nonce + amount)]
-            self.base_nonce = nonces[-1] + 1
-            return nonces
-        else:
-            # If there is gap before the first pending, but it isn't big enough, return None
-            # If there is a gap in pending, we have to fill up to it, so return and wait for the gap to be at the front
-            return None
+        self.ledger.sync(low_nonce, pending, keep_posted=not overset)
+        logger.debug('Synced nonce', extra={'extra': self.ledger.stats()})
+
+    def mark_posted(self, nonces):
+        """Call this when polyswarmd accepted transactions using these nonces"""
+        self.ledger.mark_posted(nonces)
+
+    def mark_confirmed(self, nonces):
+        """Call this when the transactions using these nonces were mined"""
+        self.ledger.mark_confirmed(nonces)
+
+    def release(self, nonces):
+        """Call this when transactions using these nonces were rejected, so the nonces are reused without a resync"""
+        self.ledger.release(nonces)
 
     @staticmethod
     def find_gaps(nonces):
         """Finds any gaps between base nonce and the last nonce in the given nonces list.
 
         Args:
-            nonces (list[int]): list of nonces being checked
+            nonces (list[int]): sorted list of nonces being checked
 
         Returns
             (list[int]): Any missing nonces between base_nonce and the last given nonce
 
         """
-        # Only check through the end of the waitlist if results exceed it
-        return [r for r in range(nonces[0], nonces[-1]) if r not in nonces]
+        present = set(nonces)
+        return [r for r in range(nonces[0], nonces[-1]) if r not in present]
 
     async def get_base_nonce(self, chain, ignore_pending=False, api_key=None):
         """Get account's nonce from polyswarmd
@@ -165,6 +164,7 @@ class NonceManager:
         """
         async with self.update_lock:
             # if we know this nonce is too high, ignore it
-            if not any(nonce for nonce in nonces if nonce in self.pending) and not self.needs_update:
+            pending = set(self.pending)
+            if not any(nonce in pending for nonce in nonces) and not self.needs_update:
                 self.needs_update = True
                 self.overset = True
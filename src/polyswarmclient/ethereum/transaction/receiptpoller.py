@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import os
+
+from polyswarmclient.request_rate_limit import Priority
+
+logger = logging.getLogger(__name__)
+
+# Bounds in seconds of how long the poller gathers txhashes before asking polyswarmd for their receipts
+RECEIPT_POLL_MIN_INTERVAL = float(os.environ.get('RECEIPT_POLL_MIN_INTERVAL', 0.05))
+RECEIPT_POLL_MAX_INTERVAL = float(os.environ.get('RECEIPT_POLL_MAX_INTERVAL', 1))
+# Most txhashes in a single GET /transactions
+RECEIPT_POLL_BATCH_SIZE = int(os.environ.get('RECEIPT_POLL_BATCH_SIZE', 256))
+# Seconds a transaction waits for its receipts before reporting a timeout, which resyncs the nonce
+RECEIPT_TIMEOUT = float(os.environ.get('RECEIPT_TIMEOUT', 300))
+
+
+class ReceiptRequest:
+    """Txhashes of one action waiting for their receipts"""
+
+    def __init__(self, txhashes, api_key, priority, select):
+        self.txhashes = list(txhashes)
+        self.api_key = api_key
+        self.priority = priority
+        self.select = select
+        self.future = asyncio.get_event_loop().create_future()
+
+
+class ReceiptPoller:
+    """Fetches receipts for every in-flight transaction on a chain, with one GET /transactions per tick
+
+    polyswarmd merges the events of every receipt in a request, so when a tick serves more than one action, each
+    action gets the events that carry one of its txhashes, or else the events its `select` function recognizes,
+    and the errors that name one of its txhashes or no txhash at all.
+    Actions without a `select`, or with one that accepts any events, such as settles, are never batched.
+    Actions that still cannot be told apart, because another action in the tick recognizes the same event,
+    have their receipts fetched again on their own. Events no action recognizes go to the one action still missing
+    its required event, and are logged if there is no such single action.
+
+    The tick grows while ticks keep batching several actions, and shrinks back when they do not.
+
+    Args:
+        client (Client): Client used to fetch receipts
+        chain (str): Chain the transactions are on
+        min_interval (float): Shortest tick in seconds, 0 to fetch every action's receipts on its own
+        max_interval (float): Longest tick in seconds
+        max_size (int): Most txhashes in a single request
+        timeout (float): Seconds to wait for receipts before reporting a timeout
+    """
+
+    def __init__(self, client, chain, min_interval=RECEIPT_POLL_MIN_INTERVAL, max_interval=RECEIPT_POLL_MAX_INTERVAL,
+                 max_size=RECEIPT_POLL_BATCH_SIZE, timeout=RECEIPT_TIMEOUT):
+        self.client = client
+        self.chain = chain
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min_interval
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.pending = {}
+        self.timers = {}
+        self.tasks = set()
+        self.requests = 0
+        self.served = 0
+
+    async def get(self, txhashes, api_key, priority=Priority.NORMAL, select=None):
+        """Wait for the receipts of some transactions
+
+        Args:
+            txhashes (list[str]): Txhashes of one action
+            api_key (str): API key to fetch with
+            priority (Priority): Priority of the request under client side rate limits
+            select (function): Takes a dict of events, and returns True if they were emitted by these transactions
+        Returns:
+            (bool, dict): Success, and the events and errors for these transactions
+        """
+        if self.min_interval <= 0 or not self.batchable(select):
+            self.served += 1
+            return await self.__fetch(txhashes, api_key, priority)
+
+        request = ReceiptRequest(txhashes, api_key, priority, select)
+        waiting = self.pending.setdefault(api_key, [])
+        waiting.append(request)
+        if api_key not in self.timers:
+            self.timers[api_key] = asyncio.get_event_loop().call_later(self.interval, self.__flush, api_key)
+
+        if sum(len(r.txhashes) for r in waiting) >= self.max_size:
+            self.__flush(api_key)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning('Timed out waiting for receipts', extra={'extra': request.txhashes})
+            errors = ['Timeout during wait for receipt for {0}'.format(txhash) for txhash in request.txhashes]
+            return False, {'errors': errors}
+
+    @staticmethod
+    def batchable(select):
+        """
+        Args:
+            select (function): Required event check of an action
+        Returns:
+            (bool): True if the events of the action can be told apart from those of others in a batch
+        """
+        # A check that passes without any events would claim every event of every other action
+        return select is not None and not select({})
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'requests': self.requests,
+            'served': self.served,
+            'waiting': sum(len(requests) for requests in self.pending.values()),
+        }
+
+    def __flush(self, api_key):
+        timer = self.timers.pop(api_key, None)
+        if timer is not None:
+            timer.cancel()
+
+        requests = self.pending.pop(api_key, [])
+        if not requests:
+            return
+
+        if len(requests) > 1:
+            self.interval = min(self.max_interval, self.interval * 2)
+        else:
+            self.interval = max(self.min_interval, self.interval / 2)
+
+        task = asyncio.get_event_loop().create_task(self.__send(requests, api_key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def __send(self, requests, api_key):
+        requests = [r for r in requests if not r.future.done()]
+        if not requests:
+            return
+
+        self.served += len(requests)
+        if len(requests) == 1:
+            await self.__resolve_alone(requests[0], api_key)
+            return
+
+        txhashes = [txhash for r in requests for txhash in r.txhashes]
+        priority = min(r.priority for r in requests)
+        try:
+            success, results = await self.__fetch(txhashes, api_key, priority)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            success, results = False, None
+
+        if not isinstance(results, dict):
+            # Could not split up a failed batch, so ask again for each action
+            logger.warning('Batched receipt request failed, fetching %s actions separately', len(requests))
+            await asyncio.gather(*[self.__resolve_alone(r, api_key) for r in requests])
+            return
+
+        splits = [self.__split(results, request, txhashes) for request in requests]
+        ambiguous, unclaimed = self.__claims(results, requests)
+        if unclaimed:
+            self.__assign_unclaimed(unclaimed, [(r, split) for r, split in zip(requests, splits) if r not in ambiguous])
+
+        for request, split in zip(requests, splits):
+            if request not in ambiguous and not request.future.done():
+                request.future.set_result((success, split))
+
+        if ambiguous:
+            logger.debug('Fetching receipts of %s actions with indistinguishable events separately', len(ambiguous))
+            await asyncio.gather(*[self.__resolve_alone(r, api_key) for r in requests if r in ambiguous])
+
+    async def __resolve_alone(self, request, api_key):
+        try:
+            response = await self.__fetch(request.txhashes, api_key, request.priority)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+
+        if not request.future.done():
+            request.future.set_result(response)
+
+    async def __fetch(self, txhashes, api_key, priority):
+        self.requests += 1
+        return await self.client.make_request('GET', '/transactions', self.chain,
+                                              json={'transactions': list(txhashes)}, api_key=api_key,
+                                              priority=priority)
+
+    @staticmethod
+    def __owns(request, key, value):
+        # Events that name their transaction belong to it alone
+        if isinstance(value, dict) and value.get('txhash') is not None:
+            return value['txhash'] in request.txhashes
+
+        return request.select is None or request.select({key: [value]})
+
+    @classmethod
+    def __claims(cls, results, requests):
+        """Requests claiming an event another request also claims, and the (key, event) pairs no request claims"""
+        ambiguous = set()
+        unclaimed = []
+        for key, values in results.items():
+            if key == 'errors' or not isinstance(values, list):
+                continue
+
+            for value in values:
+                owners = [r for r in requests if cls.__owns(r, key, value)]
+                if len(owners) > 1:
+                    ambiguous.update(owners)
+                elif not owners:
+                    unclaimed.append((key, value))
+
+        return ambiguous, unclaimed
+
+    @staticmethod
+    def __assign_unclaimed(unclaimed, splits):
+        missing = [split for request, split in splits if not request.select(split)]
+        if len(missing) == 1:
+            for key, value in unclaimed:
+                missing[0].setdefault(key, []).append(value)
+            return
+
+        logger.warning('%s events in batched receipts belong to no action, %s actions are missing events',
+                       len(unclaimed), len(missing), extra={'extra': unclaimed})
+
+    @classmethod
+    def __split(cls, results, request, txhashes):
+        own = set(request.txhashes)
+        others = [txhash for txhash in txhashes if txhash not in own]
+        split = {}
+        for key, values in results.items():
+            if key == 'errors':
+                split[key] = [e for e in values
+                              if any(txhash in e for txhash in own) or not any(txhash in e for txhash in others)]
+            elif isinstance(values, list):
+                split[key] = [v for v in values if cls.__owns(request, key, v)]
+            else:
+                split[key] = values
+
+        return split
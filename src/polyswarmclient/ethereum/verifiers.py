@@ -1,8 +1,9 @@
+import functools
 import logging
-from abc import ABCMeta, abstractmethod
+from abc import ABCMeta
 
 from eth_abi import decode_abi
-from eth_abi.exceptions import InsufficientDataBytes
+from eth_abi.exceptions import DecodingError
 from hexbytes import HexBytes
 from polyswarmartifact import ArtifactType
 
@@ -11,6 +12,56 @@ from polyswarmclient.utils import int_to_bool_list, guid_as_string, sha3
 logger = logging.getLogger(__name__)
 
 UNKNOWN_PARAMETER = 'XXX'
+BLOOM_WORDS = 8
+WORD_MASK = (1 << 256) - 1
+
+# Every compiled ABI by function selector
+SELECTORS = {}
+
+
+class CompiledABI:
+    """Function selector and signature of an ABI, built once and shared by every transaction checked against it
+
+    Args:
+        method (str): Function name
+        args (tuple[str]): Argument types
+    """
+
+    def __init__(self, method, args):
+        self.method = method
+        self.args = args
+        self.signature = '{}({})'.format(method, ','.join(args))
+        self.selector = bytes(sha3(self.signature)[:4])
+
+    def decode(self, data):
+        """Decode the arguments of a call
+
+        Args:
+            data (bytes): Call data following the selector
+        Returns:
+            (tuple): Decoded arguments
+        Raises:
+            ValueError: If the data does not match the argument types
+        """
+        try:
+            return decode_abi(self.args, data)
+        except DecodingError:
+            raise ValueError('Transaction data did not match expected ABI (expected {})'.format(self.signature))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_abi(method, args):
+    """Compile an ABI, or return the one already compiled
+
+    Args:
+        method (str): Function name
+        args (tuple[str]): Argument types
+    Returns:
+        (CompiledABI): Compiled ABI
+    """
+    compiled = CompiledABI(method, args)
+    SELECTORS[compiled.selector] = compiled
+    return compiled
 
 
 class DecodedTransaction:
@@ -36,6 +87,21 @@ class DecodedTransaction:
         Raises:
             ValueError: If invalid transaction is provided
         """
+        method, args = abi
+        return cls.from_compiled(transaction, compile_abi(method, tuple(args)))
+
+    @classmethod
+    def from_compiled(cls, transaction, compiled):
+        """Parse a transaction against an already compiled ABI
+
+        Args:
+            transaction (dict): Transaction to be simplified
+            compiled (CompiledABI): ABI of the expected function call
+        Returns:
+            DecodedTransaction: If valid, returns a SimplifiedTransaction
+        Raises:
+            ValueError: If invalid transaction is provided
+        """
         transaction_data = transaction.get('data')
         if transaction_data is None:
             raise ValueError('No data field in this transaction')
@@ -48,25 +114,16 @@ class DecodedTransaction:
         if value is None:
             raise ValueError('No value field in this transaction')
 
-        to = transaction_to.lower()
-
         byte_data = bytes(HexBytes(transaction_data))
         sig = byte_data[:4]
-        data = bytes(HexBytes(byte_data[4:]))
-
-        method, args = abi
-        expected_sig = sha3('{}({})'.format(method, ','.join(args)))[:4]
-        if sig != expected_sig:
-            raise ValueError(
-                'Method signature did not match expected, got {} expected {} ({})'.format(sig, expected_sig, method))
-
-        try:
-            parameters = decode_abi(args, data)
-        except InsufficientDataBytes:
-            raise ValueError(
-                'Transaction data did not match expected ABI (expected {}({}))'.format(method, ','.join(args)))
+        if sig != compiled.selector:
+            actual = SELECTORS.get(sig)
+            raise ValueError('Method signature did not match expected, got {} ({}) expected {} ({})'.format(
+                sig, actual.method if actual is not None else 'unknown', compiled.selector, compiled.method))
 
-        return cls(to, value, data, abi, sig, parameters)
+        data = byte_data[4:]
+        parameters = compiled.decode(data)
+        return cls(transaction_to.lower(), value, data, (compiled.method, compiled.args), sig, parameters)
 
     def __repr__(self):
         method, args = self.abi
@@ -77,13 +134,22 @@ class DecodedTransaction:
 
 
 class AbstractTransactionVerifier(metaclass=ABCMeta):
-    """Verifier is used to verify the details of a single transaction."""
+    """Verifier is used to verify the details of a single transaction.
+
+    Subclasses set ABI, which is compiled once when the class is created, and implement `matches`,
+    or override `verify` to check the raw transaction themselves.
+    """
     ABI = ('', [])
+    COMPILED_ABI = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        method, args = cls.ABI
+        cls.COMPILED_ABI = compile_abi(method, tuple(args))
 
     def __init__(self, parameters):
         self.parameters = parameters
 
-    @abstractmethod
     def verify(self, transaction):
         """Called when a list of transactions were returned from polyswarmd.
         This function will verify the transactions, and determines if the transactions are expected.
@@ -93,13 +159,54 @@ class AbstractTransactionVerifier(metaclass=ABCMeta):
         Returns:
             True if valid and expected
         """
-        raise NotImplementedError('Verify is not implemented')
+        try:
+            decoded = DecodedTransaction.from_compiled(transaction, self.COMPILED_ABI)
+        except ValueError as e:
+            logger.error('Transaction verification failed: %s', str(e))
+            return False
+
+        logger.debug('Expected: %s, Actual: %s', self, decoded)
+        return self.matches(decoded)
+
+    def matches(self, decoded):
+        """Compare a decoded transaction with what this verifier expects
+
+        Defaults to re-encoding the transaction for `verify`, for verifiers that override `verify` instead.
+
+        Args:
+            decoded (DecodedTransaction): Transaction decoded against ABI
+        Returns:
+            True if expected
+        """
+        if type(self).verify is AbstractTransactionVerifier.verify:
+            raise NotImplementedError('Verifiers must implement matches or verify')
+
+        return self.verify({'to': decoded.to, 'value': decoded.value, 'data': '0x' + (decoded.signature + decoded.data).hex()})
 
     def __repr__(self):
         method, args = self.ABI
         return '{}({})'.format(method, ', '.join(['{}:{}'.format(v, t) for v, t in zip(self.parameters, args)]))
 
 
+def verify_batch(verifiers, transactions):
+    """Verify a group of transactions, one verifier each, stopping at the first that is not expected
+
+    Args:
+        verifiers (list[AbstractTransactionVerifier]): Verifier of each transaction, in order
+        transactions (list[dict]): Transactions returned from polyswarmd
+    Returns:
+        (bool): True if there is one transaction per verifier, and all are valid and expected
+    """
+    if len(transactions) != len(verifiers):
+        return False
+
+    for verifier, transaction in zip(verifiers, transactions):
+        if not verifier.verify(transaction):
+            return False
+
+    return True
+
+
 class NctApproveVerifier(AbstractTransactionVerifier):
     ABI = ('approve', ['address', 'uint256'])
 
@@ -107,14 +214,7 @@ class NctApproveVerifier(AbstractTransactionVerifier):
         super().__init__((UNKNOWN_PARAMETER, amount))
         self.amount = amount
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         account, amount = decoded.parameters
 
         return decoded.value == 0 and amount == self.amount
@@ -127,14 +227,7 @@ class NctTransferVerifier(AbstractTransactionVerifier):
         super().__init__((UNKNOWN_PARAMETER, amount))
         self.amount = amount
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         account, amount = decoded.parameters
 
         return decoded.value == 0 and amount == self.amount
@@ -154,29 +247,21 @@ class PostBountyVerifier(AbstractTransactionVerifier):
         self.bloom = bloom
         self.metadata = metadata
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
+        # Split the bloom into the words the contract takes once, instead of joining the words of every transaction
+        self.bloom_words = None
+        if 0 <= bloom and bloom >> (256 * BLOOM_WORDS) == 0:
+            self.bloom_words = tuple((bloom >> (256 * i)) & WORD_MASK for i in reversed(range(BLOOM_WORDS)))
 
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         guid, artifact_type, amount, artifact_uri, num_artifacts, duration, bloom, metadata = decoded.parameters
 
-        bloom_value = 0
-        for b in bloom:
-            bloom_value = bloom_value << 256 | int(b)
-
-        artifact_type = ArtifactType(int(artifact_type))
-
         return decoded.value == 0 and \
-            artifact_type == self.artifact_type and \
-            artifact_uri == self.artifact_uri and \
+            artifact_type == self.artifact_type.value and \
+            amount == self.amount and \
             num_artifacts == self.num_artifacts and \
             duration == self.duration and \
-            bloom_value == self.bloom and \
-            amount == self.amount and \
+            tuple(bloom) == self.bloom_words and \
+            artifact_uri == self.artifact_uri and \
             metadata == self.metadata
 
 
@@ -191,21 +276,14 @@ class PostAssertionVerifier(AbstractTransactionVerifier):
         self.mask = mask
         self.commitment = commitment
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         bounty_guid, bid, mask, commitment = decoded.parameters
 
         return decoded.value == 0 and \
-            guid_as_string(bounty_guid) == self.bounty_guid and \
-            all((contract_bid == given_bid for contract_bid, given_bid in zip(bid, self.bid))) and \
             commitment == self.commitment and \
-            int_to_bool_list(mask, len(self.mask)) == self.mask
+            all((contract_bid == given_bid for contract_bid, given_bid in zip(bid, self.bid))) and \
+            int_to_bool_list(mask, len(self.mask)) == self.mask and \
+            guid_as_string(bounty_guid) == self.bounty_guid
 
 
 class RevealAssertionVerifier(AbstractTransactionVerifier):
@@ -220,14 +298,7 @@ class RevealAssertionVerifier(AbstractTransactionVerifier):
         self.verdicts = verdicts
         self.metadata = metadata
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         bounty_guid, index, nonce, verdicts, metadata = decoded.parameters
 
         # If there is a 1 anywhere beyond the length of items we expect, fail it
@@ -235,11 +306,11 @@ class RevealAssertionVerifier(AbstractTransactionVerifier):
             return False
 
         return decoded.value == 0 and \
-            guid_as_string(bounty_guid) == self.bounty_guid and \
             index == self.index and \
             nonce == self.nonce and \
             int_to_bool_list(verdicts, len(self.verdicts)) == self.verdicts and \
-            metadata == self.metadata
+            metadata == self.metadata and \
+            guid_as_string(bounty_guid) == self.bounty_guid
 
 
 class PostVoteVerifier(AbstractTransactionVerifier):
@@ -252,20 +323,13 @@ class PostVoteVerifier(AbstractTransactionVerifier):
         self.votes = votes
         self.valid_bloom = valid_bloom
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         bounty_guid, votes, valid_bloom = decoded.parameters
 
         return decoded.value == 0 and \
-            guid_as_string(bounty_guid) == self.bounty_guid and \
+            valid_bloom == self.valid_bloom and \
             int_to_bool_list(votes, len(self.votes)) == self.votes and \
-            valid_bloom == self.valid_bloom
+            guid_as_string(bounty_guid) == self.bounty_guid
 
 
 class SettleBountyVerifier(AbstractTransactionVerifier):
@@ -275,14 +339,7 @@ class SettleBountyVerifier(AbstractTransactionVerifier):
         super().__init__((bounty_guid,))
         self.bounty_guid = bounty_guid
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         bounty_guid, = decoded.parameters
 
         return decoded.value == 0 and \
@@ -296,14 +353,7 @@ class StakingDepositVerifier(AbstractTransactionVerifier):
         super().__init__((amount,))
         self.amount = amount
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         amount, = decoded.parameters
 
         return decoded.value == 0 and \
@@ -317,14 +367,7 @@ class StakingWithdrawVerifier(AbstractTransactionVerifier):
         super().__init__((amount,))
         self.amount = amount
 
-    def verify(self, transaction):
-        try:
-            decoded = DecodedTransaction.from_transaction(transaction, self.ABI)
-        except ValueError as e:
-            logger.error('Transaction verification failed: %s', str(e))
-            return False
-
-        logger.debug('Expected: %s, Actual: %s', self, decoded)
+    def matches(self, decoded):
         amount, = decoded.parameters
 
         return decoded.value == 0 and \
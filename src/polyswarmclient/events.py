@@ -1,18 +1,29 @@
+import asyncio
+import heapq
+import itertools
 import logging
+import time
 
 from functools import total_ordering
-from queue import PriorityQueue
 
 from polyswarmartifact import ArtifactType
 
+from polyswarmclient.metrics import LatencyHistogram
+
 logger = logging.getLogger(__name__)  # Initialize logger
 
+# Placeholder result of a handler cancelled by its timeout
+TIMED_OUT = object()
+
 
 class Callback(object):
     """
     Abstract callback class which is the parent to a number of child
     callback classes to be used in different scenarios.
 
+    By default registered functions run one after another. In concurrent mode they run together,
+    each bounded by an optional timeout. Either way the latency of each function is recorded.
+
     Note:
         Classes which extend `Callback` are expected to impliment the
         `run` method.
@@ -20,6 +31,20 @@ class Callback(object):
 
     def __init__(self):
         self.cbs = []
+        self.concurrent = False
+        self.timeout = None
+        self.histograms = {}
+
+    def configure(self, concurrent=False, timeout=None):
+        """
+        Choose how registered functions are run.
+
+        Args:
+            concurrent (bool): Run all registered functions at once with `asyncio.gather`
+            timeout (float): Seconds each function may take in concurrent mode before it is cancelled, None for no limit
+        """
+        self.concurrent = concurrent
+        self.timeout = timeout
 
     def register(self, f):
         """
@@ -29,6 +54,7 @@ class Callback(object):
             f (function): Function to register.
         """
         self.cbs.append(f)
+        self.histograms.setdefault(f, LatencyHistogram())
 
     def remove(self, f):
         """
@@ -38,6 +64,17 @@ class Callback(object):
             f (function): Function to remove.
         """
         self.cbs.remove(f)
+        if f not in self.cbs:
+            self.histograms.pop(f, None)
+
+    def stats(self):
+        """
+        Latency histogram, error and timeout counts of each registered function.
+
+        Returns:
+            (dict): Qualified function name to histogram dict
+        """
+        return {getattr(f, '__qualname__', repr(f)): histogram.asdict() for f, histogram in self.histograms.items()}
 
     async def run(self, *args, **kwargs):
         """
@@ -46,17 +83,46 @@ class Callback(object):
         Returns:
             results (List[any]): Results returned from the callback functions
         """
-        results = []
-        for cb in self.cbs:
-            local_ret = await cb(*args, **kwargs)
-            if local_ret is not None:
-                results.append(local_ret)
+        if self.concurrent:
+            returned = await asyncio.gather(*[self.__run_one(cb, args, kwargs) for cb in self.cbs],
+                                            return_exceptions=True)
+            errors = [r for r in returned if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+
+            results = [r for r in returned if r is not None and r is not TIMED_OUT]
+        else:
+            results = []
+            for cb in self.cbs:
+                local_ret = await self.__run_one(cb, args, kwargs)
+                if local_ret is not None:
+                    results.append(local_ret)
 
         if results:
             logger.info('%s callback results', type(self).__name__, extra={'extra': results})
 
         return results
 
+    async def __run_one(self, cb, args, kwargs):
+        histogram = self.histograms[cb]
+        start = time.perf_counter()
+        try:
+            if self.concurrent and self.timeout is not None:
+                try:
+                    return await asyncio.wait_for(cb(*args, **kwargs), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    histogram.timeouts += 1
+                    logger.warning('%s handler %s timed out after %s seconds', type(self).__name__,
+                                   getattr(cb, '__qualname__', repr(cb)), self.timeout)
+                    return TIMED_OUT
+
+            return await cb(*args, **kwargs)
+        except Exception:
+            histogram.errors += 1
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
 
 # Create these subclasses so we can document the parameters to each callback
 class OnRunCallback(Callback):
@@ -244,11 +310,22 @@ class OnInitializedChannelCallback(Callback):
 
 class Schedule(object):
     """
-    Generic Schedule class. Uses a PriorityQueue data structure to store Events.
+    Generic Schedule class. Stores Events in a min heap ordered by block, without any locking.
+
+    Each event is stored once per `Event.key`, scheduling the same key again replaces the earlier entry.
+    Cancelled and replaced entries stay in the heap, and are skipped once they reach the front.
     """
 
     def __init__(self):
-        self.queue = PriorityQueue()
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, event):
+        return event.key in self.entries
 
     def empty(self):
         """
@@ -257,31 +334,87 @@ class Schedule(object):
         Returns:
             boolean: Is the queue empty.
         """
-        return self.queue.empty()
+        return not self.entries
 
     def peek(self):
         """
-        Return True if the queue is empty.
+        Return the next event due, without removing it.
 
         Returns:
             (block, event): Tuple at the front of the queue if the queue is full, else `None`.
         """
-        return self.queue.queue[0] if self.queue.queue else None
+        self.__discard_removed()
+        if not self.heap:
+            return None
+
+        block, _, event = self.heap[0]
+        return block, event
 
     def get(self):
         """
         Pop the lowest valued block in the queue.
 
         Returns:
-            (block, event): The lowest valued block in the PriorityQueue.
+            (block, event): The lowest valued block in the queue.
+        Raises:
+            IndexError: If the queue is empty.
         """
-        return self.queue.get()
+        self.__discard_removed()
+        block, _, event = heapq.heappop(self.heap)
+        del self.entries[event.key]
+        return block, event
 
     def put(self, block, event):
         """
-        Add a tuple (block, event) to the PriorityQueue. Block signifies the priority of the event.
+        Add a tuple (block, event) to the queue. Block signifies the priority of the event.
+
+        Replaces any event already scheduled with the same key.
+
+        Returns:
+            bool: True if the event was new, False if it replaced a scheduled event.
         """
-        self.queue.put((block, event))
+        replaced = self.cancel(event)
+        entry = [block, next(self.counter), event]
+        self.entries[event.key] = entry
+        heapq.heappush(self.heap, entry)
+        return not replaced
+
+    def cancel(self, event):
+        """
+        Remove a scheduled event.
+
+        Args:
+            event (Event): Event with the same key as the one to remove.
+        Returns:
+            bool: True if an event was removed.
+        """
+        entry = self.entries.pop(event.key, None)
+        if entry is None:
+            return False
+
+        entry[2] = None
+        return True
+
+    def pop_due(self, block):
+        """
+        Pop every event due before the given block.
+
+        Args:
+            block (int): Current block
+        Returns:
+            List[(block, event)]: Due events, in the order they are due.
+        """
+        due = []
+        while True:
+            self.__discard_removed()
+            if not self.heap or self.heap[0][0] >= block:
+                return due
+
+            due.append(self.get())
+
+    def __discard_removed(self):
+        while self.heap and self.heap[0][2] is None:
+            heapq.heappop(self.heap)
 
 
 @total_ordering
@@ -296,6 +429,43 @@ class Event(object):
     def __init__(self, guid):
         self.guid = guid
 
+    @property
+    def key(self):
+        """Identity of the event in a Schedule, events with equal keys replace each other"""
+        return type(self).__name__, self.guid
+
+    def fields(self):
+        """
+        Returns:
+            (dict): Constructor arguments that recreate this event
+        """
+        return {'guid': self.guid}
+
+    def to_dict(self):
+        """
+        Returns:
+            (dict): JSON serializable form of the event, read back with `Event.from_dict`
+        """
+        return dict(self.fields(), type=type(self).__name__)
+
+    @staticmethod
+    def from_dict(d):
+        """Recreate a scheduled event from `Event.to_dict`
+
+        Args:
+            d (dict): Serialized event
+        Returns:
+            (Event): The event
+        Raises:
+            ValueError: If the type is not a scheduled event
+        """
+        fields = dict(d)
+        event_type = SCHEDULED_EVENTS.get(fields.pop('type', None))
+        if event_type is None:
+            raise ValueError('Unknown scheduled event {0}'.format(d.get('type')))
+
+        return event_type(**fields)
+
     def __eq__(self, other):
         return self.guid == other.guid
 
@@ -322,6 +492,14 @@ class RevealAssertion(Event):
         self.verdicts = verdicts
         self.metadata = metadata
 
+    @property
+    def key(self):
+        return type(self).__name__, self.guid, self.index
+
+    def fields(self):
+        return {'guid': self.guid, 'index': self.index, 'nonce': self.nonce, 'verdicts': self.verdicts,
+                'metadata': self.metadata}
+
 
 class OnRevealAssertionDueCallback(Callback):
     """Called when an assertion is needing to be revealed"""
@@ -354,6 +532,9 @@ class VoteOnBounty(Event):
         self.votes = votes
         self.valid_bloom = valid_bloom
 
+    def fields(self):
+        return {'guid': self.guid, 'votes': self.votes, 'valid_bloom': self.valid_bloom}
+
 
 class OnVoteOnBountyDueCallback(Callback):
     """Called when a bounty is needing to be voted on"""
@@ -400,11 +581,20 @@ class WithdrawStake(Event):
 
     Args:
         amount (int): Amount to withdraw from stake
+        block (int): Block the withdrawal is scheduled for, withdrawals for different blocks are kept apart
     """
 
-    def __init__(self, amount):
+    def __init__(self, amount, block=None):
         super().__init__(None)
         self.amount = amount
+        self.block = block
+
+    @property
+    def key(self):
+        return type(self).__name__, self.amount, self.block
+
+    def fields(self):
+        return {'amount': self.amount, 'block': self.block}
 
 
 class OnWithdrawStakeDueCallback(Callback):
@@ -418,3 +608,8 @@ class OnWithdrawStakeDueCallback(Callback):
             chain (str): Chain event received on
         """
         return await super().run(amount, chain)
+
+
+# Events a Schedule holds, by name, for reading them back from a ScheduleJournal
+SCHEDULED_EVENTS = {event_type.__name__: event_type for event_type in (RevealAssertion, VoteOnBounty, SettleBounty,
+                                                                       WithdrawStake)}
@@ -46,6 +46,15 @@ class RateLimitedError(PolyswarmClientException):
     """
     Hit the rate limit from polyswarmd
     """
+    def __init__(self, message='', retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ArtifactTooLargeError(PolyswarmClientException):
+    """
+    Artifact is larger than the maximum size we are willing to download
+    """
     pass
 
 
@@ -75,6 +84,12 @@ class ScannerSetupFailedError(PolyswarmClientException):
     """
 
 
+class DeadlineExceededError(PolyswarmClientException):
+    """
+    Bounty deadline passed before the work on it could start
+    """
+
+
 class FatalError(ClickException):
     def __init__(self, message='', exit_code=0):
         super().__init__(message)
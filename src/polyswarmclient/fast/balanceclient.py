@@ -1,6 +1,5 @@
 import warnings
 
-import backoff
 import cachetools
 import logging
 import os
@@ -9,7 +8,6 @@ from polyswarmclient.exceptions import LowBalanceError
 
 logger = logging.getLogger(__name__)  # Initialize logger
 
-MAX_TRIES = int(os.environ.get('MAX_TRIES', 3))
 TTL = int(os.environ.get('BALANCE_TTL', 5 * 60))
 MAX_SIZE = 20
 
@@ -17,29 +15,51 @@ MAX_SIZE = 20
 class BalanceClient(object):
     def __init__(self, client):
         self.__client = client
+        # Each entry is a one item list, changed in place so debits and refunds do not push back its expiry
         self.cache = cachetools.TTLCache(ttl=TTL, maxsize=MAX_SIZE)
 
-    @backoff.on_exception(backoff.expo, LowBalanceError, max_tries=MAX_TRIES)
     async def raise_for_low_balance(self, request_nct, chain):
         key = f'{self.__client.account}:{chain}'
-        if key in self.cache:
+        cached = self.cache.get(key)
+        if cached is not None:
             logger.debug('Reading balance from cache')
-            balance = self.cache[key]
         else:
             logger.debug('Reading balance from database')
             balance = await self.get_nct_balance(chain)
             if balance == 0:
                 warnings.warn('Got 0 balance, pretending it is 1000 NCT')
                 balance = 1000 * 10 ** 18
-            self.cache[key] = balance
+            cached = self.cache.setdefault(key, [balance])
 
-        # If we don't have the balance, don't submit. Wait and try a few times, then skip
-        if balance < request_nct:
+        # If we don't have the balance, don't submit
+        if cached[0] < request_nct:
             logger.critical('Insufficient balance to send transaction on %s. Have %s NCT. Need %s NCT.', chain,
-                            balance,
+                            cached[0],
                             request_nct)
             raise LowBalanceError
 
+        # Debit the cached balance right away, so concurrent checks see the funds as spent
+        cached[0] -= request_nct
+
+    def confirm(self, request_nct, chain):
+        """Settle NCT debited by `raise_for_low_balance` for a transaction that was mined, already spent here
+
+        Args:
+            request_nct (int): NCT passed to raise_for_low_balance
+            chain (str): Which chain to operate on
+        """
+
+    def refund(self, request_nct, chain):
+        """Return NCT debited by `raise_for_low_balance` for a transaction that was not sent or failed
+
+        Args:
+            request_nct (int): NCT passed to raise_for_low_balance
+            chain (str): Which chain to operate on
+        """
+        cached = self.cache.get(f'{self.__client.account}:{chain}')
+        if cached is not None:
+            cached[0] += request_nct
+
     async def get_nct_balance(self, chain, api_key=None):
         """Get nectar balance from polyswarmd
 
@@ -6,6 +6,7 @@ from collections import Iterable
 from polyswarmartifact import ArtifactType
 from polyswarmclient.fast.transaction import PolySwarmTransactionRequest
 from polyswarmclient.parameters import Parameters
+from polyswarmclient.request_rate_limit import Priority
 from polyswarmtransaction.bounty import BountyTransaction, AssertionTransaction, VoteTransaction
 from polyswarmclient.exceptions import InvalidMetadataError
 
@@ -36,6 +37,8 @@ class PostAssertionTransactionRequest(PolySwarmTransactionRequest):
 
 
 class PostVoteTransactionRequest(PolySwarmTransactionRequest):
+    priority = Priority.HIGH
+
     @property
     def path(self):
         return f'/bounties/{self.bounty_guid}/votes/'
@@ -5,6 +5,7 @@ from typing import Any, Dict
 from polyswarmtransaction import SignedTransaction, Transaction
 from polyswarmclient import Client
 from polyswarmclient.exceptions import TransactionError
+from polyswarmclient.request_rate_limit import Priority
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,8 @@ class PolySwarmTransactionRequest(metaclass=ABCMeta):
 
     For instance, when approving some funds to move, and calling a contract function that will consumer them.
     """
+    # Priority of the request under client side rate limits
+    priority = Priority.NORMAL
 
     def __init__(self, client: Client, transaction: Transaction):
         """Initialize a transaction
@@ -36,20 +39,28 @@ class PolySwarmTransactionRequest(metaclass=ABCMeta):
         if api_key is None:
             api_key = self.client.api_key
 
-        signed = self.sign_transaction()
+        signed = await self.sign_transaction_async()
         return await self.post_transaction(signed, api_key)
 
     def sign_transaction(self) -> SignedTransaction:
-        """Signs a transaction
+        """Signs a transaction on the calling thread
 
         Returns:
             SignedTransaction
         """
         return self.transaction.sign(self.client.priv_key)
 
+    async def sign_transaction_async(self) -> SignedTransaction:
+        """Signs a transaction in the client signing pool, off the event loop
+
+        Returns:
+            SignedTransaction
+        """
+        return await self.client.signer.sign_polyswarm_transaction(self.transaction)
+
     async def post_transaction(self, signed: SignedTransaction, api_key: str) -> Dict[str, Any]:
         success, results = await self.client.make_request('POST', self.path, json=signed.payload, api_key=api_key,
-                                                          chain='side')
+                                                          chain='side', priority=self.priority)
         # TODO: Remove this temporary solution once there is time to use raise_for_status in make_request
         if not success:
             logger.error('Error posting transaction: %s', results)
@@ -0,0 +1,65 @@
+import bisect
+import math
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket holds everything slower
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, math.inf)
+
+
+class LatencyHistogram(object):
+    """Cumulative latency histogram with fixed buckets, plus error and timeout counters
+
+    Args:
+        buckets (tuple(float)): Sorted upper bounds of each bucket in seconds, ending with infinity
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.timeouts = 0
+
+    def observe(self, seconds):
+        """Record one latency
+
+        Args:
+            seconds (float): Latency in seconds
+        """
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket holding it
+
+        Args:
+            q (float): Quantile between 0 and 1
+        Returns:
+            (float): Upper bound in seconds, or 0 with no observations
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def asdict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
@@ -1,17 +1,92 @@
-import aiorwlock
+from types import MappingProxyType
 
 
 class Parameters(object):
-    """Trivial wrapper around a dict but protected via a RWLock to allow updates"""
+    """Contract parameters, read from an immutable snapshot that updates replace whole
+
+    Updates are rare, and reads happen several times per bounty, so reads take no lock and never await.
+    An update copies the current snapshot, applies the change and swaps the copy in with a single assignment,
+    so a snapshot taken before the update never changes underneath the reader.
+
+    Read a parameter as an attribute (`parameters.assertion_fee`), an item (`parameters['assertion_fee']`),
+    with a typed accessor (`parameters.get_int('assertion_fee')`), or read several at once from the same snapshot
+    (`parameters.values('assertion_reveal_window', 'arbiter_vote_window')`).
+
+    Args:
+        p (dict): Parameters as returned by polyswarmd
+    """
 
     def __init__(self, p):
-        self.rwlock = aiorwlock.RWLock()
-        self.inner = p
+        self.inner = MappingProxyType(dict(p))
+
+    def __getattr__(self, name):
+        # Only called for names that are not real attributes, like the parameters themselves
+        try:
+            return self.__dict__['inner'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self.inner[name]
+
+    def __contains__(self, name):
+        return name in self.inner
+
+    def snapshot(self):
+        """
+        Returns:
+            (MappingProxyType): Read only view of every parameter, unaffected by later updates
+        """
+        return self.inner
+
+    def values(self, *names):
+        """Read several parameters from the same snapshot
+
+        Args:
+            names (list[str]): Parameters to read
+
+        Returns:
+            (tuple): Value of each parameter, None if missing
+        """
+        inner = self.inner
+        return tuple(inner.get(name) for name in names)
+
+    def get_int(self, name, default=None):
+        """
+        Args:
+            name (str): Parameter to read
+            default (int): Value if the parameter is missing
+
+        Returns:
+            (int): Parameter as an int
+        """
+        value = self.inner.get(name)
+        return default if value is None else int(value)
+
+    def get_bool(self, name, default=None):
+        """
+        Args:
+            name (str): Parameter to read
+            default (bool): Value if the parameter is missing
+
+        Returns:
+            (bool): Parameter as a bool
+        """
+        value = self.inner.get(name)
+        return default if value is None else bool(value)
+
+    def replace(self, new):
+        """Swap in a snapshot with `new` applied on top of the current one
+
+        Args:
+            new (dict): Parameters that changed
+        """
+        updated = dict(self.inner)
+        updated.update(new)
+        self.inner = MappingProxyType(updated)
 
     async def update(self, new):
-        async with self.rwlock.writer:
-            self.inner.update(new)
+        self.replace(new)
 
     async def get(self, name):
-        async with self.rwlock.reader:
-            return self.inner.get(name)
+        return self.inner.get(name)
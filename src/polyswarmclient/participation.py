@@ -0,0 +1,124 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Directory the participation index of each account and chain is kept in, unset keeps it in memory only
+PARTICIPATION_INDEX_DIR = os.environ.get('PARTICIPATION_INDEX_DIR')
+
+
+class Role:
+    """How an account took part in a bounty"""
+    AUTHOR = 'author'
+    ASSERTER = 'asserter'
+    VOTER = 'voter'
+    # Looked up, and the account did not take part
+    NONE = 'none'
+
+
+ROLES = {Role.AUTHOR, Role.ASSERTER, Role.VOTER, Role.NONE}
+
+
+class ParticipationIndex:
+    """Local record of which bounties an account took part in, so settling does not need to ask polyswarmd
+
+    Records are appended to a log file, one `guid role` line each, and read back on start up.
+    Taking part always overrides an earlier record of not taking part.
+
+    Args:
+        path (str): Log file, None to keep the index in memory only
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.roles = {}
+        self.file = None
+        if path is not None:
+            self.__load()
+
+    @classmethod
+    def for_account(cls, account, chain, directory=PARTICIPATION_INDEX_DIR):
+        """Index of one account on one chain, in `directory` if set"""
+        if not directory:
+            return cls()
+
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, 'participation-{0}-{1}.log'.format(account.lower(), chain)))
+
+    def __len__(self):
+        return len(self.roles)
+
+    def __contains__(self, guid):
+        return guid in self.roles
+
+    def get(self, guid):
+        """
+        Returns:
+            (bool): Whether we took part in the bounty, or None if it is not in the index
+        """
+        role = self.roles.get(guid)
+        if role is None:
+            return None
+
+        return role != Role.NONE
+
+    def record(self, guid, role):
+        """Record how we took part in a bounty
+
+        Args:
+            guid (str): Bounty GUID
+            role (str): A Role
+        """
+        current = self.roles.get(guid)
+        if current == role or (role == Role.NONE and current is not None):
+            return
+
+        self.roles[guid] = role
+        if self.path is not None:
+            self.__append(guid, role)
+
+    def compact(self):
+        """Rewrite the log with one line per bounty"""
+        if self.path is None:
+            return
+
+        self.close()
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            f.writelines('{0} {1}\n'.format(guid, role) for guid, role in self.roles.items())
+
+        os.replace(temporary, self.path)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __append(self, guid, role):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+
+        self.file.write('{0} {1}\n'.format(guid, role))
+        self.file.flush()
+
+    def __load(self):
+        if not os.path.exists(self.path):
+            return
+
+        lines = 0
+        with open(self.path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                # Skip a line cut short by a crash
+                if len(parts) != 2 or parts[1] not in ROLES:
+                    continue
+
+                lines += 1
+                guid, role = parts
+                if role != Role.NONE or guid not in self.roles:
+                    self.roles[guid] = role
+
+        if lines > 2 * len(self.roles):
+            self.compact()
+
+        logger.debug('Loaded %s bounties from participation index %s', len(self.roles), self.path)
@@ -3,11 +3,11 @@ from asyncio import Future
 import aioredis
 import asyncio
 
-import json
 import logging
 import time
 
 from polyswarmartifact import ArtifactType
+from polyswarmclient import codec
 from polyswarmclient.filters.filter import MetadataFilter
 from polyswarmclient.producer.job import JobRequest
 from polyswarmclient.producer.jobprocessor import JobProcessor
@@ -104,7 +104,7 @@ class Producer:
                 loop.create_task(self._update_job_counter(len(jobs)))
 
                 # Send jobs as json string to backend
-                loop.create_task(self._send_jobs([json.dumps(job.asdict()) for job in jobs]))
+                loop.create_task(self._send_jobs([codec.dumpb(job.asdict()) for job in jobs]))
 
                 # Send jobs to job processor
                 future = Future()
@@ -1,6 +1,5 @@
 import aioredis
 import asyncio
-import json
 import logging
 import math
 import time
@@ -9,6 +8,7 @@ from aioredis import Redis
 from asyncio import Future, Task
 from typing import Dict, List, Optional, Tuple, Coroutine, Callable
 
+from polyswarmclient import codec
 from polyswarmclient.abstractscanner import ScanResult
 from polyswarmclient.filters.confidencefilter import ConfidenceModifier
 from polyswarmclient.producer.job import JobRequest, JobResponse
@@ -49,7 +49,7 @@ class PendingJob:
             # Check expired before doing any redis connections
             if not self.__is_expired():
                 async for result in self.__redis_results(redis):
-                    response = JobResponse(**json.loads(result.decode('utf-8')))
+                    response = JobResponse(**codec.loads(result))
                     logger.debug('Found job response', extra={'extra': response.asdict()})
                     self.__store_job_response(response, confidence_modifier)
                     if self.is_done():
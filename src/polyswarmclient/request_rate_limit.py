@@ -1,44 +1,327 @@
 import asyncio
+import email.utils
+import heapq
+import itertools
 import logging
+import os
+import time
 
+from enum import IntEnum
 
 logger = logging.getLogger(__name__)
 
 RATE_LIMIT_SLEEP = 2
 
+# Requests per second allowed to each route class, 0 means no limit until polyswarmd answers with a 429
+RATE_LIMIT_TRANSACTIONS = float(os.environ.get('RATE_LIMIT_TRANSACTIONS', 0))
+RATE_LIMIT_ARTIFACTS = float(os.environ.get('RATE_LIMIT_ARTIFACTS', 0))
+RATE_LIMIT_READS = float(os.environ.get('RATE_LIMIT_READS', 0))
+# Seconds worth of requests that can be sent in a burst
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 2))
+# On a 429 the rate is multiplied by RATE_LIMIT_DECREASE, then grows back by RATE_LIMIT_RECOVERY requests/s per second.
+# Route classes without a configured rate start from the rate they were sent at, and are unlimited again once recovered
+RATE_LIMIT_DECREASE = float(os.environ.get('RATE_LIMIT_DECREASE', 0.5))
+RATE_LIMIT_RECOVERY = float(os.environ.get('RATE_LIMIT_RECOVERY', 1))
+MIN_RATE = 0.5
+
+
+class Priority(IntEnum):
+    """Order in which requests waiting on a rate limit are released"""
+    # Deadline bound actions, such as reveals, votes and settles
+    HIGH = 0
+    NORMAL = 1
+    # Background work, such as settling every old bounty
+    LOW = 2
+
+
+class RouteClass:
+    """Groups of polyswarmd routes that are limited separately"""
+    TRANSACTIONS = 'transactions'
+    ARTIFACTS = 'artifacts'
+    READS = 'reads'
+
+    @staticmethod
+    def of(method, path):
+        """Classify a request
+
+        Args:
+            method (str): HTTP method
+            path (str): Path portion of the URI
+        Returns:
+            (str): Route class
+        """
+        if path.startswith('/artifacts'):
+            return RouteClass.ARTIFACTS
+
+        # Every other write builds or posts transactions
+        if method != 'GET' or path.startswith('/transactions'):
+            return RouteClass.TRANSACTIONS
+
+        return RouteClass.READS
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header
+
+    Args:
+        value (str): Header value, either seconds or an HTTP date
+    Returns:
+        (float): Seconds to wait, or None if missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if retry_at is None:
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class TokenBucket:
+    """Token bucket with prioritised waiters, and a rate that halves on 429s then recovers linearly
+
+    Without a configured rate the bucket is unlimited, and only measures how fast requests are sent. A 429 limits it
+    to a fraction of that, and it recovers up to that rate, then is unlimited again.
+
+    Args:
+        name (str): Name used in logs
+        rate (float): Most requests per second, 0 means no limit
+        burst (float): Most tokens that can build up
+    """
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.max_rate = rate
+        # Rate the current limit recovers to, None while unlimited
+        self.ceiling = rate if rate > 0 else None
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.strict_pause = False
+        self.waiters = []
+        self.counter = itertools.count()
+        self.wakeup = None
+        self.throttled = 0
+        self.waited = 0
+        self.window_start = self.updated
+        self.window_count = 0
+        self.sent_rate = 0.0
+
+    @property
+    def unlimited(self):
+        return self.ceiling is None
+
+    async def acquire(self, priority=Priority.NORMAL):
+        """Wait for a token
+
+        Args:
+            priority (Priority): Waiters with a higher priority are released first
+        """
+        now = time.monotonic()
+        self.__refill(now)
+        if not self.waiters and not self.__paused(now, priority) and self.__available():
+            self.__take()
+            return
+
+        self.waited += 1
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        self.__schedule_wakeup(0)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Released just as we were cancelled, give the token back
+                self.tokens = min(self.burst, self.tokens + 1)
+            raise
+
+    def throttle(self, retry_after=None):
+        """Back off after a 429
+
+        Args:
+            retry_after (float): Seconds polyswarmd asked us to wait. Everything waits that long.
+                Without it, normal and low priority requests wait RATE_LIMIT_SLEEP, while high priority requests only
+                see the reduced rate
+        """
+        now = time.monotonic()
+        self.__refill(now)
+        self.throttled += 1
+        if self.unlimited:
+            # Back off from the rate that drew the 429
+            self.ceiling = max(MIN_RATE, self.sent_rate, self.window_count / max(now - self.window_start, 1.0))
+            self.rate = self.ceiling
+
+        self.rate = max(MIN_RATE, self.rate * RATE_LIMIT_DECREASE)
+        self.tokens = min(self.tokens, 0)
+
+        delay = retry_after if retry_after is not None else RATE_LIMIT_SLEEP
+        if now + delay >= self.paused_until:
+            self.paused_until = now + delay
+            self.strict_pause = retry_after is not None
+
+        logger.debug('Rate limiting %s for %s seconds, now %s requests/s', self.name, delay, self.rate)
+        self.__schedule_wakeup(0)
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'max_rate': self.max_rate,
+            'ceiling': self.ceiling,
+            'tokens': self.tokens,
+            'waiting': len(self.waiters),
+            'waited': self.waited,
+            'throttled': self.throttled,
+        }
+
+    def __paused(self, now, priority):
+        if now >= self.paused_until:
+            return False
+
+        return self.strict_pause or priority != Priority.HIGH
+
+    def __available(self):
+        return self.unlimited or self.tokens >= 1
+
+    def __take(self):
+        if not self.unlimited:
+            self.tokens -= 1
+
+        # Requests per second over the last whole second, what an unlimited bucket backs off from
+        now = time.monotonic()
+        if now - self.window_start >= 1:
+            self.sent_rate = self.window_count / (now - self.window_start)
+            self.window_start = now
+            self.window_count = 0
+
+        self.window_count += 1
+
+    def __refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        if self.unlimited:
+            return
+
+        self.rate = min(self.ceiling, self.rate + RATE_LIMIT_RECOVERY * elapsed)
+        self.tokens = min(self.burst, self.tokens + self.rate * elapsed)
+        if self.max_rate <= 0 and self.rate >= self.ceiling:
+            logger.debug('Rate limit on %s recovered, no longer limiting', self.name)
+            self.ceiling = None
+
+    def __schedule_wakeup(self, delay):
+        if self.wakeup is not None:
+            self.wakeup.cancel()
+
+        self.wakeup = asyncio.get_event_loop().call_later(delay, self.__release)
+
+    def __release(self):
+        self.wakeup = None
+        now = time.monotonic()
+        self.__refill(now)
+
+        while self.waiters:
+            priority, _, future = self.waiters[0]
+            if future.done():
+                heapq.heappop(self.waiters)
+                continue
+
+            if self.__paused(now, priority) or not self.__available():
+                break
+
+            heapq.heappop(self.waiters)
+            self.__take()
+            future.set_result(None)
+
+        if not self.waiters:
+            return
+
+        priority = self.waiters[0][0]
+        if self.__paused(now, priority):
+            delay = self.paused_until - now
+        else:
+            delay = (1 - self.tokens) / self.rate
+
+        self.__schedule_wakeup(max(delay, 0.001))
+
 
 class RequestRateLimit:
-    def __init__(self, event, lock):
+    """Client side rate limits for polyswarmd, with a token bucket per route class
+
+    Route classes are unlimited unless a rate is configured, until a 429 pauses and slows them down.
+    The global event still pauses every request when triggered without a route class.
+    """
+    def __init__(self, event, lock, buckets=None):
         self.is_limited = False
         self.rate_limit_event = event
         self.lock = lock
+        if buckets is None:
+            buckets = {
+                RouteClass.TRANSACTIONS: TokenBucket(RouteClass.TRANSACTIONS, RATE_LIMIT_TRANSACTIONS,
+                                                     RATE_LIMIT_TRANSACTIONS * RATE_LIMIT_BURST),
+                RouteClass.ARTIFACTS: TokenBucket(RouteClass.ARTIFACTS, RATE_LIMIT_ARTIFACTS,
+                                                  RATE_LIMIT_ARTIFACTS * RATE_LIMIT_BURST),
+                RouteClass.READS: TokenBucket(RouteClass.READS, RATE_LIMIT_READS, RATE_LIMIT_READS * RATE_LIMIT_BURST),
+            }
+
+        self.buckets = buckets
 
     @classmethod
-    async def build(cls):
+    async def build(cls, buckets=None):
         event = asyncio.Event()
         lock = asyncio.Lock()
         event.set()
-        return cls(event, lock)
+        return cls(event, lock, buckets)
 
-    async def check(self):
+    async def check(self, route=None, priority=Priority.NORMAL):
+        """Wait until a request may be sent
+
+        Args:
+            route (str): RouteClass of the request, None to only wait on the global limit
+            priority (Priority): Priority of the request
+        """
         await self.rate_limit_event.wait()
+        if route is not None:
+            await self.buckets[route].acquire(priority)
 
-    async def trigger(self):
+    async def trigger(self, route=None, retry_after=None):
         """
         Rate limit new outgoing requests, and debounces to prevent simultaneous triggers
+
+        Args:
+            route (str): RouteClass that received a 429, None to pause every request
+            retry_after (float): Seconds polyswarmd asked us to wait
         """
+        if route is not None:
+            self.buckets[route].throttle(retry_after)
+            return
+
         async with self.lock:
             if self.is_limited:
                 return
             self.is_limited = True
 
-        await self.limit()
+        await self.limit(retry_after)
 
         async with self.lock:
             self.is_limited = False
 
-    async def limit(self):
-        logger.debug('Rate limiting for %s seconds', RATE_LIMIT_SLEEP)
+    async def limit(self, delay=None):
+        delay = delay if delay is not None else RATE_LIMIT_SLEEP
+        logger.debug('Rate limiting for %s seconds', delay)
         self.rate_limit_event.clear()
-        await asyncio.sleep(RATE_LIMIT_SLEEP)
+        await asyncio.sleep(delay)
         self.rate_limit_event.set()
+
+    def stats(self):
+        """Current rate, tokens, waiters and 429 count of each route class"""
+        return {route: bucket.stats() for route, bucket in self.buckets.items()}
@@ -0,0 +1,121 @@
+import cachetools
+import logging
+import os
+import re
+import time
+
+from polyswarmclient.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Most results remembered across all routes with a TTL
+ROUTE_CACHE_SIZE = int(os.environ.get('ROUTE_CACHE_SIZE', 1024))
+
+
+class RoutePolicy(object):
+    """How Client.make_request treats idempotent GET requests to paths matching a pattern
+
+    Args:
+        pattern (str): Regular expression matched against the whole request path
+        coalesce (bool): Share one in-flight request between concurrent identical requests
+        ttl (float): Seconds to reuse a successful result, 0 to only share in-flight requests
+    """
+    def __init__(self, pattern, coalesce=True, ttl=0):
+        self.pattern = re.compile(pattern)
+        self.coalesce = coalesce
+        self.ttl = ttl
+
+    def matches(self, path):
+        return self.pattern.fullmatch(path) is not None
+
+
+# First match wins. Results are only reused for a TTL on routes that change slowly, nothing is cached by default
+DEFAULT_ROUTE_POLICIES = [
+    RoutePolicy(r'/balances/[^/]+/\w+(/\w+)?'),
+    RoutePolicy(r'/nonce'),
+    RoutePolicy(r'/pending'),
+    RoutePolicy(r'/bounties/parameters/?'),
+    RoutePolicy(r'/staking/parameters/?'),
+    RoutePolicy(r'/bounties/[^/]+(/\w+)?/?'),
+    RoutePolicy(r'/.*'),
+]
+
+
+class RequestCoalescer(object):
+    """Applies a table of RoutePolicy to requests
+
+    Args:
+        policies (list(RoutePolicy)): Policy table, the first policy matching a path is used
+        cache_size (int): Most results remembered across all routes with a TTL
+    """
+    def __init__(self, policies=None, cache_size=ROUTE_CACHE_SIZE):
+        self.policies = list(policies) if policies is not None else list(DEFAULT_ROUTE_POLICIES)
+        self.cache = cachetools.LRUCache(maxsize=cache_size)
+        self.in_flight = SingleFlight()
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def set_policy(self, pattern, coalesce=True, ttl=0):
+        """Add a policy ahead of the existing ones
+
+        Args:
+            pattern (str): Regular expression matched against the whole request path
+            coalesce (bool): Share one in-flight request between concurrent identical requests
+            ttl (float): Seconds to reuse a successful result
+        """
+        self.policies.insert(0, RoutePolicy(pattern, coalesce, ttl))
+
+    def match(self, method, path):
+        """Find the policy for a request
+
+        Returns:
+            (RoutePolicy): First matching policy, or None if the request must always be sent
+        """
+        if method != 'GET':
+            return None
+
+        for policy in self.policies:
+            if policy.matches(path):
+                return policy
+
+        return None
+
+    def invalidate(self):
+        """Forget every remembered result"""
+        self.cache.clear()
+
+    async def run(self, policy, key, func, *args, **kwargs):
+        """Run a request under a policy
+
+        Args:
+            policy (RoutePolicy): Policy from `match`
+            key (hashable): Identity of the request, including everything that changes the response
+            func (coroutine function): Sends the request, returning (success, result)
+        Returns:
+            (bool, obj): Result of func, possibly shared with other callers
+        """
+        if policy.ttl > 0:
+            cached = self.cache.get(key)
+            if cached is not None:
+                expiration, response = cached
+                if expiration > time.monotonic():
+                    self.cache_hits += 1
+                    return response
+
+                self.cache.pop(key, None)
+
+        if not policy.coalesce:
+            return await self.__send(policy, key, func, *args, **kwargs)
+
+        if key in self.in_flight:
+            self.coalesced += 1
+
+        return await self.in_flight.run(key, self.__send, policy, key, func, *args, **kwargs)
+
+    async def __send(self, policy, key, func, *args, **kwargs):
+        response = await func(*args, **kwargs)
+        success, _ = response
+        if success and policy.ttl > 0:
+            self.cache[key] = (time.monotonic() + policy.ttl, response)
+
+        return response
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Most artifacts handed to a single AbstractScanner.scan_batch call
+SCAN_BATCH_SIZE = int(os.environ.get('SCAN_BATCH_SIZE', 16))
+# Seconds an artifact waits for others from the same bounty before its batch is scanned anyway
+SCAN_BATCH_LATENCY = float(os.environ.get('SCAN_BATCH_LATENCY', 0.05))
+
+
+class ScanBatch:
+    """Artifacts from one bounty waiting to be scanned together"""
+
+    def __init__(self, key):
+        self.key = key
+        self.contents = []
+        self.metadatas = []
+        self.verdict_keys = []
+        self.futures = []
+        self.timer = None
+
+    def __len__(self):
+        return len(self.contents)
+
+    def add(self, content, metadata, verdict_key=None):
+        """
+        Args:
+            content (bytes): Artifact content
+            metadata (dict): Artifact metadata
+            verdict_key (str): sha256 the result is cached under, None to not cache it
+        Returns:
+            (asyncio.Future): Resolves to the ScanResult of just this artifact
+        """
+        future = asyncio.get_event_loop().create_future()
+        self.contents.append(content)
+        self.metadatas.append(metadata)
+        self.verdict_keys.append(verdict_key)
+        self.futures.append(future)
+        return future
+
+    def resolve(self, results):
+        for future, result in zip(self.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def fail(self, exception):
+        for future in self.futures:
+            if not future.done():
+                future.set_exception(exception)
+
+
+class ScanBatcher:
+    """Collects artifacts scanned one at a time into calls to `AbstractScanner.scan_batch`
+
+    Artifacts are grouped by bounty, and a group is scanned once it reaches `max_size` or its oldest artifact has
+    waited `max_latency` seconds.
+
+    Args:
+        scanner (AbstractScanner): Scanner implementing scan_batch
+        max_size (int): Most artifacts in one scan_batch call
+        max_latency (float): Seconds an artifact may wait for others, 0 to scan each on its own
+    """
+
+    def __init__(self, scanner, max_size=SCAN_BATCH_SIZE, max_latency=SCAN_BATCH_LATENCY):
+        self.scanner = scanner
+        self.max_size = max(1, max_size)
+        self.max_latency = max_latency
+        self.pending = {}
+        self.tasks = set()
+        self.batches = 0
+        self.artifacts = 0
+
+    @classmethod
+    def for_scanner(cls, scanner, **kwargs):
+        """
+        Returns:
+            (ScanBatcher): Batcher for the scanner, or None if it has no scan_batch of its own
+        """
+        if scanner is None or not scanner.implements_scan_batch:
+            return None
+
+        return cls(scanner, **kwargs)
+
+    async def scan(self, guid, artifact_type, content, metadata, chain):
+        """Scan one artifact as part of a batch
+
+        Args:
+            guid (str): GUID of the bounty under analysis
+            artifact_type (ArtifactType): Artifact type for the bounty being scanned
+            content (bytes): Content of the artifact to scan
+            metadata (dict): Metadata dict from the ambassador
+            chain (str): What chain are we operating on
+        Returns:
+            ScanResult: Result of this scan
+        """
+        verdict_key = await self.scanner.verdict_key(content, metadata)
+        cached = self.scanner.cached_verdict(verdict_key)
+        if cached is not None:
+            return cached
+
+        key = (guid, artifact_type, chain)
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = ScanBatch(key)
+            self.pending[key] = batch
+            if self.max_latency > 0:
+                batch.timer = asyncio.get_event_loop().call_later(self.max_latency, self.__flush, batch)
+
+        future = batch.add(content, metadata, verdict_key)
+        if len(batch) >= self.max_size or self.max_latency <= 0:
+            self.__flush(batch)
+
+        return await future
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'artifacts': self.artifacts,
+            'pending': sum(len(batch) for batch in self.pending.values()),
+        }
+
+    def __flush(self, batch):
+        if self.pending.get(batch.key) is batch:
+            del self.pending[batch.key]
+
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+
+        task = asyncio.get_event_loop().create_task(self.__scan(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def __scan(self, batch):
+        guid, artifact_type, chain = batch.key
+        self.batches += 1
+        self.artifacts += len(batch)
+        version = self.scanner.cache_version()
+        try:
+            results = await self.scanner.scan_batch(guid, artifact_type, batch.contents, batch.metadatas, chain)
+            if len(results) != len(batch):
+                raise ValueError('scan_batch returned {0} results for {1} artifacts'.format(len(results), len(batch)))
+        except asyncio.CancelledError:
+            batch.fail(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            logger.exception('Error scanning batch of %s artifacts from bounty %s', len(batch), guid)
+            batch.fail(e)
+            return
+
+        for verdict_key, result in zip(batch.verdict_keys, results):
+            self.scanner.remember_verdict(verdict_key, result, version)
+
+        batch.resolve(results)
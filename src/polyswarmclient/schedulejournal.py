@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from polyswarmclient.events import Event
+
+logger = logging.getLogger(__name__)
+
+# Directory the scheduled events of each account are journaled in, unset keeps them in memory only
+SCHEDULE_JOURNAL_DIR = os.environ.get('SCHEDULE_JOURNAL_DIR')
+# Removed events after which the journal is checkpointed and vacuumed
+SCHEDULE_JOURNAL_COMPACT_EVERY = int(os.environ.get('SCHEDULE_JOURNAL_COMPACT_EVERY', 10000))
+# Seconds changes wait to be written to the journal together in one transaction
+SCHEDULE_JOURNAL_FLUSH_INTERVAL = float(os.environ.get('SCHEDULE_JOURNAL_FLUSH_INTERVAL', 1))
+# Most changes waiting to be written before they are written anyway
+SCHEDULE_JOURNAL_FLUSH_SIZE = 256
+
+
+class ScheduleJournal:
+    """Local copy of every scheduled event, so reveals, votes and settles survive a restart
+
+    Events are kept in a sqlite database in WAL mode, one row per chain and `Event.key`.
+    Scheduling writes the row, and firing or cancelling deletes it. Changes are batched for `flush_interval` seconds,
+    then written in one transaction on a thread of the journal's own, which also runs compaction, so the event loop
+    never waits on sqlite. Commits do not wait on fsync, so a crash of the process loses at most the changes of the
+    last `flush_interval` seconds.
+
+    Args:
+        path (str): Database file, None to journal nothing
+        compact_every (int): Removed events after which the database is checkpointed and vacuumed
+        flush_interval (float): Seconds changes wait to be written to the database
+    """
+
+    def __init__(self, path=None, compact_every=SCHEDULE_JOURNAL_COMPACT_EVERY,
+                 flush_interval=SCHEDULE_JOURNAL_FLUSH_INTERVAL):
+        self.path = path
+        self.compact_every = compact_every
+        self.flush_interval = flush_interval
+        self.removed = 0
+        # Latest change of each (chain, key), the row to write or None to delete it
+        self.unwritten = {}
+        self.flush_timer = None
+        self.db = None
+        self.executor = None
+        if path is not None:
+            # One thread, so writes land in order and the connection is never used concurrently
+            self.executor = ThreadPoolExecutor(max_workers=1)
+            self.db = self.__run(self.__open, path).result()
+
+    @classmethod
+    def for_account(cls, account, directory=SCHEDULE_JOURNAL_DIR):
+        """Journal of one account, in `directory` if set"""
+        if not directory:
+            return cls()
+
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, 'schedule-{0}.db'.format(account.lower())))
+
+    def __len__(self):
+        if self.db is None:
+            return 0
+
+        self.flush()
+        return self.__run(self.__count, self.db).result()
+
+    def put(self, chain, block, event):
+        """Journal a scheduled event, replacing any with the same key
+
+        Args:
+            chain (str): Chain the event is scheduled on
+            block (int): Block the event is due on
+            event (Event): Scheduled event
+        """
+        if self.db is None:
+            return
+
+        self.unwritten[(chain, self.__key(event))] = (block, json.dumps(event.to_dict()))
+        self.__schedule_flush()
+
+    def remove(self, chain, events):
+        """Drop fired or cancelled events
+
+        Args:
+            chain (str): Chain the events were scheduled on
+            events (list[Event]): Events with the same keys as the journaled ones
+        """
+        if self.db is None or not events:
+            return
+
+        for event in events:
+            self.unwritten[(chain, self.__key(event))] = None
+
+        self.removed += len(events)
+        self.__schedule_flush()
+
+    def load(self, chain):
+        """Read back every event journaled for a chain
+
+        Blocks until the changes waiting to be written are written, it is meant for startup.
+
+        Args:
+            chain (str): Chain to read
+        Returns:
+            (list[(int, Event)]): Block and event of each, in the order they are due
+        """
+        if self.db is None:
+            return []
+
+        self.flush()
+        loaded = []
+        for block, event in self.__run(self.__read, self.db, chain).result():
+            try:
+                loaded.append((block, Event.from_dict(json.loads(event))))
+            except (ValueError, TypeError):
+                logger.exception('Skipping unreadable scheduled event %s', event)
+
+        return loaded
+
+    def flush(self):
+        """Hand the changes waiting for the database to the journal thread, compacting after them if due
+
+        Returns:
+            (concurrent.futures.Future): Done once the changes are written, None if there was nothing to write
+        """
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+
+        if self.db is None:
+            return None
+
+        future = None
+        if self.unwritten:
+            writes = [(chain, key, row[0], row[1]) for (chain, key), row in self.unwritten.items() if row is not None]
+            deletes = [(chain, key) for (chain, key), row in self.unwritten.items() if row is None]
+            self.unwritten = {}
+            future = self.__run(self.__write, self.db, writes, deletes)
+
+        if self.removed >= self.compact_every:
+            self.removed = 0
+            future = self.__run(self.__compact, self.db)
+
+        return future
+
+    def compact(self):
+        """Release the space of removed events and fold the WAL back into the database
+
+        Returns:
+            (concurrent.futures.Future): Done once the database is compacted, None if there is no database
+        """
+        if self.db is None:
+            return None
+
+        self.flush()
+        self.removed = 0
+        return self.__run(self.__compact, self.db)
+
+    async def close(self):
+        """Write what is left, compact and close the database, without blocking the event loop"""
+        if self.db is None:
+            return
+
+        self.flush()
+        # Changes after this are dropped, rather than written to a closed database
+        closing = self.__run(self.__close, self.db)
+        self.db = None
+        await asyncio.wrap_future(closing)
+        self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def __key(event):
+        return json.dumps(event.key)
+
+    def __schedule_flush(self):
+        if len(self.unwritten) >= SCHEDULE_JOURNAL_FLUSH_SIZE or self.flush_interval <= 0:
+            self.flush()
+            return
+
+        if self.flush_timer is not None:
+            return
+
+        loop = asyncio.get_event_loop()
+        if not loop.is_running():
+            self.flush()
+            return
+
+        self.flush_timer = loop.call_later(self.flush_interval, self.flush)
+
+    def __run(self, func, *args):
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self.__log_failure)
+        return future
+
+    @staticmethod
+    def __log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error('Schedule journal write failed', exc_info=future.exception())
+
+    # Everything below runs on the journal thread, and is handed the connection so closing cannot pull it away
+
+    @staticmethod
+    def __open(path):
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('CREATE TABLE IF NOT EXISTS scheduled (chain TEXT NOT NULL, key TEXT NOT NULL, '
+                   'block INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (chain, key)) WITHOUT ROWID')
+        return db
+
+    @staticmethod
+    def __count(db):
+        return db.execute('SELECT COUNT(*) FROM scheduled').fetchone()[0]
+
+    @staticmethod
+    def __read(db, chain):
+        return db.execute('SELECT block, event FROM scheduled WHERE chain = ? ORDER BY block', (chain,)).fetchall()
+
+    @staticmethod
+    def __write(db, writes, deletes):
+        with db:
+            db.executemany('INSERT OR REPLACE INTO scheduled (chain, key, block, event) VALUES (?, ?, ?, ?)', writes)
+            db.executemany('DELETE FROM scheduled WHERE chain = ? AND key = ?', deletes)
+
+    @staticmethod
+    def __compact(db):
+        db.execute('VACUUM')
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    @classmethod
+    def __close(cls, db):
+        cls.__compact(db)
+        db.close()
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# GUIDs per page requested from polyswarmd
+SETTLE_PAGE_SIZE = int(os.environ.get('SETTLE_PAGE_SIZE', 75))
+# Pages fetched ahead of the settle workers
+SETTLE_PREFETCH_PAGES = int(os.environ.get('SETTLE_PREFETCH_PAGES', 2))
+# Bounties settled at once
+SETTLE_CONCURRENCY = int(os.environ.get('SETTLE_CONCURRENCY', 8))
+# Failed attempts to settle a bounty, across runs, before it is given up on
+SETTLE_MAX_ATTEMPTS = int(os.environ.get('SETTLE_MAX_ATTEMPTS', 5))
+# Directory settle_all_bounties keeps its progress in, so an interrupted run resumes, unset to always start over
+SETTLE_CHECKPOINT_DIR = os.environ.get('SETTLE_CHECKPOINT_DIR')
+
+
+class SettleProgress:
+    """Running totals of a settle pipeline, and the GUIDs that failed to settle and have to be tried again
+
+    `retry` maps each of those GUIDs to the number of times it failed to settle so far.
+    """
+
+    def __init__(self, page=0, settled=0, recovered=0, retry=None):
+        self.page = page
+        self.settled = settled
+        self.failed = 0
+        self.recovered = recovered
+        self.retry = dict(retry or {})
+
+    def asdict(self):
+        return {'page': self.page, 'settled': self.settled, 'failed': self.failed, 'recovered': self.recovered,
+                'retry': self.retry}
+
+
+class SettleCheckpoint:
+    """JSON file with the first page a settle pipeline has not finished, and the GUIDs it failed to settle
+
+    Args:
+        path (str): File to keep the checkpoint in, None to keep nothing
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+
+    @classmethod
+    def for_account(cls, account, chain, directory=SETTLE_CHECKPOINT_DIR):
+        if not directory:
+            return cls()
+
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, 'settle-{0}-{1}.json'.format(account.lower(), chain)))
+
+    def load(self):
+        """
+        Returns:
+            (SettleProgress): Progress saved by an interrupted run, or a fresh start
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return SettleProgress()
+
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+
+            retry = saved.get('retry', {})
+            # Checkpoints from before attempts were counted list the GUIDs only
+            if isinstance(retry, list):
+                retry = {guid: 1 for guid in retry}
+
+            return SettleProgress(int(saved['page']), int(saved['settled']), int(saved['recovered']),
+                                  {str(guid): int(attempts) for guid, attempts in retry.items()})
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.exception('Ignoring unreadable settle checkpoint %s', self.path)
+            return SettleProgress()
+
+    def save(self, progress):
+        if self.path is None:
+            return
+
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(progress.asdict(), f)
+
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class SettlePipeline:
+    """Settles every bounty on a contract, fetching pages of GUIDs ahead while a bounded pool of workers settles them
+
+    Args:
+        fetch_page (coroutine function): Takes a page number and count, returns GUIDs, empty or None after the last
+        settle (coroutine function): Takes a GUID, settles it and returns the NCT recovered
+        checkpoint (SettleCheckpoint): Where to save progress, after each page that is done along with all before it.
+            Bounties that failed to settle are saved with it, and tried again first by the next run
+        page_size (int): GUIDs per page
+        prefetch (int): Pages fetched ahead of the workers
+        concurrency (int): Bounties settled at once
+        max_attempts (int): Failed attempts to settle a bounty, across runs, before it is given up on
+    """
+
+    def __init__(self, fetch_page, settle, checkpoint=None, page_size=SETTLE_PAGE_SIZE, prefetch=SETTLE_PREFETCH_PAGES,
+                 concurrency=SETTLE_CONCURRENCY, max_attempts=SETTLE_MAX_ATTEMPTS):
+        self.fetch_page = fetch_page
+        self.settle = settle
+        self.checkpoint = checkpoint if checkpoint is not None else SettleCheckpoint()
+        self.page_size = page_size
+        self.prefetch = max(1, prefetch)
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.progress = None
+        self.remaining = {}
+        self.retrying = set()
+
+    async def run(self):
+        """Settle everything, resuming from the checkpoint
+
+        Returns:
+            (SettleProgress): Totals for the whole run, including any earlier interrupted run
+        """
+        self.progress = self.checkpoint.load()
+        if self.progress.page:
+            logger.info('Resuming settling all bounties from page %s', self.progress.page)
+
+        self.remaining = {}
+        # Tried again ahead of the pages, so they are skipped when a page lists them
+        self.retrying = set(self.progress.retry)
+        queue = asyncio.Queue(maxsize=self.page_size * self.prefetch)
+        workers = [asyncio.ensure_future(self.__work(queue)) for _ in range(self.concurrency)]
+        try:
+            for guid in self.retrying:
+                await queue.put((None, guid))
+
+            await self.__produce(queue, self.progress.page)
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        if self.progress.retry:
+            logger.warning('%s bounties failed to settle, trying them again on the next run', len(self.progress.retry))
+            self.checkpoint.save(SettleProgress(retry=self.progress.retry))
+        else:
+            self.checkpoint.clear()
+
+        return self.progress
+
+    async def __produce(self, queue, page):
+        while True:
+            guids = await self.fetch_page(page, self.page_size)
+            if not guids:
+                return
+
+            guids = [guid for guid in guids if guid not in self.retrying]
+            self.remaining[page] = len(guids)
+            for guid in guids:
+                await queue.put((page, guid))
+
+            if not guids:
+                self.__advance()
+
+            page += 1
+
+    async def __work(self, queue):
+        while True:
+            page, guid = await queue.get()
+            try:
+                recovered = await self.settle(guid)
+            except asyncio.CancelledError:
+                # Leave the page unfinished, so a resumed run settles it again
+                raise
+            except Exception:
+                self.progress.failed += 1
+                logger.exception('Error settling bounty %s', guid)
+                # Saved with the checkpoint, so moving past its page does not lose it
+                attempts = self.progress.retry.pop(guid, 0) + 1
+                if attempts < self.max_attempts:
+                    self.progress.retry[guid] = attempts
+                else:
+                    logger.error('Giving up on settling bounty %s after %s attempts', guid, attempts)
+            else:
+                self.progress.settled += 1
+                self.progress.recovered += recovered or 0
+                self.progress.retry.pop(guid, None)
+
+            self.__finish(page)
+            queue.task_done()
+
+    def __finish(self, page):
+        # Retried bounties belong to no page
+        if page is None:
+            return
+
+        self.remaining[page] -= 1
+        self.__advance()
+
+    def __advance(self):
+        # Only move the checkpoint past pages that are done along with every page before them
+        advanced = False
+        while self.remaining.get(self.progress.page) == 0:
+            del self.remaining[self.progress.page]
+            self.progress.page += 1
+            advanced = True
+
+        if advanced:
+            self.checkpoint.save(self.progress)
+            logger.info('Settled %s bounties through page %s, recovered %s NCT so far', self.progress.settled,
+                        self.progress.page - 1, self.progress.recovered)
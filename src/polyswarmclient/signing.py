@@ -0,0 +1,131 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+
+from concurrent.futures.process import BrokenProcessPool
+from web3.auto import w3
+
+logger = logging.getLogger(__name__)
+
+# Where signatures are computed, one of 'thread', 'process' or 'none' to sign on the event loop
+SIGNING_POOL = os.environ.get('SIGNING_POOL', 'thread')
+# Workers in the signing pool
+SIGNING_WORKERS = int(os.environ.get('SIGNING_WORKERS', 2))
+
+# Private key of a process pool worker, set once by the pool initializer so it is not sent with every request
+_worker_key = None
+
+
+def _init_worker(priv_key):
+    global _worker_key
+    _worker_key = priv_key
+
+
+def sign_ethereum_transactions(transactions, priv_key=None):
+    """Sign a group of Ethereum transactions
+
+    Args:
+        transactions (list[dict]): Unsigned transactions
+        priv_key (bytes): Private key, defaults to the key of this pool worker
+    Returns:
+        (list[dict]): Signed transactions, in the same order
+    """
+    key = priv_key if priv_key is not None else _worker_key
+    # Plain dicts, as the immutable AttributeDict cannot be sent back from a pool process
+    return [dict(w3.eth.account.signTransaction(tx, key)) for tx in transactions]
+
+
+def sign_polyswarm_transaction(transaction, priv_key=None):
+    """Sign a polyswarmtransaction Transaction
+
+    Args:
+        transaction (Transaction): Unsigned transaction
+        priv_key (bytes): Private key, defaults to the key of this pool worker
+    Returns:
+        (SignedTransaction): Signed transaction
+    """
+    key = priv_key if priv_key is not None else _worker_key
+    return transaction.sign(key)
+
+
+class SigningService:
+    """Computes signatures off the event loop, so signing bursts do not stall websocket reads or other handlers
+
+    Each call signs a whole group of transactions in one trip to the pool.
+
+    Args:
+        priv_key (bytes): Private key to sign with
+        pool (str): 'thread', 'process', or 'none' to sign on the event loop
+        workers (int): Workers in the pool
+    """
+
+    def __init__(self, priv_key, pool=SIGNING_POOL, workers=SIGNING_WORKERS):
+        if pool not in ('thread', 'process', 'none'):
+            raise ValueError('Unknown signing pool {0}'.format(pool))
+
+        self.priv_key = priv_key
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.executor = None
+        self.signed = 0
+
+    async def sign_ethereum_transactions(self, transactions):
+        """Sign a group of Ethereum transactions
+
+        Args:
+            transactions (list[dict]): Unsigned transactions
+        Returns:
+            (list[dict]): Signed transactions, in the same order
+        """
+        signed = await self.__run(sign_ethereum_transactions, list(transactions))
+        self.signed += len(signed)
+        return signed
+
+    async def sign_polyswarm_transaction(self, transaction):
+        """Sign a polyswarmtransaction Transaction
+
+        Args:
+            transaction (Transaction): Unsigned transaction
+        Returns:
+            (SignedTransaction): Signed transaction
+        """
+        signed = await self.__run(sign_polyswarm_transaction, transaction)
+        self.signed += 1
+        return signed
+
+    async def close(self):
+        """Shut the pool down, it is started again on the next signature
+
+        Waits for signatures in progress in the default executor, so the event loop keeps running meanwhile.
+        """
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.get_event_loop().run_in_executor(None, executor.shutdown)
+
+    async def __run(self, func, arg):
+        if self.pool == 'none':
+            return func(arg, self.priv_key)
+
+        loop = asyncio.get_event_loop()
+        if self.pool == 'thread':
+            return await loop.run_in_executor(self.__executor(), func, arg, self.priv_key)
+
+        try:
+            return await loop.run_in_executor(self.__executor(), func, arg)
+        except BrokenProcessPool:
+            logger.exception('Signing process pool broke, restarting it')
+            await self.close()
+            return await loop.run_in_executor(self.__executor(), func, arg)
+
+    def __executor(self):
+        if self.executor is None:
+            if self.pool == 'process':
+                self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                                       initializer=_init_worker,
+                                                                       initargs=(self.priv_key,))
+            else:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                                      thread_name_prefix='signing')
+
+        return self.executor
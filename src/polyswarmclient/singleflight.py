@@ -0,0 +1,49 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single in-flight call
+
+    The first caller for a key starts the work, and every caller that arrives while it is running awaits the same result.
+    Once the call completes, the next caller for that key starts a fresh call.
+    Cancelling one waiter does not cancel the shared call for the other waiters.
+    """
+    def __init__(self):
+        self.flights = {}
+
+    def __len__(self):
+        return len(self.flights)
+
+    def __contains__(self, key):
+        return key in self.flights
+
+    async def run(self, key, func, *args, **kwargs):
+        """Run `func(*args, **kwargs)`, or join the call already running for `key`
+
+        Args:
+            key (hashable): Identity of the call
+            func (coroutine function): Function to call if no call for key is in flight
+        Returns:
+            Result of the shared call
+        """
+        future = self.flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self.flights[key] = future
+            future.add_done_callback(lambda f: self.__finish(key, f))
+        else:
+            logger.debug('Joining in-flight call for %s', key)
+
+        return await asyncio.shield(future)
+
+    def __finish(self, key, future):
+        if self.flights.get(key) is future:
+            del self.flights[key]
+
+        # Mark the exception retrieved, in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,176 @@
+import asyncio
+import cachetools
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Scan results kept in memory, 0 disables the memory tier
+VERDICT_CACHE_SIZE = int(os.environ.get('VERDICT_CACHE_SIZE', 16 * 1024))
+# sqlite database for the persistent tier, unset disables the persistent tier
+VERDICT_CACHE_PATH = os.environ.get('VERDICT_CACHE_PATH')
+# Seconds a scan result stays valid in either tier
+VERDICT_CACHE_TTL = float(os.environ.get('VERDICT_CACHE_TTL', 24 * 60 * 60))
+# Look up results by the sha256 in bounty metadata before downloading, it is set by the bounty poster and unverified
+VERDICT_CACHE_TRUST_METADATA = bool(int(os.environ.get('VERDICT_CACHE_TRUST_METADATA', 0)))
+# Set differently for each scanner configuration that shares the persistent tier, and can scan differently
+VERDICT_CACHE_KEY = os.environ.get('VERDICT_CACHE_KEY', '')
+# Seconds results wait to be written to the persistent tier together in one transaction
+VERDICT_CACHE_FLUSH_INTERVAL = float(os.environ.get('VERDICT_CACHE_FLUSH_INTERVAL', 1))
+# Most results waiting to be written before they are written anyway
+VERDICT_CACHE_FLUSH_SIZE = 256
+
+
+class VerdictCache:
+    """Scan results of one scanner by artifact sha256, for the current version of that scanner
+
+    Results are kept as ScanResult dicts in a TTL bound LRU, and optionally in a sqlite database that outlives the
+    process and may be shared by several scanners, each under its own name. The version names the engine and
+    signatures that produced the results. Results from any other version are never returned, and are dropped as soon
+    as the scanner reports a new one, so scanners configured to scan differently need names of their own.
+    Results are written to the database in batches, every `flush_interval` seconds on the event loop.
+
+    Args:
+        name (str): Scanner the results belong to
+        size (int): Results kept in memory, 0 disables the memory tier
+        path (str): sqlite database for the persistent tier, None disables the persistent tier
+        ttl (float): Seconds a result stays valid
+        trust_metadata (bool): Answer lookups by the sha256 claimed in bounty metadata, before the artifact is fetched
+        flush_interval (float): Seconds results wait to be written to the database
+    """
+
+    def __init__(self, name, size=VERDICT_CACHE_SIZE, path=VERDICT_CACHE_PATH, ttl=VERDICT_CACHE_TTL,
+                 trust_metadata=VERDICT_CACHE_TRUST_METADATA, flush_interval=VERDICT_CACHE_FLUSH_INTERVAL):
+        self.name = name
+        self.memory = cachetools.TTLCache(maxsize=size, ttl=ttl) if size > 0 else None
+        self.path = path
+        self.ttl = ttl
+        self.trust_metadata = trust_metadata
+        self.flush_interval = flush_interval
+        self.unwritten = {}
+        self.flush_timer = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.__open()
+
+    @property
+    def enabled(self):
+        return self.memory is not None or self.db is not None
+
+    def set_version(self, version):
+        """Switch to the results of a scanner version, dropping those of every other version
+
+        Args:
+            version (str): Engine and signature version token
+        """
+        if version == self.version:
+            return
+
+        if self.version is not None:
+            logger.info('Scanner version changed from %s to %s, dropping cached verdicts', self.version, version)
+
+        self.version = version
+        self.unwritten.clear()
+        if self.memory is not None:
+            self.memory.clear()
+
+        if self.db is not None:
+            with self.db:
+                self.db.execute('DELETE FROM verdicts WHERE scanner = ? AND version != ?', (self.name, version))
+
+    def get(self, sha256, version):
+        """
+        Args:
+            sha256 (str): Hex sha256 of the artifact
+            version (str): Engine and signature version token
+        Returns:
+            (dict): ScanResult dict, or None if there is no valid result for this version
+        """
+        self.set_version(version)
+        result = self.memory.get(sha256) if self.memory is not None else None
+        if result is None and sha256 in self.unwritten:
+            result = json.loads(self.unwritten[sha256][1])
+        if result is None and self.db is not None:
+            row = self.db.execute('SELECT result FROM verdicts WHERE scanner = ? AND sha256 = ? AND version = ? '
+                                  'AND stored > ?', (self.name, sha256, version, time.time() - self.ttl)).fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                if self.memory is not None:
+                    self.memory[sha256] = result
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return result
+
+    def put(self, sha256, version, result):
+        """
+        Args:
+            sha256 (str): Hex sha256 of the artifact
+            version (str): Engine and signature version token
+            result (dict): ScanResult dict
+        """
+        self.set_version(version)
+        if self.memory is not None:
+            self.memory[sha256] = result
+
+        if self.db is not None:
+            self.unwritten[sha256] = (time.time(), json.dumps(result))
+            self.__schedule_flush()
+
+    def flush(self):
+        """Write the results waiting for the database in one transaction"""
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+
+        if self.db is None or not self.unwritten:
+            return
+
+        rows = [(self.name, sha256, self.version, stored, result) for sha256, (stored, result) in self.unwritten.items()]
+        self.unwritten.clear()
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO verdicts (scanner, sha256, version, stored, result) '
+                                'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'memory': len(self.memory) if self.memory is not None else 0}
+
+    def close(self):
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __schedule_flush(self):
+        if len(self.unwritten) >= VERDICT_CACHE_FLUSH_SIZE or self.flush_interval <= 0:
+            self.flush()
+            return
+
+        if self.flush_timer is not None:
+            return
+
+        loop = asyncio.get_event_loop()
+        if not loop.is_running():
+            self.flush()
+            return
+
+        self.flush_timer = loop.call_later(self.flush_interval, self.flush)
+
+    def __open(self):
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS verdicts (scanner TEXT NOT NULL, sha256 TEXT NOT NULL, '
+                        'version TEXT NOT NULL, stored REAL NOT NULL, result TEXT NOT NULL, '
+                        'PRIMARY KEY (scanner, sha256)) WITHOUT ROWID')
+        with self.db:
+            self.db.execute('DELETE FROM verdicts WHERE stored <= ?', (time.time() - self.ttl,))
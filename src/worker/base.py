@@ -1,7 +1,6 @@
 import aioredis
 import aiohttp
 import asyncio
-import json
 import logging
 import math
 import platform
@@ -14,10 +13,14 @@ from polyswarmclient.ratelimit.abstractratelimit import AbstractRateLimit
 from typing import AsyncGenerator, Optional
 
 from polyswarmartifact import DecodeError
+from polyswarmclient import codec
+from polyswarmclient.artifactcache import ArtifactCache
+from polyswarmclient.deadline import Deadline
 from polyswarmclient.liveness.local import LocalLivenessRecorder
 from polyswarmclient.exceptions import ApiKeyException, FatalError, ScannerSetupFailedError
 from polyswarmclient.abstractscanner import ScanResult
 from polyswarmclient.producer import JobResponse, JobRequest
+from polyswarmclient.scanbatcher import ScanBatcher
 from polyswarmclient.ratelimit.redis import RedisRateLimit, DailyKeyManager, HourlyKeyManager, \
     MinutelyKeyManager, SecondlyKeyManager
 from polyswarmclient.utils import asyncio_join, asyncio_stop, configure_event_loop
@@ -95,6 +98,8 @@ class Worker:
         self.api_key = api_key
         self.testing = testing
         self.scanner = scanner
+        # Batches artifacts for scanners with their own scan_batch
+        self.scan_batcher = ScanBatcher.for_scanner(scanner)
         self.scan_time_requirement = scan_time_requirement
         self.daily_rate_limit = daily_rate_limit
         self.hourly_rate_limit = hourly_rate_limit
@@ -113,6 +118,7 @@ class Worker:
         self.allow_key_over_http = allow_key_over_http
         # Setup a liveness instance
         self.liveness_recorder = LocalLivenessRecorder()
+        self.artifact_cache = ArtifactCache()
 
     def run(self):
         configure_event_loop()
@@ -199,7 +205,7 @@ class Worker:
                             continue
 
                         _, job = job
-                        job = json.loads(job.decode('utf-8'))
+                        job = codec.loads(job)
                         logger.info('Received job', extra={'extra': job})
                         self.current_task_count += 1
                     yield JobRequest(**job)
@@ -217,8 +223,14 @@ class Worker:
             async with self.liveness_recorder.waiting_task(job.key, round(time.time())):
                 remaining_time = self.get_remaining_time(job)
 
+                # Artifacts scanned before are answered without fetching them or counting against the rate limit
+                scan_result = self.scanner.lookup_verdict(job.metadata)
+                if scan_result is not None:
+                    response = JobResponse(job.index, scan_result.bit, scan_result.verdict, scan_result.confidence,
+                                           scan_result.metadata)
+                    loop.create_task(self.respond(job, response))
                 # Don't waste bandwidth and resources downloading files if we hit the rate limit
-                if await self.rate_limit_aggregate.use(peek=True):
+                elif await self.rate_limit_aggregate.use(peek=True):
                     content = await asyncio.wait_for(self.download(job, session), timeout=remaining_time)
                     remaining_time = self.get_remaining_time(job)
 
@@ -268,16 +280,23 @@ class Worker:
 
         headers = {'Authorization': self.api_key} if self.api_key is not None else None
         uri = f'{job.polyswarmd_uri}/artifacts/{job.uri}/{job.index}/'
-        async with self.download_semaphore:
-            response = await session.get(uri, headers=headers)
-            response.raise_for_status()
-            return await response.read()
+
+        async def fetch():
+            async with self.download_semaphore:
+                response = await session.get(uri, headers=headers)
+                response.raise_for_status()
+                return await response.read()
+
+        return await self.artifact_cache.get(job.uri, job.index, fetch)
 
     async def scan(self, job: JobRequest, content: bytes) -> ScanResult:
         artifact_type = job.get_artifact_type()
-        async with self.scan_semaphore:
-            return await self.scanner.scan(job.guid, artifact_type, artifact_type.decode_content(content), job.metadata,
-                                           job.chain)
+        scan = self.scan_batcher.scan if self.scan_batcher is not None else self.scanner.scan
+        # process_job enforces the job expiration, this lets the scanner see it
+        with Deadline.after(job.ts + job.duration - time.time()).activate():
+            async with self.scan_semaphore:
+                return await scan(job.guid, artifact_type, artifact_type.decode_content(content), job.metadata,
+                                  job.chain)
 
     def rate_limit_respond(self, job: JobRequest):
         loop = asyncio.get_event_loop()
@@ -289,7 +308,7 @@ class Worker:
         logger.info('Scan results for job %s', job.key, extra={'extra': response.asdict()})
         key = f'{self.queue}_{job.guid}_{job.chain}_results'
         with await self.redis as redis:
-            await redis.rpush(key, json.dumps(response.asdict()))
+            await redis.rpush(key, codec.dumpb(response.asdict()))
 
     def is_key_secure(self, job: JobRequest):
         parsed = urllib3.util.parse_url(job.polyswarmd_uri)
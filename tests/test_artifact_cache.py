@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import os
+import pytest
+
+from polyswarmclient.artifactcache import ArtifactCache
+from polyswarmclient.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_single_flight_collapses_calls(event_loop):
+    single_flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    tasks = [asyncio.ensure_future(single_flight.run('key', work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert 'key' in single_flight
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [1] * 5
+    assert len(single_flight) == 0
+    assert await single_flight.run('key', work) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_artifact_cache_is_opt_in(event_loop):
+    cache = ArtifactCache(directory=None)
+    assert not cache.enabled
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        return b'content'
+
+    assert await cache.get('uri', 0, fetch) == b'content'
+    assert await cache.get('uri', 0, fetch) == b'content'
+    assert len(fetches) == 2
+
+    # Nothing is kept, but concurrent gets still share one fetch
+    results = await asyncio.gather(*[cache.get('uri', 0, fetch) for _ in range(5)])
+    assert results == [b'content'] * 5
+    assert len(fetches) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_artifact_cache_memory_tier(event_loop):
+    cache = ArtifactCache(max_bytes=10, directory=None)
+    fetches = []
+
+    def fetcher(content):
+        async def fetch():
+            fetches.append(content)
+            return content
+
+        return fetch
+
+    assert await cache.get('uri', 0, fetcher(b'aaaa')) == b'aaaa'
+    assert await cache.get('uri', 0, fetcher(b'bbbb')) == b'aaaa'
+    assert await cache.get_by_hash(hashlib.sha256(b'aaaa').hexdigest()) == b'aaaa'
+    assert fetches == [b'aaaa']
+
+    # Evicts the least recently used artifact once over the byte budget
+    await cache.get('uri', 1, fetcher(b'cccc'))
+    await cache.get('uri', 2, fetcher(b'dddd'))
+    assert await cache.lookup('uri', 0) is None
+
+    # Larger than the whole budget, so never stored, and failed fetches are not cached
+    assert await cache.get('uri', 3, fetcher(b'x' * 11)) == b'x' * 11
+    assert await cache.lookup('uri', 3) is None
+    assert await cache.get('uri', 4, fetcher(None)) is None
+    assert await cache.get('uri', 4, fetcher(b'eeee')) == b'eeee'
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_artifact_cache_disk_tier_shared(event_loop, tmpdir):
+    first = ArtifactCache(max_bytes=0, directory=str(tmpdir))
+    second = ArtifactCache(max_bytes=1024, directory=str(tmpdir))
+
+    async def fetch():
+        return b'content'
+
+    async def fail():
+        raise AssertionError('Should have been served from disk')
+
+    sha256 = await first.put('uri', 0, b'content')
+    assert os.path.exists(os.path.join(str(tmpdir), 'objects', sha256))
+    assert await second.get('uri', 0, fail) == b'content'
+    assert await first.get('uri', 0, fail) == b'content'
+
+    # Same content under another key is stored once
+    await first.get('other', 3, fetch)
+    assert len(os.listdir(os.path.join(str(tmpdir), 'objects'))) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_artifact_cache_disk_prune(event_loop, tmpdir):
+    cache = ArtifactCache(max_bytes=0, directory=str(tmpdir), max_disk_bytes=8)
+    await cache.put('uri', 0, b'aaaa')
+    await cache.put('uri', 1, b'bbbb')
+    old = os.path.join(str(tmpdir), 'objects', hashlib.sha256(b'aaaa').hexdigest())
+    os.utime(old, (0, 0))
+    await cache.put('uri', 2, b'cccc')
+
+    cache.prune()
+    assert not os.path.exists(old)
+    assert await cache.lookup('uri', 0) is None
+    assert await cache.lookup('uri', 2) == b'cccc'
@@ -0,0 +1,136 @@
+import asyncio
+import cachetools
+import pytest
+
+from polyswarmclient.ethereum.balancetracker import BalanceTracker
+from polyswarmclient.exceptions import LowBalanceError
+from tests.utils.fixtures import mock_client, success
+
+
+class Fetcher:
+    def __init__(self, *balances):
+        self.balances = list(balances)
+        self.calls = 0
+
+    async def __call__(self, chain):
+        self.calls += 1
+        return self.balances.pop(0) if self.balances else None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_tracker_debits_and_credits(event_loop):
+    fetch = Fetcher(100)
+    tracker = BalanceTracker(fetch)
+    assert tracker.balance('home') is None
+    assert await tracker.available('home') == 100
+
+    tracker.debit(30, 'home')
+    tracker.debit(30, 'home')
+    tracker.refund(30, 'home')
+    tracker.credit(5, 'home')
+    assert await tracker.available('home') == 75
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_tracker_holds_debits_until_confirmed(event_loop):
+    tracker = BalanceTracker(Fetcher(100, 100, 70, 70))
+    await tracker.reconcile('home')
+    tracker.debit(30, 'home')
+
+    # The debit is not mined yet, so polyswarmd still reports the old balance
+    assert await tracker.reconcile('home')
+    assert tracker.balance('home') == 70
+
+    # Mined after the last fetch started, so that balance does not include it yet
+    tracker.confirm(30, 'home')
+    assert tracker.balance('home') == 70
+
+    # Fetched after it was mined, so the debit is not counted twice
+    assert await tracker.reconcile('home')
+    assert tracker.balance('home') == 70
+    assert not tracker.chains['home'].debits
+
+    tracker.credit(10, 'home')
+    assert tracker.balance('home') == 80
+    assert await tracker.reconcile('home')
+    assert tracker.balance('home') == 70
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_tracker_confirmed_burst_is_not_double_counted(event_loop):
+    tracker = BalanceTracker(Fetcher(100, 40))
+    await tracker.reconcile('home')
+    for _ in range(3):
+        tracker.debit(20, 'home')
+        tracker.confirm(20, 'home')
+
+    assert tracker.balance('home') == 40
+    assert await tracker.reconcile('home')
+    assert tracker.balance('home') == 40
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_tracker_keeps_balance_when_fetch_fails(event_loop):
+    tracker = BalanceTracker(Fetcher(100))
+    await tracker.reconcile('home')
+    assert not await tracker.reconcile('home')
+    assert tracker.balance('home') == 100
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_tracker_reconciles_stale_balance_in_background(event_loop):
+    fetch = Fetcher(100, 200)
+    tracker = BalanceTracker(fetch, interval=0)
+    assert await tracker.available('home') == 100
+    assert await tracker.available('home') == 100
+    await asyncio.sleep(0.01)
+    assert tracker.balance('home') == 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_raise_for_low_balance_is_local(mock_client):
+    url = mock_client.url_with_parameters('/balances/{0}/nct'.format(mock_client.account), chain='home')
+    mock_client.http_mock.get(url, body=success(100))
+
+    await mock_client.balances.raise_for_low_balance(60, 'home')
+    await mock_client.balances.raise_for_low_balance(40, 'home')
+
+    # Only mocked once, the balance was just reconciled so the shortfall is not checked again
+    with pytest.raises(LowBalanceError):
+        await mock_client.balances.raise_for_low_balance(1, 'home')
+
+    mock_client.balances.refund(40, 'home')
+    mock_client.balances.credit_transfers([{'to': mock_client.account.lower(), 'value': '10'},
+                                           {'to': '0x0', 'value': '1000'}], 'home')
+    await mock_client.balances.raise_for_low_balance(50, 'home')
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_fast_balance_fails_fast_and_keeps_expiry(mock_client):
+    from polyswarmclient.fast import BalanceClient
+
+    now = [0]
+    balances = BalanceClient(mock_client)
+    balances.cache = cachetools.TTLCache(ttl=10, maxsize=20, timer=lambda: now[0])
+    key = f'{mock_client.account}:home'
+    balances.cache[key] = [100]
+
+    now[0] = 5
+    await balances.raise_for_low_balance(60, 'home')
+    with pytest.raises(LowBalanceError):
+        await balances.raise_for_low_balance(50, 'home')
+
+    balances.refund(10, 'home')
+    assert balances.cache[key] == [50]
+
+    # Debits and refunds leave the expiry alone, so the balance is fetched again on time
+    now[0] = 11
+    assert key not in balances.cache
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import pytest
 from polyswarmartifact import ArtifactType
 
@@ -9,7 +10,9 @@ import uuid
 from unittest.mock import patch
 
 import polyswarmclient.utils
-from .utils.fixtures import success, event, random_address, random_bitset, random_ipfs_uri, mock_client
+from polyswarmclient.artifactcache import ArtifactCache
+from polyswarmclient.request_rate_limit import TokenBucket
+from .utils.fixtures import success, failure, event, random_address, random_bitset, random_ipfs_uri, mock_client
 
 
 def test_check_response():
@@ -97,6 +100,25 @@ async def test_list_artifacts(mock_client):
                               body=success(valid_response))
     assert await mock_client.list_artifacts(valid_ipfs_uri) == [(x['name'], x['hash']) for x in valid_response]
 
+    # Only mocked once, so later and concurrent lookups must be memoized
+    results = await asyncio.gather(*[mock_client.list_artifacts(valid_ipfs_uri) for _ in range(3)])
+    assert results == [[(x['name'], x['hash']) for x in valid_response]] * 3
+    assert await mock_client.get_artifact_count(valid_ipfs_uri) == len(valid_response)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_list_artifacts_failure_not_memoized(mock_client):
+    ipfs_uri = random_ipfs_uri()
+    url = mock_client.url_with_parameters('/artifacts/{0}/'.format(ipfs_uri), chain='side')
+    valid_response = [{'hash': random_ipfs_uri(), 'name': 'about'}]
+
+    mock_client.http_mock.get(url, status=400, body=failure('Invalid IPFS URI'))
+    assert await mock_client.list_artifacts(ipfs_uri) == []
+
+    mock_client.http_mock.get(url, body=success(valid_response))
+    assert await mock_client.list_artifacts(ipfs_uri) == [('about', valid_response[0]['hash'])]
+
 
 @pytest.mark.asyncio
 @pytest.mark.timeout(15)
@@ -171,6 +193,36 @@ async def test_on_new_bounty(mock_client):
     await asyncio.wait([home_done.wait(), side_done.wait()])
 
 
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_full_bounty_route_does_not_hold_back_events(mock_client):
+    release = asyncio.Event()
+    assertion_done = asyncio.Event()
+
+    async def handle_new_bounty(*args):
+        await release.wait()
+
+    async def handle_new_assertion(*args):
+        assertion_done.set()
+
+    route = mock_client.dispatcher.routes['bounty']
+    route.concurrency = 1
+    route.queue_size = 1
+    mock_client.on_new_bounty.register(handle_new_bounty)
+    mock_client.on_new_assertion.register(handle_new_assertion)
+
+    bounty = {'guid': str(uuid.uuid4()), 'artifact_type': 'file', 'author': random_address(), 'amount': '1',
+              'uri': random_ipfs_uri(), 'expiration': 100, 'metadata': None}
+    for _ in range(4):
+        await mock_client.home_ws_mock.send(event('bounty', bounty))
+
+    await mock_client.home_ws_mock.send(event('assertion', {'bounty_guid': bounty['guid'], 'author': random_address(),
+                                                            'index': 0, 'bid': 1, 'mask': [True], 'commitment': 1}))
+    await asyncio.wait_for(assertion_done.wait(), timeout=5)
+    assert route.dropped >= 1
+    release.set()
+
+
 @pytest.mark.asyncio
 @pytest.mark.timeout(15)
 async def test_on_new_assertion(mock_client):
@@ -405,3 +457,106 @@ async def test_on_initialized_channel(mock_client):
     await mock_client.home_ws_mock.send(event('initialized_channel', initialized_channel))
 
     await done.wait()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_requests_share_session(mock_client):
+    session = mock_client.session
+    assert session is not None
+    assert not session.closed
+    assert session.connector.limit == polyswarmclient.HTTP_POOL_SIZE
+
+    mock_client.http_mock.get(mock_client.url_with_parameters('/balances/{0}/nct'.format(mock_client.account),
+                                                              chain='home'), body=success('42'))
+    assert await mock_client.balances.get_nct_balance('home') == 42
+    assert mock_client.session is session
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_concurrent_gets_coalesced(mock_client):
+    url = mock_client.url_with_parameters('/balances/{0}/nct'.format(mock_client.account), chain='home')
+
+    # Only mocked once, so concurrent identical requests must share it
+    mock_client.http_mock.get(url, body=success('42'))
+    balances = await asyncio.gather(*[mock_client.balances.get_nct_balance('home') for _ in range(5)])
+    assert balances == [42] * 5
+
+    # Nothing is cached by default once the request completes
+    mock_client.http_mock.get(url, body=success('43'))
+    assert await mock_client.balances.get_nct_balance('home') == 43
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_route_policy_ttl(mock_client):
+    mock_client.request_coalescer.set_policy(r'/balances/[^/]+/nct', ttl=60)
+    url = mock_client.url_with_parameters('/balances/{0}/nct'.format(mock_client.account), chain='home')
+
+    mock_client.http_mock.get(url, body=failure('Unavailable'))
+    assert await mock_client.balances.get_nct_balance('home') == 0
+
+    mock_client.http_mock.get(url, body=success('42'))
+    assert await mock_client.balances.get_nct_balance('home') == 42
+    assert await mock_client.balances.get_nct_balance('home') == 42
+    assert mock_client.request_coalescer.cache_hits == 1
+
+    mock_client.request_coalescer.invalidate()
+    mock_client.http_mock.get(url, body=success('43'))
+    assert await mock_client.balances.get_nct_balance('home') == 43
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_get_artifact_streams(mock_client):
+    ipfs_uri = random_ipfs_uri()
+    content = os.urandom(1024)
+    url = mock_client.url_with_parameters('/artifacts/{0}/0/'.format(ipfs_uri))
+
+    mock_client.http_mock.get(url, body=content)
+    chunks = [chunk async for chunk in mock_client.iter_artifact(ipfs_uri, 0, chunk_size=256)]
+    assert b''.join(chunks) == content
+
+    mock_client.http_mock.get(url, body=content)
+    buffer = bytearray()
+    assert await mock_client.download_artifact(ipfs_uri, 0, buffer) == len(content)
+    assert buffer == content
+
+    mock_client.http_mock.get(url, body=content)
+    assert await mock_client.get_artifact(ipfs_uri, 0, max_size=512) is None
+
+    mock_client.http_mock.get(url, status=404)
+    assert await mock_client.get_artifact(ipfs_uri, 0) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_get_artifact_cached(mock_client):
+    ipfs_uri = random_ipfs_uri()
+    content = os.urandom(1024)
+    url = mock_client.url_with_parameters('/artifacts/{0}/0/'.format(ipfs_uri))
+
+    # Only mocked once, so concurrent and later requests must come from the cache
+    mock_client.artifact_cache = ArtifactCache(max_bytes=1024 * 1024, directory=None)
+    mock_client.http_mock.get(url, body=content)
+    results = await asyncio.gather(*[mock_client.get_artifact(ipfs_uri, 0) for _ in range(3)])
+    assert results == [content] * 3
+    assert await mock_client.get_artifact(ipfs_uri, 0) == content
+    assert await mock_client.get_artifact(ipfs_uri, 0, max_size=512) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_rate_limited_request_honours_retry_after(mock_client):
+    url = mock_client.url_with_parameters('/balances/{0}/nct'.format(mock_client.account), chain='home')
+    mock_client.http_mock.get(url, status=429, headers={'Retry-After': '1'})
+    # Reads are unlimited by default, configure a rate to see it reduced
+    bucket = TokenBucket(polyswarmclient.RouteClass.READS, 50, 100)
+    mock_client.rate_limit.buckets[polyswarmclient.RouteClass.READS] = bucket
+
+    assert await mock_client.make_request('GET', '/balances/{0}/nct'.format(mock_client.account), 'home') == \
+        (False, {})
+    await asyncio.sleep(0)
+    assert bucket.throttled == 1
+    assert bucket.stats()['rate'] < bucket.max_rate
@@ -0,0 +1,46 @@
+import json
+import pytest
+
+from polyswarmclient import codec
+
+
+def test_loads_from_bytes_and_str():
+    document = {'event': 'block', 'data': {'number': 42}, 'block_number': 42, 'txhash': '0x0'}
+    encoded = json.dumps(document)
+
+    assert codec.loads(encoded) == document
+    assert codec.loads(encoded.encode('utf-8')) == document
+    assert codec.loads(bytearray(encoded.encode('utf-8'))) == document
+    assert codec.loads(memoryview(encoded.encode('utf-8'))) == document
+
+
+def test_large_integers_keep_precision():
+    amount = 10 ** 30 + 7
+    encoded = json.dumps({'amount': amount, 'numbers': [2 ** 64, -2 ** 70]})
+
+    assert codec.loads(encoded) == {'amount': amount, 'numbers': [2 ** 64, -2 ** 70]}
+    assert codec.loads(encoded.encode('utf-8'))['amount'] == amount
+    assert json.loads(codec.dumps({'amount': amount})) == {'amount': amount}
+    assert json.loads(codec.dumpb({'amount': amount})) == {'amount': amount}
+
+
+def test_dumps_falls_back_for_unsupported_keys():
+    assert json.loads(codec.dumps({1: 'a'})) == {'1': 'a'}
+    assert json.loads(codec.dumpb({1: 'a'})) == {'1': 'a'}
+
+
+def test_invalid_document_raises():
+    with pytest.raises(codec.JSONDecodeError):
+        codec.loads(b'{"event": ')
+
+    with pytest.raises(codec.JSONDecodeError):
+        codec.loads('not json')
+
+
+def test_stdlib_fallback(monkeypatch):
+    monkeypatch.setattr(codec, 'orjson', None)
+    document = {'amount': 10 ** 30, 'guid': 'abc'}
+
+    assert codec.loads(json.dumps(document).encode('utf-8')) == document
+    assert json.loads(codec.dumps(document)) == document
+    assert json.loads(codec.dumpb(document)) == document
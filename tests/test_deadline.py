@@ -0,0 +1,141 @@
+import asyncio
+import math
+import os
+import pytest
+
+from polyswarmartifact import ArtifactType
+
+from polyswarmclient.abstractmicroengine import AbstractMicroengine
+from polyswarmclient.abstractscanner import AbstractScanner, ScanMode, ScanResult
+from polyswarmclient.artifactcache import ArtifactCache
+from polyswarmclient.deadline import BlockTimer, Deadline, current_deadline, within_deadline
+from polyswarmclient.exceptions import DeadlineExceededError
+from tests.utils.fixtures import mock_client, random_ipfs_uri
+
+
+class HangingScanner(AbstractScanner):
+    async def scan_async(self, guid, artifact_type, content, metadata, chain):
+        if content == b'HANG':
+            await asyncio.sleep(10)
+
+        return ScanResult(bit=True, verdict=content == b'EVIL')
+
+
+class DeadlineScanner(AbstractScanner):
+    def __init__(self):
+        super().__init__(ScanMode.SYNC, workers=1)
+
+    def scan_sync(self, guid, artifact_type, content, metadata, chain):
+        deadline = current_deadline()
+        return ScanResult(bit=deadline is not None, confidence=deadline.remaining() if deadline else 0.0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_deadline_falls_back_and_accounts(event_loop):
+    deadline = Deadline.after(0.2)
+    assert await deadline.run('fetch', asyncio.sleep(0, result=b'content')) == b'content'
+    assert await deadline.run('scan', asyncio.sleep(5), 'fallback') == 'fallback'
+    assert deadline.expired and deadline.remaining() == 0.0
+
+    stages = deadline.stats()['stages']
+    assert stages['fetch']['runs'] == 1 and stages['fetch']['timeouts'] == 0
+    assert stages['scan']['timeouts'] == 1 and stages['scan']['spent'] >= 0.1
+
+    assert await Deadline.never().run('scan', asyncio.sleep(0, result=1)) == 1
+    assert Deadline.for_blocks(20, block_time=1, reserve=6).remaining() == pytest.approx(14, abs=1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_deadline_reaches_tasks_and_scan_pool(event_loop):
+    assert current_deadline() is None
+    assert await within_deadline('scan', asyncio.sleep(0, result=1)) == 1
+
+    scanner = DeadlineScanner()
+    deadline = Deadline.after(10)
+    with deadline.activate():
+        assert await asyncio.ensure_future(asyncio.sleep(0, result=current_deadline())) is deadline
+        result = await scanner.scan('guid', ArtifactType.FILE, b'content', None, 'side')
+        assert result.bit and 0 < result.confidence <= 10
+
+    assert current_deadline() is None
+    assert not (await scanner.scan('guid', ArtifactType.FILE, b'content', None, 'side')).bit
+    await scanner.teardown()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_scan_pool_skips_scans_past_deadline(event_loop):
+    scanner = DeadlineScanner()
+    deadline = Deadline.after(0)
+    with deadline.activate():
+        with pytest.raises(DeadlineExceededError):
+            await scanner.scan('guid', ArtifactType.FILE, b'content', None, 'side')
+
+        result = await within_deadline('scan', scanner.scan('guid', ArtifactType.FILE, b'content', None, 'side'),
+                                       ScanResult())
+
+    assert not result.bit
+    assert deadline.stats()['stages']['scan']['timeouts'] == 1
+    await scanner.teardown()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_microengine_asserts_on_artifacts_scanned_in_time(mock_client):
+    artifacts = [b'EVIL', b'HANG', b'GOOD']
+
+    async def list_artifacts(uri):
+        return [('artifact', 'hash')] * len(artifacts)
+
+    async def get_artifact(uri, index):
+        return artifacts[index]
+
+    mock_client.list_artifacts = list_artifacts
+    mock_client.get_artifact = get_artifact
+
+    engine = AbstractMicroengine(mock_client, scanner=HangingScanner())
+    deadline = Deadline.after(0.5)
+    with deadline.activate():
+        results = await engine.fetch_and_scan_all('guid', ArtifactType.FILE, 'uri', 20, None, 'side')
+
+    assert [(result.bit, result.verdict) for result in results] == [(True, True), (False, False), (True, False)]
+    assert deadline.stats()['stages']['scan'] == {'runs': 3, 'spent': pytest.approx(0.5, abs=0.3), 'timeouts': 1}
+
+
+def test_block_timer_measures_each_chain():
+    timer = BlockTimer(default=1, smoothing=0.5)
+    assert timer.block_time('home') == 1
+
+    timer.observe('home', 10, now=100)
+    timer.observe('home', 12, now=110)
+    assert timer.block_time('home') == 5
+
+    # Repeated blocks are ignored, later ones move the estimate part of the way
+    timer.observe('home', 12, now=120)
+    timer.observe('home', 13, now=117)
+    assert timer.block_time('home') == 6
+    assert timer.block_time('side') == 1
+
+
+def test_deadline_without_budget_never_passes():
+    assert math.isinf(Deadline.for_blocks(5, block_time=1, reserve=6).at)
+    assert Deadline.for_blocks(5, block_time=15, reserve=6).remaining() == pytest.approx(69, abs=1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_fetch_is_given_up_at_deadline(mock_client):
+    ipfs_uri = random_ipfs_uri()
+    content = os.urandom(64)
+    url = mock_client.url_with_parameters('/artifacts/{0}/0/'.format(ipfs_uri))
+
+    for max_bytes in (0, 1024 * 1024):
+        mock_client.artifact_cache = ArtifactCache(max_bytes=max_bytes, directory=None)
+        mock_client.http_mock.get(url, body=content)
+        deadline = Deadline.after(0)
+        with deadline.activate():
+            assert await mock_client.get_artifact(ipfs_uri, 0) is None
+
+    assert deadline.stats()['stages']['fetch']['timeouts'] == 1
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+
+from polyswarmclient.dispatcher import EventDispatcher, Overflow
+from polyswarmclient.events import Callback
+
+
+class BlockingCallback(Callback):
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.running = 0
+        self.max_running = 0
+        self.seen = []
+        self.register(self.handle)
+
+    async def handle(self, value):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.release.wait()
+            self.seen.append(value)
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_dispatcher_limits_concurrency(event_loop):
+    callback = BlockingCallback()
+    dispatcher = EventDispatcher()
+    dispatcher.register('bounty', callback, concurrency=2, queue_size=10)
+
+    for i in range(6):
+        assert await dispatcher.dispatch('bounty', {'value': i})
+
+    await asyncio.sleep(0.01)
+    stats = dispatcher.stats()['bounty']
+    assert stats['running'] == 2
+    assert stats['depth'] == 4
+    assert stats['dispatched'] == 6
+
+    callback.release.set()
+    while len(callback.seen) < 6:
+        await asyncio.sleep(0.01)
+
+    assert callback.max_running == 2
+    assert sorted(callback.seen) == list(range(6))
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_dispatcher_backpressure(event_loop):
+    callback = BlockingCallback()
+    dispatcher = EventDispatcher()
+    dispatcher.register('assertion', callback, queue_size=2)
+
+    await dispatcher.dispatch('assertion', {'value': 0})
+    await dispatcher.dispatch('assertion', {'value': 1})
+    blocked = asyncio.ensure_future(dispatcher.dispatch('assertion', {'value': 2}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    callback.release.set()
+    assert await blocked
+    while len(callback.seen) < 3:
+        await asyncio.sleep(0.01)
+
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_dispatcher_drops_and_counts(event_loop):
+    callback = BlockingCallback()
+    dispatcher = EventDispatcher()
+    dispatcher.register('vote', callback, concurrency=1, queue_size=1, overflow=Overflow.DROP)
+
+    assert await dispatcher.dispatch('vote', {'value': 0})
+    await asyncio.sleep(0.01)
+    assert await dispatcher.dispatch('vote', {'value': 1})
+    assert not await dispatcher.dispatch('vote', {'value': 2})
+    assert not await dispatcher.dispatch('unknown', {})
+
+    assert dispatcher.stats()['vote']['dropped'] == 1
+    assert dispatcher.unknown == 1
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_dispatcher_survives_handler_errors(event_loop):
+    done = asyncio.Event()
+    callback = Callback()
+
+    async def handle(value):
+        if value == 0:
+            raise ValueError('Bad event')
+        done.set()
+
+    callback.register(handle)
+    dispatcher = EventDispatcher()
+    dispatcher.register('reveal', callback, concurrency=1)
+
+    await dispatcher.dispatch('reveal', {'value': 0})
+    await dispatcher.dispatch('reveal', {'value': 1})
+    await asyncio.wait_for(done.wait(), timeout=5)
+    assert dispatcher.stats()['reveal']['failed'] == 1
+    dispatcher.stop()
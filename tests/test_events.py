@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from polyswarmartifact import ArtifactType
 
 from polyswarmclient import events
+from polyswarmclient.metrics import LatencyHistogram
 
 
 @pytest.mark.asyncio
@@ -37,6 +39,55 @@ async def test_callback():
         await cb.run(4)
 
 
+@pytest.mark.asyncio
+async def test_callback_concurrent():
+    cb = events.Callback()
+    cb.configure(concurrent=True, timeout=0.5)
+    started = []
+
+    async def slow(x):
+        started.append('slow')
+        await asyncio.sleep(5)
+        return x
+
+    async def fast(x):
+        started.append('fast')
+        return 2 * x
+
+    async def failing(x):
+        raise ValueError(x)
+
+    cb.register(slow)
+    cb.register(fast)
+
+    # The slow handler times out without holding back the fast one
+    assert await cb.run(2) == [4]
+    assert started == ['slow', 'fast']
+
+    stats = cb.stats()
+    assert stats['test_callback_concurrent.<locals>.slow']['timeouts'] == 1
+    assert stats['test_callback_concurrent.<locals>.fast']['count'] == 1
+
+    cb.register(failing)
+    with pytest.raises(ValueError):
+        await cb.run(3)
+
+    assert cb.stats()['test_callback_concurrent.<locals>.failing']['errors'] == 1
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for seconds in (0.0005, 0.002, 0.002, 0.2, 100):
+        histogram.observe(seconds)
+
+    stats = histogram.asdict()
+    assert stats['count'] == 5
+    assert stats['max'] == 100
+    assert stats['p50'] == 0.005
+    assert stats['p99'] == 100
+    assert stats['buckets']['inf'] == 1
+
+
 @pytest.mark.asyncio
 async def test_on_run_callback():
     cb = events.OnRunCallback()
@@ -263,6 +314,47 @@ def test_schedule():
     assert type(s.get()[1]) == events.VoteOnBounty
     assert type(s.get()[1]) == events.SettleBounty
     assert type(s.get()[1]) == events.WithdrawStake
+    assert s.empty()
+    assert s.peek() is None
+
+    # Equal withdrawals due at different blocks are both kept
+    assert s.put(5, events.WithdrawStake(100, 5))
+    assert s.put(9, events.WithdrawStake(100, 9))
+    assert not s.put(9, events.WithdrawStake(100, 9))
+    assert len(s) == 2
+
+
+def test_schedule_pop_due():
+    s = events.Schedule()
+    s.put(5, events.SettleBounty('a'))
+    s.put(3, events.RevealAssertion('a', 0, 42, [True], ''))
+    s.put(3, events.RevealAssertion('a', 1, 42, [True], ''))
+    s.put(9, events.SettleBounty('b'))
+
+    due = s.pop_due(6)
+    assert [block for block, _ in due] == [3, 3, 5]
+    assert [event.index for _, event in due[:2]] == [0, 1]
+    assert s.pop_due(9) == []
+    assert len(s) == 1
+    assert s.peek()[0] == 9
+
+
+def test_schedule_dedupe_and_cancel():
+    s = events.Schedule()
+    assert s.put(5, events.SettleBounty('a'))
+    assert not s.put(7, events.SettleBounty('a'))
+    assert s.put(5, events.VoteOnBounty('a', [True], True))
+    assert len(s) == 2
+
+    assert s.cancel(events.VoteOnBounty('a', [], False))
+    assert not s.cancel(events.VoteOnBounty('a', [], False))
+    assert events.SettleBounty('a') in s
+
+    # The replaced and cancelled entries are skipped
+    block, event = s.peek()
+    assert block == 7 and type(event) == events.SettleBounty
+    assert s.pop_due(100) == [(7, event)]
+    assert s.empty()
 
 
 @pytest.mark.asyncio
@@ -329,3 +421,18 @@ async def test_on_settle_bounty_due_callback():
 
     with pytest.raises(TypeError):
         await cb.run(bounty_guid='guid', chain='home')
+
+
+def test_event_to_dict_round_trip():
+    scheduled = [events.RevealAssertion('guid', 1, '42', [True, False], 'metadata'),
+                 events.VoteOnBounty('guid', [True], False),
+                 events.SettleBounty('guid'),
+                 events.WithdrawStake(10 ** 20, 100)]
+    for event in scheduled:
+        loaded = events.Event.from_dict(event.to_dict())
+        assert type(loaded) == type(event)
+        assert loaded.key == event.key
+        assert loaded.fields() == event.fields()
+
+    with pytest.raises(ValueError):
+        events.Event.from_dict({'type': 'Event', 'guid': 'guid'})
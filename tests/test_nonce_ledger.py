@@ -0,0 +1,128 @@
+import pytest
+
+from polyswarmclient.ethereum.transaction import NonceManager
+from polyswarmclient.ethereum.transaction.nonceledger import NonceLedger, NonceState
+from tests.utils.fixtures import mock_client, success
+
+
+def test_reserve_sequential():
+    ledger = NonceLedger(10)
+    assert ledger.reserve(2) == [10, 11]
+    assert ledger.reserve() == [12]
+    assert ledger.base_nonce == 13
+    assert ledger.state(11) == NonceState.RESERVED
+
+
+def test_release_recycles_lowest_first():
+    ledger = NonceLedger(0)
+    ledger.reserve(10)
+    ledger.release([6, 2, 3])
+    assert ledger.find_gaps() == [2, 3, 6]
+    assert ledger.stats()['free'] == 3
+
+    # Gaps are filled in order, then new nonces continue from the high water mark
+    assert ledger.reserve(4) == [2, 3, 6, 10]
+    assert ledger.find_gaps() == []
+    assert ledger.recycled == 3
+
+
+def test_release_twice_is_ignored():
+    ledger = NonceLedger(0)
+    ledger.reserve(10)
+    ledger.release([3])
+    ledger.release([5])
+    ledger.release([4])
+    assert ledger.find_gaps() == [3, 4, 5]
+    assert ledger.is_free(4)
+    assert not ledger.is_free(6)
+
+    # Releasing twice, or releasing a nonce never handed out, does nothing
+    ledger.release([4, 20])
+    assert ledger.find_gaps() == [3, 4, 5]
+
+
+def test_release_at_top_lowers_high_water_mark():
+    ledger = NonceLedger(0)
+    ledger.reserve(5)
+    ledger.release([4, 3])
+    assert ledger.next_nonce == 3
+    assert ledger.find_gaps() == []
+    assert ledger.reserve(1) == [3]
+
+
+def test_confirmed_and_posted():
+    ledger = NonceLedger(0)
+    nonces = ledger.reserve(3)
+    ledger.mark_posted(nonces[:2])
+    assert ledger.state(0) == NonceState.POSTED
+    assert ledger.state(2) == NonceState.RESERVED
+
+    ledger.mark_confirmed(nonces)
+    assert ledger.state(0) is None
+    assert ledger.stats()['posted'] == 0
+    # Only accepted transactions are mined, a nonce still reserved stays in use
+    assert ledger.state(2) == NonceState.RESERVED
+
+
+def test_confirm_leaves_released_nonces_to_their_new_owner():
+    ledger = NonceLedger(0)
+    nonces = ledger.reserve(2)
+    ledger.mark_posted(nonces[:1])
+    ledger.release(nonces[1:])
+    assert ledger.reserve(1) == [1]
+
+    ledger.mark_confirmed(nonces)
+    assert ledger.state(0) is None
+    assert ledger.state(1) == NonceState.RESERVED
+
+
+def test_sync_finds_gaps_in_pending():
+    ledger = NonceLedger()
+    ledger.sync(42, [43, 45, 46])
+    assert ledger.find_gaps() == [42, 44]
+    assert ledger.reserve(3) == [42, 44, 47]
+
+
+def test_sync_keeps_posted_and_drops_reserved():
+    ledger = NonceLedger(5)
+    ledger.reserve(4)
+    ledger.mark_posted([7])
+    ledger.sync(5, [5])
+    assert ledger.state(6) == 'free'
+    assert ledger.state(7) == NonceState.POSTED
+    assert ledger.state(8) is None
+    assert ledger.reserve(2) == [6, 8]
+
+    # When overset, local posts are forgotten too
+    ledger.sync(5, [5], keep_posted=False)
+    assert ledger.reserve(1) == [6]
+
+
+def test_sync_frees_unposted_reservations():
+    ledger = NonceLedger()
+    assert ledger.reserve() == [0]
+    ledger.sync(0, [])
+    assert ledger.reserve() == [0]
+
+
+def test_find_gaps():
+    assert NonceManager.find_gaps([1, 2, 5, 7]) == [3, 4, 6]
+    assert NonceManager.find_gaps(list(range(100000))) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_nonce_manager_recycles_without_resync(mock_client):
+    mock_client.http_mock.get(mock_client.url_with_parameters('/nonce', params={'ignore_pending': ' '}, chain='home'),
+                              body=success(42))
+    mock_client.http_mock.get(mock_client.url_with_parameters('/pending', chain='home'), body=success([43]))
+    home = mock_client.nonce_managers['home']
+    await home.setup()
+
+    assert await home.reserve(2) == [42, 44]
+    home.mark_posted([42])
+    home.release([44])
+
+    # Only mocked once, so this must come from the ledger
+    assert await home.reserve(2) == [44, 45]
+    assert home.base_nonce == 46
@@ -0,0 +1,38 @@
+import pytest
+
+from polyswarmclient.parameters import Parameters
+
+
+def test_parameters_reads():
+    parameters = Parameters({'assertion_fee': 10, 'arbiter_vote_window': '25', 'deprecated': False})
+    assert parameters.assertion_fee == 10
+    assert parameters['assertion_fee'] == 10
+    assert parameters.get_int('arbiter_vote_window') == 25
+    assert parameters.get_int('missing', 3) == 3
+    assert parameters.get_bool('deprecated') is False
+    assert parameters.values('assertion_fee', 'missing') == (10, None)
+    assert 'assertion_fee' in parameters
+
+    with pytest.raises(AttributeError):
+        parameters.missing
+
+    with pytest.raises(TypeError):
+        parameters.snapshot()['assertion_fee'] = 0
+
+
+def test_parameters_update_swaps_snapshot():
+    parameters = Parameters({'assertion_fee': 10, 'bounty_fee': 20})
+    before = parameters.snapshot()
+    parameters.replace({'assertion_fee': 15})
+
+    assert before['assertion_fee'] == 10
+    assert parameters.values('assertion_fee', 'bounty_fee') == (15, 20)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_parameters_async_compatibility(event_loop):
+    parameters = Parameters({'assertion_fee': 10})
+    await parameters.update({'assertion_fee': 12})
+    assert await parameters.get('assertion_fee') == 12
+    assert await parameters.get('missing') is None
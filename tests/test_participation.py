@@ -0,0 +1,77 @@
+import os
+import pytest
+
+from polyswarmclient.participation import ParticipationIndex, Role
+from tests.utils.fixtures import failure, mock_client, success
+
+GUID = '2b2f6a1d-7c6b-4a52-9e3b-5b2a6d2c1f10'
+
+
+def test_index_persists(tmpdir):
+    path = os.path.join(str(tmpdir), 'participation.log')
+    index = ParticipationIndex(path)
+    index.record('a', Role.NONE)
+    index.record('a', Role.ASSERTER)
+    index.record('b', Role.AUTHOR)
+    index.record('b', Role.NONE)
+    index.record('c', Role.NONE)
+    index.close()
+
+    with open(path, 'a') as f:
+        f.write('d aut')
+
+    loaded = ParticipationIndex(path)
+    assert loaded.get('a') is True
+    assert loaded.get('b') is True
+    assert loaded.get('c') is False
+    assert loaded.get('d') is None
+    assert len(loaded) == 3
+
+
+def test_index_compacts(tmpdir):
+    path = os.path.join(str(tmpdir), 'participation.log')
+    with open(path, 'w') as f:
+        for _ in range(10):
+            f.write('a none\n')
+
+    ParticipationIndex(path).close()
+    with open(path, 'r') as f:
+        assert f.read() == 'a none\n'
+
+
+def test_index_for_account(tmpdir):
+    assert ParticipationIndex.for_account('0xABC', 'home', directory=None).path is None
+    index = ParticipationIndex.for_account('0xABC', 'home', directory=str(tmpdir))
+    assert index.path == os.path.join(str(tmpdir), 'participation-0xabc-home.log')
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_did_participate_uses_index(mock_client):
+    bounties = mock_client.bounties
+    mock_client.http_mock.get(mock_client.url_with_parameters('/bounties/{0}'.format(GUID), chain='side'),
+                              body=success({'guid': GUID, 'author': '0x0'}))
+    mock_client.http_mock.get(mock_client.url_with_parameters('/bounties/{0}/assertions'.format(GUID), chain='side'),
+                              body=success([{'author': mock_client.account}]))
+    mock_client.http_mock.get(mock_client.url_with_parameters('/bounties/{0}/votes'.format(GUID), chain='side'),
+                              body=success([]))
+
+    assert await bounties.did_participate(GUID, 'side')
+    # Only mocked once, so this must come from the index
+    assert await bounties.did_participate(GUID, 'side')
+    assert bounties.participation_index('side').roles[GUID] == Role.ASSERTER
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_did_participate_does_not_remember_failed_lookups(mock_client):
+    bounties = mock_client.bounties
+    mock_client.http_mock.get(mock_client.url_with_parameters('/bounties/{0}'.format(GUID), chain='side'),
+                              body=success({'guid': GUID, 'author': '0x0'}))
+    mock_client.http_mock.get(mock_client.url_with_parameters('/bounties/{0}/assertions'.format(GUID), chain='side'),
+                              status=400, body=failure('Bad request'))
+    mock_client.http_mock.get(mock_client.url_with_parameters('/bounties/{0}/votes'.format(GUID), chain='side'),
+                              body=success([]))
+
+    assert not await bounties.did_participate(GUID, 'side')
+    assert GUID not in bounties.participation_index('side')
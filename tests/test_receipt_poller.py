@@ -0,0 +1,151 @@
+import asyncio
+import pytest
+
+from polyswarmclient.ethereum.transaction import ReceiptPoller
+from tests.utils.fixtures import failure, mock_client, success
+
+
+def fetched(mock_client, chain):
+    url = mock_client.url_with_parameters('/transactions', chain=chain)
+    return [call.kwargs['json']['transactions'] for key, calls in mock_client.http_mock.requests.items()
+            if key[0] == 'GET' and str(key[1]) == url for call in calls]
+
+
+def guid_is(guid):
+    def select(events):
+        return any(b.get('guid') == guid for b in events.get('bounties', []))
+
+    return select
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_single_action_is_unchanged(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.01)
+    results = {'bounties': [{'guid': 'a'}], 'transfers': [{'value': '1'}], 'errors': []}
+    mock_client.http_mock.get(mock_client.url_with_parameters('/transactions', chain='home'), body=success(results))
+
+    assert await poller.get(['aa'], None, select=guid_is('a')) == (True, results)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_concurrent_actions_share_a_request(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.05)
+    results = {
+        'bounties': [{'guid': 'a'}, {'guid': 'b'}],
+        'errors': ['Transaction bb failed, check parameters and try again', 'Unknown error'],
+    }
+    mock_client.http_mock.get(mock_client.url_with_parameters('/transactions', chain='home'), body=success(results))
+
+    first, second = await asyncio.gather(poller.get(['aa', 'a2'], None, select=guid_is('a')),
+                                         poller.get(['bb'], None, select=guid_is('b')))
+
+    assert fetched(mock_client, 'home') == [['aa', 'a2', 'bb']]
+    assert first == (True, {'bounties': [{'guid': 'a'}], 'errors': ['Unknown error']})
+    assert second == (True, {'bounties': [{'guid': 'b'}], 'errors': results['errors']})
+    assert poller.stats()['requests'] == 1
+    assert poller.stats()['served'] == 2
+    assert poller.interval == 0.1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_failed_batch_falls_back_to_each_action(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.05)
+    url = mock_client.url_with_parameters('/transactions', chain='home')
+    mock_client.http_mock.get(url, status=400, body=failure('Too many transactions'))
+    mock_client.http_mock.get(url, body=success({'bounties': [{'guid': 'a'}]}))
+    mock_client.http_mock.get(url, body=success({'bounties': [{'guid': 'b'}]}))
+
+    responses = await asyncio.gather(poller.get(['aa'], None, select=guid_is('a')),
+                                     poller.get(['bb'], None, select=guid_is('b')))
+
+    assert sorted(r['bounties'][0]['guid'] for _, r in responses) == ['a', 'b']
+    assert fetched(mock_client, 'home') == [['aa', 'bb'], ['aa'], ['bb']]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_timeout_reports_receipt_timeout(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=10, timeout=0.05)
+
+    found, results = await poller.get(['aa'], None, select=guid_is('a'))
+    assert not found
+    assert 'timeout during wait for receipt' in results['errors'][0].lower()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_indistinguishable_actions_are_fetched_alone(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.05)
+    url = mock_client.url_with_parameters('/transactions', chain='home')
+    mock_client.http_mock.get(url, body=success({'transfers': [{'value': '1'}], 'errors': []}))
+    mock_client.http_mock.get(url, body=success({'transfers': [{'value': '2'}], 'errors': []}))
+
+    # Settles accept any events, so they are never batched
+    first, second = await asyncio.gather(poller.get(['aa'], None, select=lambda events: True),
+                                         poller.get(['bb'], None))
+
+    assert first == (True, {'transfers': [{'value': '1'}], 'errors': []})
+    assert second == (True, {'transfers': [{'value': '2'}], 'errors': []})
+    assert fetched(mock_client, 'home') == [['aa'], ['bb']]
+    assert poller.interval == 0.05
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_identical_bounties_are_fetched_alone(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.05)
+    url = mock_client.url_with_parameters('/transactions', chain='home')
+    both = [{'guid': 'a', 'amount': '10', 'uri': 'Qm'}, {'guid': 'b', 'amount': '10', 'uri': 'Qm'}]
+    mock_client.http_mock.get(url, body=success({'bounties': both}))
+    mock_client.http_mock.get(url, body=success({'bounties': both[:1]}))
+    mock_client.http_mock.get(url, body=success({'bounties': both[1:]}))
+
+    def same_post(events):
+        return any(b['amount'] == '10' and b['uri'] == 'Qm' for b in events.get('bounties', []))
+
+    first, second = await asyncio.gather(poller.get(['aa'], None, select=same_post),
+                                         poller.get(['bb'], None, select=same_post))
+
+    assert first == (True, {'bounties': both[:1]})
+    assert second == (True, {'bounties': both[1:]})
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_events_naming_their_transaction_are_split_by_txhash(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.05)
+    transfers = [{'value': '1', 'txhash': 'aa'}, {'value': '2', 'txhash': 'bb'}]
+    mock_client.http_mock.get(mock_client.url_with_parameters('/transactions', chain='home'),
+                              body=success({'transfers': transfers}))
+
+    def any_transfer(events):
+        return bool(events.get('transfers'))
+
+    first, second = await asyncio.gather(poller.get(['aa'], None, select=any_transfer),
+                                         poller.get(['bb'], None, select=any_transfer))
+
+    assert first == (True, {'transfers': transfers[:1]})
+    assert second == (True, {'transfers': transfers[1:]})
+    assert poller.stats()['requests'] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_unclaimed_events_go_to_the_action_missing_its_event(mock_client):
+    poller = ReceiptPoller(mock_client, 'home', min_interval=0.05)
+    results = {'bounties': [{'guid': 'a'}], 'transfers': [{'value': '1'}], 'deposits': [{'value': '1'}]}
+    mock_client.http_mock.get(mock_client.url_with_parameters('/transactions', chain='home'), body=success(results))
+
+    # Recognizes its events only together, so no single event is claimed by it
+    def transfer_and_deposit(events):
+        return bool(events.get('transfers')) and bool(events.get('deposits'))
+
+    first, second = await asyncio.gather(poller.get(['aa'], None, select=guid_is('a')),
+                                         poller.get(['bb'], None, select=transfer_and_deposit))
+
+    assert first == (True, {'bounties': [{'guid': 'a'}], 'transfers': [], 'deposits': []})
+    assert second == (True, {'bounties': [], 'transfers': [{'value': '1'}], 'deposits': [{'value': '1'}]})
+    assert poller.stats()['requests'] == 1
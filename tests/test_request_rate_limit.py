@@ -1,8 +1,10 @@
 import asyncio
 import asynctest
 import pytest
+import time
 
-from polyswarmclient.request_rate_limit import RequestRateLimit
+from polyswarmclient import request_rate_limit
+from polyswarmclient.request_rate_limit import Priority, RequestRateLimit, RouteClass, TokenBucket, parse_retry_after
 
 
 @pytest.mark.asyncio
@@ -53,3 +55,119 @@ async def test_rate_limit_stops_calls(event_loop):
     await rate_limit.trigger()
     await wait()
     mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_token_bucket_limits_rate(event_loop):
+    bucket = TokenBucket('reads', rate=20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+
+    # Two from the burst, then four more at 20 per second
+    assert time.monotonic() - start >= 0.15
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_token_bucket_priority(event_loop):
+    bucket = TokenBucket('transactions', rate=10, burst=1)
+    await bucket.acquire()
+    order = []
+
+    async def acquire(name, priority):
+        await bucket.acquire(priority)
+        order.append(name)
+
+    tasks = [asyncio.ensure_future(acquire('low', Priority.LOW)),
+             asyncio.ensure_future(acquire('normal', Priority.NORMAL))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.ensure_future(acquire('high', Priority.HIGH)))
+    await asyncio.gather(*tasks)
+
+    assert order == ['high', 'normal', 'low']
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_token_bucket_throttle(event_loop):
+    bucket = TokenBucket('reads', rate=0, burst=1)
+    bucket.throttle(retry_after=0.2)
+
+    # High priority requests go first, but still honour Retry-After
+    start = time.monotonic()
+    await bucket.acquire(Priority.HIGH)
+    assert time.monotonic() - start >= 0.15
+
+    limited = TokenBucket('transactions', rate=10, burst=10)
+    limited.throttle()
+    assert limited.rate == 5
+    assert limited.throttled == 1
+
+    # Without Retry-After high priority requests are only slowed down
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limited.acquire(Priority.NORMAL), timeout=0.3)
+    await asyncio.wait_for(limited.acquire(Priority.HIGH), timeout=1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_unlimited_bucket_backs_off_adaptively(event_loop, monkeypatch):
+    bucket = TokenBucket('artifacts', rate=0, burst=1)
+    for _ in range(20):
+        await bucket.acquire()
+
+    # Without a configured rate, a 429 limits the bucket to half the rate requests were sent at
+    bucket.throttle(retry_after=0)
+    assert not bucket.unlimited
+    assert bucket.ceiling == 20
+    assert bucket.rate == 10
+
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire(Priority.HIGH)
+    assert time.monotonic() - start >= 0.2
+
+    # Once recovered to where the 429 came, the bucket is unlimited again
+    monkeypatch.setattr(request_rate_limit, 'RATE_LIMIT_RECOVERY', 1000)
+    await asyncio.sleep(0.05)
+    await bucket.acquire()
+    assert bucket.unlimited
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_rate_limit_is_unlimited_by_default(event_loop):
+    rate_limit = await RequestRateLimit.build()
+    assert all(bucket.unlimited for bucket in rate_limit.buckets.values())
+
+    # A large bounty fetches every artifact without waiting on a client side cap
+    await asyncio.wait_for(asyncio.gather(*[rate_limit.check(RouteClass.ARTIFACTS) for _ in range(256)]), timeout=1)
+    assert rate_limit.stats()[RouteClass.ARTIFACTS]['waited'] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_rate_limit_per_route(event_loop):
+    rate_limit = await RequestRateLimit.build()
+    await rate_limit.trigger(RouteClass.TRANSACTIONS, retry_after=5)
+
+    # Other route classes are unaffected
+    await asyncio.wait_for(rate_limit.check(RouteClass.READS), timeout=1)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(rate_limit.check(RouteClass.TRANSACTIONS, Priority.HIGH), timeout=0.3)
+
+    assert rate_limit.stats()[RouteClass.TRANSACTIONS]['throttled'] == 1
+
+
+def test_route_class_and_retry_after():
+    assert RouteClass.of('GET', '/artifacts/QmHash/0/') == RouteClass.ARTIFACTS
+    assert RouteClass.of('POST', '/bounties/guid/vote') == RouteClass.TRANSACTIONS
+    assert RouteClass.of('GET', '/transactions') == RouteClass.TRANSACTIONS
+    assert RouteClass.of('GET', '/nonce') == RouteClass.READS
+
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
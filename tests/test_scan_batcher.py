@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+
+from polyswarmartifact import ArtifactType
+
+from polyswarmclient.abstractmicroengine import AbstractMicroengine
+from polyswarmclient.abstractscanner import AbstractScanner, ScanResult
+from polyswarmclient.scanbatcher import ScanBatcher
+from tests.utils.fixtures import mock_client
+
+
+class SingleScanner(AbstractScanner):
+    async def scan_async(self, guid, artifact_type, content, metadata, chain):
+        return ScanResult(bit=True, verdict=content == b'EVIL')
+
+
+class BatchScanner(SingleScanner):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    async def scan_batch(self, guid, artifact_type, contents, metadatas, chain):
+        self.batches.append((guid, list(contents)))
+        if b'FAIL' in contents:
+            raise ValueError('Engine failed')
+
+        if b'SHORT' in contents:
+            return []
+
+        return [ScanResult(bit=True, verdict=content == b'EVIL') for content in contents]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_default_scan_batch_falls_back_to_scan(event_loop):
+    scanner = SingleScanner()
+    assert not scanner.implements_scan_batch
+    assert ScanBatcher.for_scanner(scanner) is None
+
+    results = await scanner.scan_batch('guid', ArtifactType.FILE, [b'EVIL', b'GOOD'], [None, None], 'side')
+    assert [result.verdict for result in results] == [True, False]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_batcher_groups_by_bounty(event_loop):
+    scanner = BatchScanner()
+    batcher = ScanBatcher.for_scanner(scanner, max_size=2, max_latency=0.05)
+
+    results = await asyncio.gather(*[batcher.scan(guid, ArtifactType.FILE, content, None, 'side')
+                                     for guid, content in [('a', b'EVIL'), ('b', b'GOOD'), ('a', b'GOOD'),
+                                                           ('a', b'EVIL')]])
+    assert [result.verdict for result in results] == [True, False, False, True]
+    # The first bounty fills a batch, the rest wait out the latency limit
+    assert sorted(scanner.batches) == [('a', [b'EVIL']), ('a', [b'EVIL', b'GOOD']), ('b', [b'GOOD'])]
+    assert batcher.stats() == {'batches': 3, 'artifacts': 4, 'pending': 0}
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_batcher_fails_whole_batch(event_loop):
+    batcher = ScanBatcher(BatchScanner(), max_size=2)
+    results = await asyncio.gather(batcher.scan('a', ArtifactType.FILE, b'FAIL', None, 'side'),
+                                   batcher.scan('a', ArtifactType.FILE, b'GOOD', None, 'side'),
+                                   batcher.scan('b', ArtifactType.FILE, b'SHORT', None, 'side'),
+                                   return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_microengine_scans_bounty_in_batches(mock_client):
+    artifacts = [b'EVIL', b'GOOD', b'EVIL']
+
+    async def list_artifacts(uri):
+        return [('artifact', 'hash')] * len(artifacts)
+
+    async def get_artifact(uri, index):
+        return artifacts[index]
+
+    mock_client.list_artifacts = list_artifacts
+    mock_client.get_artifact = get_artifact
+
+    scanner = BatchScanner()
+    engine = AbstractMicroengine(mock_client, scanner=scanner)
+    results = await engine.fetch_and_scan_all('guid', ArtifactType.FILE, 'uri', 20, None, 'side')
+    assert [result.verdict for result in results] == [True, False, True]
+    assert len(scanner.batches) == 1 and len(scanner.batches[0][1]) == 3
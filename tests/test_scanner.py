@@ -1,11 +1,14 @@
 import asyncio
+import os
 from concurrent.futures import Executor
 from concurrent.futures.process import ProcessPoolExecutor
 from concurrent.futures.thread import ThreadPoolExecutor
 from typing import Optional
 import time
 import pytest
-from polyswarmclient.abstractscanner import AbstractScanner, ScanResult, ScanMode
+from polyswarmclient.abstractscanner import (AbstractScanner, ScanResult, ScanMode, SharedArtifact,
+                                             SCAN_SHARED_MEMORY_MIN_SIZE, shared_memory)
+from polyswarmclient.exceptions import ScannerSetupFailedError
 
 
 class DefaultScanner(AbstractScanner):
@@ -26,7 +29,7 @@ class DefaultScanner(AbstractScanner):
 class ThreadPoolScanner(DefaultScanner):
 
     def get_executor(self) -> Optional[Executor]:
-        return ThreadPoolExecutor(max_workers=1)
+        return ThreadPoolExecutor(max_workers=self.workers)
 
 
 class ProcessPoolScanner(DefaultScanner):
@@ -112,3 +115,156 @@ async def test_scanner_context_manager():
         await setup.wait()
 
     await teardown.wait()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_scan_pool_lifecycle():
+    executors = []
+
+    class Scanner(ThreadPoolScanner):
+        def get_executor(self) -> Optional[Executor]:
+            executors.append(super().get_executor())
+            return executors[-1]
+
+    scanner = Scanner(mode=ScanMode.SYNC)
+    scanner.workers = 2
+    assert scanner.scan_pool_stats() is None
+    async with scanner:
+        for _ in range(3):
+            assert (await scanner.scan(None, None, None, None, None)).verdict
+
+        stats = scanner.scan_pool_stats()
+        assert stats['workers'] == 2
+        assert stats['wait']['count'] == 3
+        assert stats['in_flight'] == 0
+
+    # One executor for every scan, shut down with the scanner
+    assert len(executors) == 1
+    assert executors[0]._shutdown
+    assert scanner.scan_pool is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_stop_scan_pool_does_not_block_loop():
+    scanner = ThreadPoolScanner(mode=ScanMode.SYNC, sleep=1)
+    scan = asyncio.ensure_future(scanner.scan(None, None, None, None, None))
+    await asyncio.sleep(0.1)
+
+    start = time.monotonic()
+    shutdown = scanner.stop_scan_pool()
+    assert time.monotonic() - start < 0.5
+
+    # Running scans still finish
+    await shutdown
+    assert (await scan).verdict
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_scan_pool_reports_queue_depth():
+    scanner = DefaultScanner(mode=ScanMode.SYNC, sleep=0.2)
+    scanner.workers = 1
+    await scanner.setup()
+    assert scanner.scan_pool is not None
+
+    results = await asyncio.gather(*[scanner.scan(None, None, None, None, None) for _ in range(3)])
+    assert all(result.verdict for result in results)
+
+    stats = scanner.scan_pool_stats()
+    assert stats['max_queued'] == 2
+    assert stats['wait']['max'] >= 0.3
+    await scanner.teardown()
+    assert scanner.scan_pool is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_scan_pool_process_executor():
+    scanner = DefaultScanner(mode=ScanMode.SYNC)
+    scanner.executor_type = 'process'
+    scanner.workers = 1
+    async with scanner:
+        assert isinstance(scanner.scan_pool.executor, ProcessPoolExecutor)
+        assert (await scanner.scan(None, None, None, None, None)).verdict
+
+    scanner.executor_type = 'fork'
+    with pytest.raises(ValueError):
+        await scanner.setup()
+
+
+class ProcessScanner(AbstractScanner):
+
+    def __init__(self, crash_marker=None, fail_setup=False):
+        super().__init__(ScanMode.PROCESS, workers=2)
+        self.crash_marker = crash_marker
+        self.fail_setup = fail_setup
+        self.process_state = None
+
+    def setup_process(self):
+        self.process_state = os.getpid()
+        return not self.fail_setup
+
+    def scan_sync(self, guid, artifact_type, content, metadata, chain):
+        if self.crash_marker is not None and not os.path.exists(self.crash_marker):
+            open(self.crash_marker, 'w').close()
+            os._exit(1)
+
+        return ScanResult(bit=True, verdict=bytes(content[:4]) == b'EVIL',
+                          metadata=(type(content).__name__, len(content), self.process_state))
+
+
+@pytest.mark.skipif(shared_memory is None, reason='Needs multiprocessing.shared_memory, Python 3.8+')
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_process_scan_uses_shared_memory():
+    async with ProcessScanner() as scanner:
+        large = b'EVIL' + b'\0' * (SCAN_SHARED_MEMORY_MIN_SIZE * 2)
+        result = await scanner.scan(None, None, large, None, None)
+        kind, size, pid = result.metadata
+        assert result.verdict
+        assert (kind, size) == ('memoryview', len(large))
+        assert pid not in (None, os.getpid())
+
+        result = await scanner.scan(None, None, b'GOOD', None, None)
+        assert not result.verdict
+        assert result.metadata[:2] == ('bytes', 4)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_process_scan_restarts_crashed_pool(tmpdir):
+    scanner = ProcessScanner(crash_marker=os.path.join(str(tmpdir), 'crashed'))
+    async with scanner:
+        first_pool = scanner.scan_pool
+        result = await scanner.scan(None, None, b'EVIL', None, None)
+        assert result.verdict
+        assert scanner.scan_pool is not first_pool
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_process_setup_failure():
+    with pytest.raises(ScannerSetupFailedError):
+        async with ProcessScanner(fail_setup=True):
+            pass
+
+
+@pytest.mark.skipif(shared_memory is None, reason='Needs multiprocessing.shared_memory, Python 3.8+')
+def test_shared_artifact_is_released():
+    content = b'x' * SCAN_SHARED_MEMORY_MIN_SIZE
+    with SharedArtifact(content) as artifact:
+        name, size, inline = artifact.handle
+        assert size == len(content) and inline is None
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+    assert SharedArtifact(b'small').handle == (None, 0, b'small')
+    assert SharedArtifact(None).handle == (None, 0, None)
+
+    # URLs and other text go inline, scan_sync gets them as str
+    url = 'http://' + 'x' * SCAN_SHARED_MEMORY_MIN_SIZE
+    with SharedArtifact(url) as artifact:
+        assert artifact.handle == (None, 0, url)
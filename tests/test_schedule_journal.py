@@ -0,0 +1,109 @@
+import asyncio
+import os
+import pytest
+
+from polyswarmclient import events
+from polyswarmclient.schedulejournal import ScheduleJournal
+from tests.utils.fixtures import mock_client
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_journal_persists(tmpdir):
+    path = os.path.join(str(tmpdir), 'schedule.db')
+    journal = ScheduleJournal(path)
+    journal.put('side', 10, events.SettleBounty('a'))
+    journal.put('side', 12, events.SettleBounty('a'))
+    journal.put('side', 5, events.RevealAssertion('a', 0, '42', [True], ''))
+    journal.put('side', 7, events.RevealAssertion('b', 0, '42', [True], ''))
+    journal.put('home', 3, events.WithdrawStake(100))
+    journal.remove('side', [events.RevealAssertion('b', 0, '', [], '')])
+    await journal.close()
+
+    loaded = ScheduleJournal(path)
+    assert len(loaded) == 3
+    assert [(block, event.key) for block, event in loaded.load('side')] == [(5, ('RevealAssertion', 'a', 0)),
+                                                                            (12, ('SettleBounty', 'a'))]
+    assert [event.amount for _, event in loaded.load('home')] == [100]
+    await loaded.close()
+
+
+def test_journal_compacts(tmpdir):
+    path = os.path.join(str(tmpdir), 'schedule.db')
+    journal = ScheduleJournal(path, compact_every=10)
+    scheduled = [events.SettleBounty(str(i)) for i in range(15)]
+    for i, event in enumerate(scheduled):
+        journal.put('side', i, event)
+
+    journal.remove('side', scheduled[:9])
+    assert journal.removed == 9
+    journal.remove('side', scheduled[9:10])
+    assert journal.removed == 0
+    # Reads wait for the writes and the compaction queued before them
+    assert len(journal) == 5
+    assert os.path.getsize(path + '-wal') == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_journal_for_account(tmpdir):
+    journal = ScheduleJournal.for_account('0xABC', directory=None)
+    journal.put('side', 1, events.SettleBounty('a'))
+    assert journal.load('side') == []
+
+    journal = ScheduleJournal.for_account('0xABC', directory=str(tmpdir))
+    assert journal.path == os.path.join(str(tmpdir), 'schedule-0xabc.db')
+    await journal.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_client_writes_through_to_journal(mock_client, tmpdir):
+    path = os.path.join(str(tmpdir), 'schedule.db')
+    mock_client.schedule_journal = ScheduleJournal(path)
+    mock_client.schedule(100, events.SettleBounty('a'), 'side')
+    mock_client.schedule(100, events.SettleBounty('b'), 'side')
+    mock_client.schedule(200, events.VoteOnBounty('a', [True], True), 'side')
+    assert mock_client.unschedule(events.SettleBounty('b'), 'side')
+    await asyncio.wrap_future(mock_client.schedule_journal.flush())
+
+    restarted = ScheduleJournal(path)
+    assert [(block, event.key) for block, event in restarted.load('side')] == [(100, ('SettleBounty', 'a')),
+                                                                               (200, ('VoteOnBounty', 'a'))]
+
+    # Replaying the same events does not schedule them twice
+    mock_client.replay_schedule_journal({'side'})
+    schedule = mock_client._Client__schedules['side']
+    assert len(schedule) == 2
+    # Two live entries, and the one unscheduled above that is skipped once it reaches the front
+    assert len(schedule.heap) == 3
+    assert sorted((block, event.key) for block, _, event in schedule.heap if event is not None) == \
+        [(100, ('SettleBounty', 'a')), (200, ('VoteOnBounty', 'a'))]
+    assert [(block, event.key) for block, event in schedule.pop_due(300)] == [(100, ('SettleBounty', 'a')),
+                                                                             (200, ('VoteOnBounty', 'a'))]
+    await restarted.close()
+    await mock_client.schedule_journal.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_journal_batches_writes(tmpdir):
+    path = os.path.join(str(tmpdir), 'schedule.db')
+    journal = ScheduleJournal(path, flush_interval=60)
+    journal.put('side', 10, events.SettleBounty('a'))
+    journal.put('side', 11, events.SettleBounty('b'))
+    journal.remove('side', [events.SettleBounty('b')])
+    # Nothing is written until the batch is flushed, only the last change of each event is kept
+    assert len(journal.unwritten) == 2
+    assert journal.unwritten[('side', '["SettleBounty", "b"]')] is None
+    assert journal.flush_timer is not None
+
+    await asyncio.wrap_future(journal.flush())
+    assert journal.flush_timer is None
+    restarted = ScheduleJournal(path)
+    assert [(block, event.key) for block, event in restarted.load('side')] == [(10, ('SettleBounty', 'a'))]
+    await restarted.close()
+
+    await journal.close()
+    journal.put('side', 12, events.SettleBounty('c'))
+    assert journal.unwritten == {}
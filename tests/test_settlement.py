@@ -0,0 +1,159 @@
+import asyncio
+import os
+import pytest
+
+from polyswarmclient.settlement import SettleCheckpoint, SettlePipeline, SettleProgress
+
+
+class Contract:
+    def __init__(self, pages, page_size=3):
+        self.guids = ['guid-{0}'.format(i) for i in range(pages * page_size)]
+        self.page_size = page_size
+        self.fetched = []
+        self.settled = []
+        self.running = 0
+        self.max_running = 0
+        self.fail = set()
+        self.block = None
+
+    async def fetch_page(self, page, count):
+        self.fetched.append(page)
+        return self.guids[page * count:(page + 1) * count]
+
+    async def settle(self, guid):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if self.block is not None and guid == self.block:
+                await asyncio.Event().wait()
+
+            await asyncio.sleep(0.001)
+            if guid in self.fail:
+                raise ValueError('Settle failed')
+
+            self.settled.append(guid)
+            return 10
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_pipeline_settles_everything(event_loop):
+    contract = Contract(pages=5)
+    contract.fail.add('guid-4')
+    pipeline = SettlePipeline(contract.fetch_page, contract.settle, page_size=3, prefetch=1, concurrency=2)
+
+    progress = await pipeline.run()
+    assert sorted(contract.settled) == sorted(g for g in contract.guids if g != 'guid-4')
+    assert contract.max_running == 2
+    assert contract.fetched == [0, 1, 2, 3, 4, 5]
+    assert progress.asdict() == {'page': 5, 'settled': 14, 'failed': 1, 'recovered': 140, 'retry': {'guid-4': 1}}
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_pipeline_prefetch_is_bounded(event_loop):
+    contract = Contract(pages=10)
+    contract.block = 'guid-0'
+    pipeline = SettlePipeline(contract.fetch_page, contract.settle, page_size=3, prefetch=2, concurrency=1)
+
+    task = asyncio.ensure_future(pipeline.run())
+    await asyncio.sleep(0.05)
+    # One GUID held by the worker, two pages waiting in the queue, and the producer blocked on the next page
+    assert contract.fetched == [0, 1, 2]
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_pipeline_resumes_from_checkpoint(event_loop, tmpdir):
+    checkpoint = SettleCheckpoint.for_account('0xABC', 'home', directory=str(tmpdir))
+    contract = Contract(pages=4)
+    contract.block = 'guid-6'
+    pipeline = SettlePipeline(contract.fetch_page, contract.settle, checkpoint, page_size=3, concurrency=1)
+
+    task = asyncio.ensure_future(pipeline.run())
+    while checkpoint.load().page < 2:
+        await asyncio.sleep(0.01)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert checkpoint.load().asdict() == {'page': 2, 'settled': 6, 'failed': 0, 'recovered': 60, 'retry': {}}
+
+    contract = Contract(pages=4)
+    pipeline = SettlePipeline(contract.fetch_page, contract.settle, checkpoint, page_size=3, concurrency=1)
+    progress = await pipeline.run()
+    assert contract.settled == contract.guids[6:]
+    assert progress.settled == 12
+    assert not os.path.exists(checkpoint.path)
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_pipeline_retries_failed_settles(event_loop, tmpdir):
+    checkpoint = SettleCheckpoint.for_account('0xABC', 'home', directory=str(tmpdir))
+    contract = Contract(pages=4)
+    contract.fail.add('guid-1')
+    contract.block = 'guid-6'
+    pipeline = SettlePipeline(contract.fetch_page, contract.settle, checkpoint, page_size=3, concurrency=1)
+
+    task = asyncio.ensure_future(pipeline.run())
+    while checkpoint.load().page < 2:
+        await asyncio.sleep(0.01)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The failed bounty is kept even though the checkpoint moved past its page
+    assert checkpoint.load().retry == {'guid-1': 1}
+
+    contract = Contract(pages=4)
+    contract.fail.add('guid-7')
+    pipeline = SettlePipeline(contract.fetch_page, contract.settle, checkpoint, page_size=3, concurrency=1)
+    progress = await pipeline.run()
+    assert contract.settled == ['guid-1', 'guid-6'] + contract.guids[8:]
+    assert progress.retry == {'guid-7': 1}
+
+    # A run that finishes with failures starts over, after trying them again
+    assert checkpoint.load().asdict() == {'page': 0, 'settled': 0, 'failed': 0, 'recovered': 0, 'retry': {'guid-7': 1}}
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_pipeline_gives_up_after_max_attempts(event_loop, tmpdir):
+    checkpoint = SettleCheckpoint.for_account('0xABC', 'home', directory=str(tmpdir))
+    for attempt in range(1, 3):
+        contract = Contract(pages=2)
+        contract.fail.add('guid-1')
+        pipeline = SettlePipeline(contract.fetch_page, contract.settle, checkpoint, page_size=3, concurrency=1,
+                                  max_attempts=2)
+        progress = await pipeline.run()
+        # Each run tries the bounty once, retried GUIDs are skipped when their page lists them again
+        assert progress.failed == 1
+        assert 'guid-1' not in contract.settled
+
+    assert progress.retry == {}
+    assert not os.path.exists(checkpoint.path)
+
+
+def test_checkpoint_reads_guid_lists(tmpdir):
+    checkpoint = SettleCheckpoint(os.path.join(str(tmpdir), 'settle.json'))
+    with open(checkpoint.path, 'w') as f:
+        f.write('{"page": 3, "settled": 1, "recovered": 10, "retry": ["guid-1"]}')
+
+    assert checkpoint.load().retry == {'guid-1': 1}
+
+
+def test_checkpoint_ignores_bad_file(tmpdir):
+    checkpoint = SettleCheckpoint(os.path.join(str(tmpdir), 'settle.json'))
+    with open(checkpoint.path, 'w') as f:
+        f.write('{"page": ')
+
+    assert checkpoint.load().asdict() == SettleProgress().asdict()
+    assert SettleCheckpoint().load().page == 0
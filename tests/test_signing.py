@@ -0,0 +1,65 @@
+import pytest
+
+from polyswarmtransaction.bounty import VoteTransaction
+from web3.auto import w3
+
+from polyswarmclient.signing import SigningService
+
+PRIV_KEY = bytes.fromhex('4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318')
+TRANSACTIONS = [{
+    'to': '0xF0109fC8DF283027b6285cc889F5aA624EaC1F55',
+    'value': 1000000000,
+    'gas': 2000000,
+    'gasPrice': 234567897654321,
+    'nonce': nonce,
+    'chainId': 1,
+} for nonce in range(3)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+@pytest.mark.parametrize('pool', ['none', 'thread', 'process'])
+async def test_sign_ethereum_transactions(pool):
+    signer = SigningService(PRIV_KEY, pool=pool, workers=1)
+    try:
+        signed = await signer.sign_ethereum_transactions(TRANSACTIONS)
+    finally:
+        await signer.close()
+
+    expected = [w3.eth.account.signTransaction(tx, PRIV_KEY) for tx in TRANSACTIONS]
+    assert [bytes(tx['rawTransaction']) for tx in signed] == [bytes(tx['rawTransaction']) for tx in expected]
+    assert [bytes(tx['hash']) for tx in signed] == [bytes(tx['hash']) for tx in expected]
+    assert signer.signed == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+@pytest.mark.parametrize('pool', ['none', 'thread', 'process'])
+async def test_sign_polyswarm_transaction(pool):
+    transaction = VoteTransaction('2b2f6a1d-7c6b-4a52-9e3b-5b2a6d2c1f10', True)
+    signer = SigningService(PRIV_KEY, pool=pool, workers=1)
+    try:
+        signed = await signer.sign_polyswarm_transaction(transaction)
+    finally:
+        await signer.close()
+
+    assert signed.payload == transaction.sign(PRIV_KEY).payload
+
+
+def test_unknown_pool():
+    with pytest.raises(ValueError):
+        SigningService(PRIV_KEY, pool='gpu')
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_pool_restarts_after_close():
+    signer = SigningService(PRIV_KEY, pool='thread', workers=1)
+    await signer.sign_ethereum_transactions(TRANSACTIONS[:1])
+    await signer.close()
+    assert signer.executor is None
+
+    await signer.sign_ethereum_transactions(TRANSACTIONS[1:])
+    assert signer.executor is not None
+    await signer.close()
+    assert signer.signed == 3
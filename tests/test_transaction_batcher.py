@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+
+from polyswarmclient.ethereum.transaction import TransactionBatcher
+from polyswarmclient.request_rate_limit import Priority
+from tests.utils.fixtures import failure, mock_client, success
+
+
+def posted(mock_client, chain):
+    url = mock_client.url_with_parameters('/transactions', chain=chain)
+    return [call.kwargs['json']['transactions'] for key, calls in mock_client.http_mock.requests.items()
+            if key[0] == 'POST' and str(key[1]) == url for call in calls]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_post_without_window(mock_client):
+    batcher = TransactionBatcher(mock_client, 'home', window=0)
+    results = [{'is_error': False, 'message': '0x1'}, {'is_error': False, 'message': '0x2'}]
+    mock_client.http_mock.post(mock_client.url_with_parameters('/transactions', chain='home'), body=success(results))
+
+    assert await batcher.post(['aa', 'bb'], None) == (True, results)
+    assert posted(mock_client, 'home') == [['aa', 'bb']]
+    assert batcher.stats()['requests'] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_post_coalesces_concurrent_actions(mock_client):
+    batcher = TransactionBatcher(mock_client, 'home', window=0.05)
+    results = [{'is_error': False, 'message': '0x{}'.format(i)} for i in range(3)]
+    mock_client.http_mock.post(mock_client.url_with_parameters('/transactions', chain='home'), body=success(results))
+
+    first, second = await asyncio.gather(batcher.post(['aa', 'bb'], None, Priority.LOW),
+                                         batcher.post(['cc'], None, Priority.HIGH))
+
+    assert first == (True, results[:2])
+    assert second == (True, results[2:])
+    assert posted(mock_client, 'home') == [['aa', 'bb', 'cc']]
+    assert batcher.stats() == {'requests': 1, 'transactions': 3, 'pending': 0}
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_post_fails_only_actions_with_errors(mock_client):
+    batcher = TransactionBatcher(mock_client, 'home', window=0.05)
+    results = [{'is_error': False, 'message': '0x1'}, {'is_error': True, 'message': 'nonce too low'}]
+    mock_client.http_mock.post(mock_client.url_with_parameters('/transactions', chain='home'), status=400,
+                               body=failure(results))
+
+    first, second = await asyncio.gather(batcher.post(['aa'], None), batcher.post(['bb'], None))
+
+    assert first == (True, results[:1])
+    assert second == (False, results[1:])
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_post_flushes_full_batch(mock_client):
+    batcher = TransactionBatcher(mock_client, 'home', window=10, max_size=2)
+    results = [{'is_error': False, 'message': '0x1'}, {'is_error': False, 'message': '0x2'}]
+    mock_client.http_mock.post(mock_client.url_with_parameters('/transactions', chain='home'), body=success(results))
+
+    assert await asyncio.wait_for(batcher.post(['aa', 'bb'], None), timeout=5) == (True, results)
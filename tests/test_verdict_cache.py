@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import pytest
+
+from polyswarmartifact import ArtifactType
+
+from polyswarmclient.abstractmicroengine import AbstractMicroengine
+from polyswarmclient.abstractscanner import AbstractScanner, ScanResult
+from polyswarmclient.verdictcache import VerdictCache
+from tests.utils.fixtures import mock_client
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class CachingScanner(AbstractScanner):
+    def __init__(self, version='1', cache_key=''):
+        super().__init__(cache_key=cache_key)
+        self.version = version
+        self.scanned = []
+
+    def cache_version(self):
+        return self.version
+
+    async def scan_async(self, guid, artifact_type, content, metadata, chain):
+        self.scanned.append(content)
+        if content == b'UNKNOWN':
+            return ScanResult()
+
+        return ScanResult(bit=True, verdict=content == b'EVIL', confidence=0.5)
+
+
+def test_verdict_cache_drops_other_versions():
+    cache = VerdictCache('scanner')
+    cache.put('a', '1', ScanResult(bit=True, verdict=True).to_dict())
+    assert ScanResult.from_dict(cache.get('a', '1')).verdict
+    assert cache.get('b', '1') is None
+
+    assert cache.get('a', '2') is None
+    assert cache.get('a', '1') is None
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'memory': 0}
+
+
+def test_verdict_cache_persists(tmp_path):
+    path = str(tmp_path / 'verdicts.db')
+    cache = VerdictCache('scanner', path=path)
+    cache.put('a', '1', ScanResult(bit=True, verdict=True).to_dict())
+    VerdictCache('other', path=path).put('a', '9', ScanResult(bit=True).to_dict())
+    cache.close()
+
+    cache = VerdictCache('scanner', size=0, path=path)
+    assert cache.get('a', '1')['verdict']
+    # A new version drops only the results of this scanner
+    assert cache.get('a', '2') is None
+    assert cache.get('a', '1') is None
+    assert VerdictCache('other', path=path).get('a', '9') is not None
+
+    cache.put('b', '2', ScanResult(bit=True).to_dict())
+    cache.close()
+    assert VerdictCache('scanner', path=path, ttl=0).get('b', '2') is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_scanner_reuses_verdicts(event_loop):
+    scanner = CachingScanner()
+    for content in [b'EVIL', b'EVIL', b'UNKNOWN', b'UNKNOWN']:
+        await scanner.scan('guid', ArtifactType.FILE, content, None, 'side')
+
+    # Results the scanner does not assert on are not cached
+    assert scanner.scanned == [b'EVIL', b'UNKNOWN', b'UNKNOWN']
+
+    result = await scanner.scan('other', ArtifactType.FILE, b'EVIL', None, 'side')
+    assert result.bit and result.verdict and result.confidence == 0.5
+    result.confidence = 0.0
+    assert (await scanner.scan('other', ArtifactType.FILE, b'EVIL', None, 'side')).confidence == 0.5
+
+    scanner.version = '2'
+    await scanner.scan('guid', ArtifactType.FILE, b'EVIL', None, 'side')
+    assert scanner.scanned.count(b'EVIL') == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_lookup_by_metadata_needs_trust(event_loop):
+    scanner = CachingScanner()
+    await scanner.scan('guid', ArtifactType.FILE, b'EVIL', None, 'side')
+    assert scanner.lookup_verdict({'sha256': sha256(b'EVIL')}) is None
+
+    scanner.verdict_cache.trust_metadata = True
+    assert scanner.lookup_verdict({'sha256': sha256(b'EVIL').upper()}).verdict
+    assert scanner.lookup_verdict({'sha256': sha256(b'GOOD')}) is None
+    assert scanner.lookup_verdict(None) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_microengine_skips_download_of_cached_artifacts(mock_client):
+    artifacts = [b'EVIL', b'GOOD']
+    fetched = []
+
+    async def list_artifacts(uri):
+        return [('artifact', 'hash')] * len(artifacts)
+
+    async def get_artifact(uri, index):
+        fetched.append(index)
+        return artifacts[index]
+
+    mock_client.list_artifacts = list_artifacts
+    mock_client.get_artifact = get_artifact
+
+    scanner = CachingScanner()
+    scanner.verdict_cache.trust_metadata = True
+    await scanner.scan('guid', ArtifactType.FILE, b'EVIL', None, 'side')
+
+    engine = AbstractMicroengine(mock_client, scanner=scanner)
+    metadata = [{'sha256': sha256(content), 'mimetype': 'text/plain'} for content in artifacts]
+    results = await engine.fetch_and_scan_all('guid', ArtifactType.FILE, 'uri', 20, metadata, 'side')
+    assert [result.verdict for result in results] == [True, False]
+    assert fetched == [1]
+    assert scanner.scanned == [b'EVIL', b'GOOD']
+
+
+def test_cache_key_keeps_configurations_apart(tmp_path):
+    assert AbstractScanner(cache_key='b').verdict_cache.name == 'polyswarmclient.abstractscanner.AbstractScanner:b'
+
+    path = str(tmp_path / 'verdicts.db')
+    a = VerdictCache(CachingScanner(cache_key='a').verdict_cache.name, path=path)
+    b = VerdictCache(CachingScanner(cache_key='b').verdict_cache.name, path=path)
+    a.put('sha', '1', ScanResult(bit=True).to_dict())
+    # Another configuration on another version leaves these results alone
+    b.put('sha', '2', ScanResult(bit=True).to_dict())
+    assert a.get('sha', '1') is not None and b.get('sha', '2') is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_verdict_cache_batches_writes(tmp_path):
+    path = str(tmp_path / 'verdicts.db')
+    cache = VerdictCache('scanner', size=0, path=path, flush_interval=0.1)
+    for sha in ['a', 'b', 'c']:
+        cache.put(sha, '1', ScanResult(bit=True).to_dict())
+
+    # Waiting results are still answered, and written together once the interval passes
+    assert cache.get('b', '1') is not None
+    assert VerdictCache('scanner', path=path).get('b', '1') is None
+    await asyncio.sleep(0.3)
+    assert VerdictCache('scanner', path=path).get('b', '1') is not None
+
+    cache.put('d', '1', ScanResult(bit=True).to_dict())
+    cache.close()
+    assert VerdictCache('scanner', path=path).get('d', '1') is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(15)
+async def test_trusted_metadata_sha256_is_the_key(event_loop):
+    scanner = CachingScanner()
+    assert await scanner.verdict_key(b'EVIL', {'sha256': 'ABC'}) == sha256(b'EVIL')
+
+    scanner.verdict_cache.trust_metadata = True
+    assert await scanner.verdict_key(b'EVIL', {'sha256': 'ABC'}) == 'abc'
+    assert await scanner.verdict_key(b'EVIL', None) == sha256(b'EVIL')
+
+    scanner.version = None
+    assert await scanner.verdict_key(b'EVIL', None) is None
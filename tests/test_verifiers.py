@@ -1,4 +1,45 @@
-from polyswarmclient.utils import sha3
+import pytest
+import uuid
+
+from eth_abi import encode_abi
+from polyswarmartifact import ArtifactType
+
+from polyswarmclient.ethereum.verifiers import (compile_abi, verify_batch, AbstractTransactionVerifier,
+                                                DecodedTransaction, NctApproveVerifier, NctTransferVerifier,
+                                                PostAssertionVerifier, PostBountyVerifier, PostVoteVerifier,
+                                                RevealAssertionVerifier, SettleBountyVerifier, StakingDepositVerifier,
+                                                StakingWithdrawVerifier)
+from polyswarmclient.utils import bool_list_to_int, sha3
+
+ADDRESS = '0x' + '11' * 20
+GUID = str(uuid.UUID(int=0x1234, version=4))
+GUID_INT = uuid.UUID(GUID).int
+BLOOM = (5 << 1800) | (3 << 256) | 1
+BLOOM_WORDS = [(BLOOM >> (256 * i)) & ((1 << 256) - 1) for i in reversed(range(8))]
+
+
+def transaction(verifier, *args, value=0):
+    method, types = verifier.ABI
+    data = compile_abi(method, tuple(types)).selector + encode_abi(types, args)
+    return {'to': ADDRESS, 'value': value, 'data': '0x' + data.hex()}
+
+
+# Verifier and a transaction it accepts, for each verifier
+FIXTURES = [
+    (NctApproveVerifier(100), transaction(NctApproveVerifier, ADDRESS, 100)),
+    (NctTransferVerifier(100), transaction(NctTransferVerifier, ADDRESS, 100)),
+    (PostBountyVerifier('file', 100, 'uri', 2, 20, BLOOM, 'metadata'),
+     transaction(PostBountyVerifier, GUID_INT, ArtifactType.FILE.value, 100, 'uri', 2, 20, BLOOM_WORDS, 'metadata')),
+    (PostAssertionVerifier(GUID, [10, 20], [True, True], 42),
+     transaction(PostAssertionVerifier, GUID_INT, [10, 20], bool_list_to_int([True, True]), 42)),
+    (RevealAssertionVerifier(GUID, 0, 7, [True, False], 'metadata'),
+     transaction(RevealAssertionVerifier, GUID_INT, 0, 7, bool_list_to_int([True, False]), 'metadata')),
+    (PostVoteVerifier(GUID, [False, True], True),
+     transaction(PostVoteVerifier, GUID_INT, bool_list_to_int([False, True]), True)),
+    (SettleBountyVerifier(GUID), transaction(SettleBountyVerifier, GUID_INT)),
+    (StakingDepositVerifier(100), transaction(StakingDepositVerifier, 100)),
+    (StakingWithdrawVerifier(100), transaction(StakingWithdrawVerifier, 100)),
+]
 
 
 def test_verifier_sha3():
@@ -7,3 +48,50 @@ def test_verifier_sha3():
     for result, abi in ABIS:
         method, args = abi
         assert result == sha3('{}({})'.format(method, ','.join(args)))[:4]
+        assert result == compile_abi(method, tuple(args)).selector
+
+
+def test_verifiers_accept_fixtures():
+    for verifier, tx in FIXTURES:
+        assert verifier.verify(tx), verifier
+
+
+def test_verifiers_reject_mismatches():
+    assert not NctApproveVerifier(101).verify(transaction(NctApproveVerifier, ADDRESS, 100))
+    assert not NctApproveVerifier(100).verify(transaction(NctApproveVerifier, ADDRESS, 100, value=1))
+    assert not NctApproveVerifier(100).verify(transaction(NctTransferVerifier, ADDRESS, 100))
+    assert not PostBountyVerifier('file', 100, 'uri', 2, 20, BLOOM + 1, 'metadata').verify(FIXTURES[2][1])
+    assert not PostBountyVerifier('url', 100, 'uri', 2, 20, BLOOM, 'metadata').verify(FIXTURES[2][1])
+    assert not PostBountyVerifier('file', 100, 'uri', 2, 20, 1 << 2048, 'metadata').verify(FIXTURES[2][1])
+    assert not SettleBountyVerifier(str(uuid.uuid4())).verify(FIXTURES[6][1])
+    assert not RevealAssertionVerifier(GUID, 0, 7, [True, True], 'metadata').verify(FIXTURES[4][1])
+
+    truncated = dict(FIXTURES[3][1], data=FIXTURES[3][1]['data'][:80])
+    assert not FIXTURES[3][0].verify(truncated)
+    assert not FIXTURES[0][0].verify({'to': ADDRESS, 'value': 0})
+
+
+def test_verify_batch():
+    verifiers = [verifier for verifier, _ in FIXTURES]
+    transactions = [tx for _, tx in FIXTURES]
+    assert verify_batch(verifiers, transactions)
+    assert not verify_batch(verifiers, transactions[:-1])
+    assert not verify_batch(verifiers, transactions[1:] + transactions[:1])
+
+
+def test_verifiers_overriding_verify():
+    class LegacyVerifier(AbstractTransactionVerifier):
+        ABI = StakingDepositVerifier.ABI
+
+        def verify(self, transaction):
+            return transaction['data'] == FIXTURES[7][1]['data']
+
+    verifier = LegacyVerifier((100,))
+    assert verify_batch([verifier], [FIXTURES[7][1]])
+    assert verifier.matches(DecodedTransaction.from_compiled(FIXTURES[7][1], verifier.COMPILED_ABI))
+
+    class EmptyVerifier(AbstractTransactionVerifier):
+        ABI = StakingDepositVerifier.ABI
+
+    with pytest.raises(NotImplementedError):
+        EmptyVerifier((100,)).verify(FIXTURES[7][1])